@@ -0,0 +1,172 @@
+import time
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def quantize_inputs(data: Mapping[str, Any], bins: Mapping[str, int]) -> Dict[str, Any]:
+    """Snap each binned field to the midpoint of its bin; other fields are kept (stripped)"""
+    quantized = {}
+    for field, value in data.items():
+        width = bins.get(field)
+        if width:
+            quantized[field] = int(value // width) * width + width // 2
+        elif isinstance(value, str):
+            quantized[field] = value.strip()
+        else:
+            quantized[field] = value
+    return quantized
+
+
+def advice_key(quantized: Mapping[str, Any]) -> str:
+    """Stable id for a quantized input: requests in the same bins share advice"""
+    canonical = {field: value.lower() if isinstance(value, str) else value for field, value in quantized.items()}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class AdviceCache:
+    """LRU + TTL cache of LLM advice that also coalesces concurrent fetches of the same key.
+
+    Failed fetches are remembered for a short failure TTL so an outage doesn't
+    turn every request into another LLM call. They are stored as {"error": ...},
+    which failed() tells apart from real advice.
+
+    A fetch started with hold=True (a deferred request whose client will poll for
+    the result) also keeps its result for hold_seconds outside the LRU bound, so
+    it can't be evicted, or never stored when max_entries is 0, before the poll.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 7 * 24 * 3600,
+                 failure_ttl_seconds: float = 60, hold_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.hold_seconds = hold_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._held: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._hold_keys = set()
+        self._in_flight: Dict[str, "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, advice = entry
+                if time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return advice
+                del self._entries[key]
+            held = self._held.get(key)
+            if held is not None:
+                if time.time() < held[0]:
+                    self.hits += 1
+                    return held[1]
+                del self._held[key]
+            return None
+
+    def set(self, key: str, advice: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, advice)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _hold(self, key: str, advice: Dict[str, Any], ttl_seconds: float) -> None:
+        """Keep a polled-for result regardless of max_entries; expired holds are dropped here"""
+        now = time.time()
+        with self._lock:
+            if key not in self._hold_keys:
+                return
+            for expired in [k for k, (expires_at, _) in self._held.items() if expires_at <= now]:
+                del self._held[expired]
+            self._held[key] = (now + min(ttl_seconds, self.hold_seconds), advice)
+
+    def cached(self, key: str) -> bool:
+        """Whether fresh advice is stored, without touching the LRU order or counters"""
+        with self._lock:
+            entry = self._entries.get(key) or self._held.get(key)
+            return entry is not None and time.time() < entry[0]
+
+    def pending(self, key: str) -> bool:
+        return key in self._in_flight
+
+    @staticmethod
+    def failed(advice: Optional[Dict[str, Any]]) -> bool:
+        return advice is not None and "error" in advice
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        self.fetches += 1
+        try:
+            advice = await fetch()
+            self.set(key, advice)
+            self._hold(key, advice, self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Advice fetch for {key} failed: {str(e)}")
+            self.failures += 1
+            advice = {"error": str(e) or type(e).__name__}
+            self.set(key, advice, self.failure_ttl_seconds)
+            self._hold(key, advice, self.failure_ttl_seconds)
+        finally:
+            self._in_flight.pop(key, None)
+            with self._lock:
+                self._hold_keys.discard(key)
+        return advice
+
+    def start(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]],
+              hold: bool = False) -> Optional["asyncio.Task"]:
+        """Begin fetching a key in the background unless it is cached or already in flight"""
+        if self.get(key) is not None:
+            return None
+        if hold:
+            with self._lock:
+                self._hold_keys.add(key)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        self.misses += 1
+        task = asyncio.get_running_loop().create_task(self._fetch(key, fetch))
+        self._in_flight[key] = task
+        return task
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Cached advice, or the result of the single in-flight fetch for this key"""
+        advice = self.get(key)
+        if advice is not None:
+            return advice
+        task = self.start(key, fetch)
+        if task is None:
+            return self.get(key) or {}
+        # Shielded: a client disconnecting must not cancel a fetch other requests are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "held": len(self._held),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "llm_calls": self.fetches,
+            "failures": self.failures,
+            "evictions": self.evictions
+        }
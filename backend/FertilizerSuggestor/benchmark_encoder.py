@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Check FertilizerEncoder against the get_dummies + reindex path it replaced and
+time both per request and per batch.
+
+Parity covers every known soil/crop pair, unknown categories and random numeric
+values: the encoded matrices must be identical and so must the predictions.
+Without --model a small forest is trained on synthetic data with the same
+get_dummies columns as the real one.
+
+Usage (from backend/):
+    python -m FertilizerSuggestor.benchmark_encoder
+    python -m FertilizerSuggestor.benchmark_encoder --model FertilizerSuggestor/fertilizer_model.pkl
+"""
+
+import time
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from .feature_encoder import FertilizerEncoder
+
+NUMERIC_FIELDS = ["Temperature", "Humidity", "Moisture", "Nitrogen", "Phosphorus", "Potassium"]
+SOIL_TYPES = ["Sandy", "Loamy", "Black", "Red", "Clayey"]
+CROP_TYPES = ["Maize", "Sugarcane", "Cotton", "Tobacco", "Paddy", "Barley", "Wheat", "Millets",
+              "Oil seeds", "Pulses", "Ground Nuts"]
+FERTILIZERS = ["Urea", "DAP", "14-35-14", "28-28", "17-17-17", "20-20", "10-26-26"]
+
+
+def legacy_encode(records, columns):
+    """The original predict_fertilizer encoding"""
+    return pd.get_dummies(pd.DataFrame(records)).reindex(columns=columns, fill_value=0)
+
+
+def sample_records(n: int, seed: int = 0, unknown_rate: float = 0.0):
+    rng = np.random.default_rng(seed)
+    soils = SOIL_TYPES + ["Peaty"] if unknown_rate else SOIL_TYPES
+    crops = CROP_TYPES + ["Quinoa"] if unknown_rate else CROP_TYPES
+    return [{
+        "Temperature": int(rng.integers(20, 40)),
+        "Humidity": int(rng.integers(40, 75)),
+        "Moisture": int(rng.integers(25, 65)),
+        "Soil_Type": soils[rng.integers(len(soils))],
+        "Crop_Type": crops[rng.integers(len(crops))],
+        "Nitrogen": int(rng.integers(0, 45)),
+        "Phosphorus": int(rng.integers(0, 45)),
+        "Potassium": int(rng.integers(0, 25))
+    } for _ in range(n)]
+
+
+def synthetic_model(seed: int = 0):
+    records = sample_records(2000, seed)
+    X = pd.get_dummies(pd.DataFrame(records))
+    rng = np.random.default_rng(seed)
+    y = [FERTILIZERS[i] for i in rng.integers(len(FERTILIZERS), size=len(X))]
+    model = RandomForestClassifier(n_estimators=50, random_state=seed).fit(X, y)
+    return model, list(X.columns)
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_parity(model, columns, encoder) -> int:
+    """Number of mismatching rows (encoded values or predictions) between the two paths"""
+    records = [
+        {**record, "Soil_Type": soil, "Crop_Type": crop}
+        for soil in SOIL_TYPES for crop in CROP_TYPES for record in sample_records(1, seed=len(soil) + len(crop))
+    ] + sample_records(500, seed=1, unknown_rate=0.2)
+    mismatches = 0
+    for record in records:
+        expected = legacy_encode([record], columns)
+        actual = encoder.encode(record)
+        if not np.array_equal(expected.to_numpy(dtype=np.float64), actual) or \
+                model.predict(expected)[0] != model.predict(encoder.model_input(model, actual))[0]:
+            mismatches += 1
+    expected = legacy_encode(records, columns)
+    if not np.array_equal(expected.to_numpy(dtype=np.float64), encoder.encode_many(records)):
+        mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="fertilizer_model.pkl ((model, columns) tuple); default: synthetic")
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    model, columns = joblib.load(args.model) if args.model else synthetic_model()
+    encoder = FertilizerEncoder(columns)
+
+    mismatches = check_parity(model, columns, encoder)
+    print(f"{'✅' if not mismatches else '❌'} Parity: {mismatches} mismatching rows")
+
+    record = sample_records(1, seed=2)[0]
+    batch = sample_records(args.batch_rows, seed=3)
+    legacy_us = best_of(lambda: legacy_encode([record], columns), args.repeats) * 1e6
+    encoder_us = best_of(lambda: encoder.encode(record), args.repeats) * 1e6
+    legacy_row = legacy_encode([record], columns)
+    encoded_row = encoder.encode(record)
+    legacy_total_us = best_of(lambda: model.predict(legacy_encode([record], columns)), args.repeats // 4) * 1e6
+    encoder_total_us = best_of(lambda: model.predict(encoder.model_input(model, encoder.encode(record))),
+                               args.repeats // 4) * 1e6
+    model_us = best_of(lambda: model.predict(encoder.model_input(model, encoded_row)), args.repeats // 4) * 1e6
+    legacy_batch_ms = best_of(lambda: legacy_encode(batch, columns), 10) * 1000
+    encoder_batch_ms = best_of(lambda: encoder.encode_many(batch), 10) * 1000
+    assert model.predict(legacy_row)[0] == model.predict(encoder.model_input(model, encoded_row))[0]
+
+    print(f"\n📊 {len(columns)} columns, {type(model).__name__}")
+    print(f"   {'':<28} {'get_dummies':>12} {'encoder':>10} {'speedup':>8}")
+    print(f"   {'encode 1 row (µs)':<28} {legacy_us:>12.1f} {encoder_us:>10.1f} {legacy_us / encoder_us:>7.0f}x")
+    print(f"   {f'encode {len(batch)} rows (ms)':<28} {legacy_batch_ms:>12.2f} {encoder_batch_ms:>10.2f} "
+          f"{legacy_batch_ms / encoder_batch_ms:>7.1f}x")
+    print(f"   {'encode + predict 1 row (µs)':<28} {legacy_total_us:>12.1f} {encoder_total_us:>10.1f} "
+          f"{legacy_total_us / encoder_total_us:>7.1f}x")
+    print(f"   {'model.predict alone (µs)':<28} {model_us:>23.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_FIELDS = ("Soil_Type", "Crop_Type")
+
+
+class FertilizerEncoder:
+    """Maps fertilizer inputs straight onto the model's training columns.
+
+    Equivalent to pd.get_dummies(pd.DataFrame(rows)).reindex(columns=columns,
+    fill_value=0): numeric fields land in their own column, a categorical value
+    sets the "<field>_<value>" column, and anything the model never saw
+    (unknown categories, extra fields) is dropped. The column layout is resolved
+    once, so encoding a request is a copy of a zero row plus a few assignments.
+    """
+
+    def __init__(self, columns: Sequence[str], categorical_fields: Sequence[str] = CATEGORICAL_FIELDS):
+        self.columns = list(columns)
+        self.categorical_fields = tuple(categorical_fields)
+        self.one_hot: Dict[str, Dict[str, int]] = {field: {} for field in self.categorical_fields}
+        self.numeric: Dict[str, int] = {}
+        for index, column in enumerate(self.columns):
+            for field in self.categorical_fields:
+                if column.startswith(f"{field}_"):
+                    self.one_hot[field][column[len(field) + 1:]] = index
+                    break
+            else:
+                self.numeric[column] = index
+        self._zero_row = np.zeros((1, len(self.columns)), dtype=np.float64)
+
+    def encode(self, record: Mapping[str, Any]) -> np.ndarray:
+        """One (1, n_columns) row for a single request"""
+        row = self._zero_row.copy()
+        values = row[0]
+        for field, index in self.numeric.items():
+            value = record.get(field)
+            if value is not None:
+                values[index] = value
+        for field, lookup in self.one_hot.items():
+            index = lookup.get(record.get(field))
+            if index is not None:
+                values[index] = 1.0
+        return row
+
+    def encode_columns(self, data: Mapping[str, Sequence[Any]], n_rows: int) -> np.ndarray:
+        """(n_rows, n_columns) matrix from columnar data (a dict of lists or a DataFrame)"""
+        matrix = np.zeros((n_rows, len(self.columns)), dtype=np.float64)
+        for field, index in self.numeric.items():
+            if field in data:
+                matrix[:, index] = np.asarray(data[field], dtype=np.float64)
+        for field, lookup in self.one_hot.items():
+            if field not in data:
+                continue
+            indices = np.fromiter((lookup.get(value, -1) for value in data[field]), dtype=np.int64, count=n_rows)
+            hit = np.flatnonzero(indices >= 0)
+            matrix[hit, indices[hit]] = 1.0
+        return matrix
+
+    def encode_many(self, records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """(len(records), n_columns) matrix for a batch of requests"""
+        fields: List[str] = list(self.numeric) + list(self.one_hot)
+        columns = {field: [record.get(field, 0 if field in self.numeric else None) for record in records]
+                   for field in fields}
+        return self.encode_columns(columns, len(records))
+
+    def model_input(self, model: Any, matrix: np.ndarray) -> Any:
+        """The encoded matrix in the form the model was fitted on.
+
+        A model fitted on a DataFrame gets a DataFrame view with the training
+        column names (tens of µs, no copy), so sklearn checks the columns
+        instead of warning that the input has no feature names.
+        """
+        if hasattr(model, "feature_names_in_"):
+            return pd.DataFrame(matrix, columns=self.columns, copy=False)
+        return matrix
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List
 import joblib
 import pandas as pd
+import io
 import json
+import asyncio
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
-from huggingface_hub import hf_hub_download
 import re
 import os
+from model_registry import registry, ModelSpec
+from .feature_encoder import FertilizerEncoder
+from .advice_cache import AdviceCache, advice_key, quantize_inputs
 
 router = APIRouter()
 
@@ -15,13 +22,23 @@ router = APIRouter()
 # Load Model & Configure APIs
 # ---------------------------
 
+def load_fertilizer_model(path):
+    """(model, columns, encoder); the encoder is compiled once per model version"""
+    model, columns = joblib.load(path, mmap_mode="r")
+    return model, columns, FertilizerEncoder(columns)
+
 try:
-    # Load your trained machine learning model
-    fertilizer_model_path = hf_hub_download(
-        repo_id="adityaarun1010/my-new-models",
-        filename="fertilizer_model.pkl"
-    )
-    model, columns = joblib.load(fertilizer_model_path)
+    # Load your trained machine learning model (a (model, columns) tuple) through the
+    # shared registry; mmap_mode lets the tree arrays stay in the page cache, and is safe
+    # because the registry only hands loaders its immutable objects/<sha256>/ copy
+    registry.register(ModelSpec(
+        "fertilizer_model",
+        "fertilizer_model.pkl",
+        load_fertilizer_model,
+        repo_id=os.getenv("FERTILIZER_MODEL_REPO", "adityaarun1010/my-new-models"),
+        local_paths=[os.getenv("FERTILIZER_MODEL_PATH")]
+    ))
+    registry.load("fertilizer_model")
 
     # Configure the Gemini API
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -54,68 +71,309 @@ class FertilizerRequest(BaseModel):
 
 def predict_fertilizer(input_data: dict):
     """Run prediction using the loaded joblib model."""
-    new_data = pd.DataFrame([input_data])
-    new_data = pd.get_dummies(new_data)
-    new_data = new_data.reindex(columns=columns, fill_value=0)
-    return model.predict(new_data)[0]
+    model, columns, encoder = registry.get("fertilizer_model")
+    # Same row as get_dummies + reindex(columns), without the per-request DataFrame work
+    prediction = model.predict(encoder.model_input(model, encoder.encode(input_data)))[0]
+    # Native Python value, so it serializes into SSE events as well as JSON responses
+    return prediction.item() if hasattr(prediction, "item") else prediction
 
 # ---------------------------
-# API Endpoint
+# Gemini Nutrient Advice (cached by quantized inputs)
 # ---------------------------
 
-@router.post("/predict")
-def predict(data: FertilizerRequest):
+# Advice only depends on soil, crop and coarse bins of the readings, so requests in
+# the same bins share one Gemini answer
+ADVICE_BINS = {
+    "Nitrogen": int(os.getenv("FERTILIZER_ADVICE_NPK_BIN", "10")),
+    "Phosphorus": int(os.getenv("FERTILIZER_ADVICE_NPK_BIN", "10")),
+    "Potassium": int(os.getenv("FERTILIZER_ADVICE_NPK_BIN", "10")),
+    "Temperature": int(os.getenv("FERTILIZER_ADVICE_TEMPERATURE_BIN", "5")),
+    "Humidity": int(os.getenv("FERTILIZER_ADVICE_HUMIDITY_BIN", "10")),
+    "Moisture": int(os.getenv("FERTILIZER_ADVICE_MOISTURE_BIN", "10"))
+}
+advice_cache = AdviceCache(
+    max_entries=int(os.getenv("FERTILIZER_ADVICE_CACHE_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("FERTILIZER_ADVICE_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    failure_ttl_seconds=float(os.getenv("FERTILIZER_ADVICE_FAILURE_TTL_SECONDS", "60")),
+    hold_seconds=float(os.getenv("FERTILIZER_ADVICE_HOLD_SECONDS", "600"))
+)
+ADVICE_MODES = ("inline", "deferred", "sse")
+DEFAULT_EXPLANATION = "Based on standard agricultural models, adjustments are recommended to balance nutrient levels for the selected crop."
+
+def parse_advice(text: str) -> Dict[str, Any]:
+    """The nitrogen/phosphorus/potassium/explanation fields Gemini returned, if any"""
+    match = re.search(r'\{[\s\S]*\}', text)
+    if not match:
+        return {}
     try:
-        input_dict = data.dict()
-        
-        # --- CORE LOGIC CHANGE ---
-        # 1. Get the main prediction directly from your trained ML model.
-        # This is the value you want to display prominently.
-        ml_prediction_result = predict_fertilizer(input_dict)
+        gemini_data = json.loads(match.group(0).replace("'", '"'))
+    except json.JSONDecodeError:
+        return {}  # If parsing fails, just use the default values.
+    if not isinstance(gemini_data, dict):
+        return {}
+    return {field: gemini_data[field] for field in ("nitrogen", "phosphorus", "potassium", "explanation")
+            if field in gemini_data}
 
-        # 2. Use Gemini ONLY for supplemental nutrient advice and explanation.
+def advice_request(input_dict: dict):
+    """(advice id, fetch coroutine factory) for an input's quantized bins"""
+    quantized = quantize_inputs(input_dict, ADVICE_BINS)
+
+    async def fetch():
+        # Use Gemini ONLY for supplemental nutrient advice and explanation.
         gemini_prompt = (
             f"Given the soil data, recommend optimal N, P, and K levels and give a short explanation. "
             f"Return ONLY a valid JSON object.\n"
             f"Format: {{\"nitrogen\": <int>, \"phosphorus\": <int>, \"potassium\": <int>, \"explanation\": \"<string>\"}}\n"
-            f"Input Data: {json.dumps(input_dict)}"
+            f"Input Data: {json.dumps(quantized)}"
         )
-        
-        response = llm.invoke(gemini_prompt)
-        match = re.search(r'\{[\s\S]*\}', response.text)
-        recommended_n = input_dict["Nitrogen"] + 20
-        recommended_p = input_dict["Phosphorus"] + 20
-        recommended_k = input_dict["Potassium"] + 20
-        explanation = "Based on standard agricultural models, adjustments are recommended to balance nutrient levels for the selected crop."
-
-        # 4. Parse Gemini's response if it's valid.
-        if match:
-            try:
-                gemini_data = json.loads(match.group(0).replace("'", '"'))
-                recommended_n = gemini_data.get("nitrogen", recommended_n)
-                recommended_p = gemini_data.get("phosphorus", recommended_p)
-                recommended_k = gemini_data.get("potassium", recommended_k)
-                explanation = gemini_data.get("explanation", explanation)
-            except (json.JSONDecodeError, KeyError):
-                pass  # If parsing fails, just use the default values.
-        
-        # 5. Construct the final response with clear separation of concerns.
-        result = {
-            # The main result from YOUR model
-            "mlPrediction": ml_prediction_result,
-            
-            # Detailed breakdown for the nutrient table, powered by Gemini
-            "nutrients": {
-                "nitrogen": {"current": input_dict["Nitrogen"], "recommended": recommended_n, "unit": "kg/ha"},
-                "phosphorus": {"current": input_dict["Phosphorus"], "recommended": recommended_p, "unit": "kg/ha"},
-                "potassium": {"current": input_dict["Potassium"], "recommended": recommended_k, "unit": "kg/ha"}
-            },
-            
-            # The text explanation, powered by Gemini
-            "explanation": explanation
-        }
-        return result
-        
+        response = await llm.ainvoke(gemini_prompt)
+        advice = parse_advice(response.text)
+        if not advice:
+            raise ValueError("Gemini returned no usable advice")
+        return advice
+
+    return advice_key(quantized), fetch
+
+def build_result(input_dict: dict, ml_prediction_result, advice: Dict[str, Any]) -> Dict[str, Any]:
+    """The /predict response: model prediction plus advice, defaulting what Gemini didn't give"""
+    return {
+        # The main result from YOUR model
+        "mlPrediction": ml_prediction_result,
+
+        # Detailed breakdown for the nutrient table, powered by Gemini
+        "nutrients": {
+            "nitrogen": {"current": input_dict["Nitrogen"], "recommended": advice.get("nitrogen", input_dict["Nitrogen"] + 20), "unit": "kg/ha"},
+            "phosphorus": {"current": input_dict["Phosphorus"], "recommended": advice.get("phosphorus", input_dict["Phosphorus"] + 20), "unit": "kg/ha"},
+            "potassium": {"current": input_dict["Potassium"], "recommended": advice.get("potassium", input_dict["Potassium"] + 20), "unit": "kg/ha"}
+        },
+
+        # The text explanation, powered by Gemini
+        "explanation": advice.get("explanation", DEFAULT_EXPLANATION)
+    }
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+async def stream_result(input_dict: dict, ml_prediction_result, advice_id: str, fetch):
+    """SSE for /predict?advice=sse: the model prediction at once, the advice when it arrives"""
+    yield format_sse({"type": "prediction", "mlPrediction": ml_prediction_result, "adviceId": advice_id})
+    advice = await advice_cache.get_or_fetch(advice_id, fetch)
+    yield format_sse({"type": "final", "result": build_result(input_dict, ml_prediction_result, advice)})
+
+# ---------------------------
+# API Endpoint
+# ---------------------------
+
+@router.post("/predict")
+async def predict(data: FertilizerRequest, advice: str = Query("inline")):
+    """Fertilizer from the model plus Gemini NPK advice.
+
+    advice=inline waits for the advice (usually a cache hit), advice=deferred
+    returns the prediction at once with an adviceId to poll at /advice/{id},
+    and advice=sse streams the prediction followed by the full result.
+    """
+    if advice not in ADVICE_MODES:
+        return JSONResponse(content={
+            "error": f"advice must be one of: {', '.join(ADVICE_MODES)}.",
+            "status": "error"
+        }, status_code=422)
+    try:
+        input_dict = data.dict()
+
+        # 1. Get the main prediction directly from your trained ML model.
+        # This is the value you want to display prominently.
+        ml_prediction_result = await run_in_threadpool(predict_fertilizer, input_dict)
+
+        # 2. Nutrient advice from the cache, or one Gemini call shared by every request in the same bins.
+        advice_id, fetch = advice_request(input_dict)
+        if advice == "sse":
+            return StreamingResponse(
+                stream_result(input_dict, ml_prediction_result, advice_id, fetch),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        if advice == "deferred":
+            cached = advice_cache.get(advice_id)
+            if cached is None:
+                # Held past the cache bound until the client polls /advice/{id}
+                advice_cache.start(advice_id, fetch, hold=True)
+                return {
+                    "mlPrediction": ml_prediction_result,
+                    "adviceId": advice_id,
+                    "adviceStatus": "pending",
+                    "adviceUrl": f"/fertilizer/advice/{advice_id}"
+                }
+            if advice_cache.failed(cached):
+                # Rule-based defaults, flagged so the client doesn't mistake them for Gemini's advice
+                return {**build_result(input_dict, ml_prediction_result, cached), "adviceId": advice_id,
+                        "adviceStatus": "failed", "adviceError": cached["error"]}
+            return {**build_result(input_dict, ml_prediction_result, cached), "adviceId": advice_id, "adviceStatus": "ready"}
+
+        return build_result(input_dict, ml_prediction_result, await advice_cache.get_or_fetch(advice_id, fetch))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
+
+@router.get("/advice/{advice_id}")
+async def get_advice(advice_id: str):
+    """Poll the Gemini advice for an adviceId from /predict?advice=deferred"""
+    cached = advice_cache.get(advice_id)
+    if advice_cache.failed(cached):
+        # The failure is cached for FERTILIZER_ADVICE_FAILURE_TTL_SECONDS; a new /predict retries after that
+        return JSONResponse(content={"adviceId": advice_id, "adviceStatus": "failed",
+                                     "error": f"Advice is unavailable: {cached['error']}", "status": "error"},
+                            status_code=502, headers={"Retry-After": str(int(advice_cache.failure_ttl_seconds))})
+    if cached is not None:
+        return {"adviceId": advice_id, "adviceStatus": "ready", "advice": cached}
+    if advice_cache.pending(advice_id):
+        return JSONResponse(content={"adviceId": advice_id, "adviceStatus": "pending"},
+                            status_code=202, headers={"Retry-After": "1"})
+    return JSONResponse(content={"error": "Unknown or expired advice id", "status": "error"}, status_code=404)
+
+# ---------------------------
+# Batch Endpoint (soil-test sheets)
+# ---------------------------
+
+MAX_BATCH_ROWS = int(os.getenv("FERTILIZER_MAX_BATCH_ROWS", "5000"))
+# Gemini calls in flight at once for one sheet; unique advice keys beyond this queue up
+BATCH_ADVICE_CONCURRENCY = int(os.getenv("FERTILIZER_BATCH_ADVICE_CONCURRENCY", "4"))
+# New Gemini lookups per sheet; rows in further uncached bins get the default advice
+BATCH_MAX_ADVICE_LOOKUPS = int(os.getenv("FERTILIZER_BATCH_MAX_ADVICE_LOOKUPS", "50"))
+BATCH_ADVICE_MODES = ("inline", "none")
+
+def predict_fertilizer_many(records: List[dict]) -> list:
+    """One model.predict over every row"""
+    model, columns, encoder = registry.get("fertilizer_model")
+    return model.predict(encoder.model_input(model, encoder.encode_many(records))).tolist()
+
+def parse_csv(body: bytes) -> List[dict]:
+    frame = pd.read_csv(io.BytesIO(body))
+    # Lab sheets often say "Soil Type"; match the request field names
+    frame.columns = [str(column).strip().replace(" ", "_") for column in frame.columns]
+    return frame.to_dict("records")
+
+async def read_batch_rows(request: Request) -> List[Any]:
+    """Rows from a JSON array (or {"rows": [...]}), a CSV body, or a multipart CSV upload"""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "read"):
+            raise ValueError("Upload the sheet as a 'file' form field.")
+        return await run_in_threadpool(parse_csv, await upload.read())
+    if content_type.startswith(("text/csv", "application/csv")):
+        return await run_in_threadpool(parse_csv, await request.body())
+    payload = await request.json()
+    rows = payload.get("rows") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise ValueError("Send a JSON array of rows, {\"rows\": [...]}, or a CSV file.")
+    return rows
+
+def validate_rows(rows: List[Any]):
+    """(valid (row index, input dict) pairs, per-row error events)"""
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, FertilizerRequest.model_validate(row).model_dump()))
+        except ValidationError as e:
+            errors.append({"type": "error", "row": index,
+                           "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())})
+    return valid, errors
+
+async def stream_batch(valid: List[tuple], errors: List[dict], predictions: list, advice: str):
+    """NDJSON: row errors, then each row as soon as its (deduplicated) advice is ready.
+
+    At most BATCH_MAX_ADVICE_LOOKUPS new Gemini calls are made per sheet.
+    """
+    for event in errors:
+        yield json.dumps(event) + "\n"
+
+    lookups = skipped = 0
+    if advice == "none":
+        for (index, input_dict), prediction in zip(valid, predictions):
+            yield json.dumps({"type": "result", "row": index, "mlPrediction": prediction}) + "\n"
+    else:
+        # Rows sharing soil, crop and bins share one advice lookup
+        groups: Dict[str, List[int]] = {}
+        fetches = {}
+        for position, (index, input_dict) in enumerate(valid):
+            advice_id, fetch = advice_request(input_dict)
+            groups.setdefault(advice_id, []).append(position)
+            fetches.setdefault(advice_id, fetch)
+
+        semaphore = asyncio.Semaphore(BATCH_ADVICE_CONCURRENCY)
+
+        async def resolve(advice_id, fetch):
+            async def bounded_fetch():
+                async with semaphore:
+                    return await fetch()
+            return advice_id, await advice_cache.get_or_fetch(advice_id, bounded_fetch)
+
+        lookups, pending = 0, []
+        for advice_id, fetch in fetches.items():
+            if not advice_cache.cached(advice_id) and not advice_cache.pending(advice_id):
+                if lookups >= BATCH_MAX_ADVICE_LOOKUPS:
+                    skipped += len(groups[advice_id])
+                    for position in groups[advice_id]:
+                        index, input_dict = valid[position]
+                        yield json.dumps({"type": "result", "row": index, "adviceId": advice_id, "adviceStatus": "default",
+                                          **build_result(input_dict, predictions[position], {})}) + "\n"
+                    continue
+                lookups += 1
+            pending.append(resolve(advice_id, fetch))
+
+        for next_done in asyncio.as_completed(pending):
+            advice_id, row_advice = await next_done
+            for position in groups[advice_id]:
+                index, input_dict = valid[position]
+                yield json.dumps({"type": "result", "row": index, "adviceId": advice_id,
+                                  "adviceStatus": "default" if advice_cache.failed(row_advice) else "ready",
+                                  **build_result(input_dict, predictions[position], row_advice)}) + "\n"
+
+    yield json.dumps({"type": "done", "rows": len(valid) + len(errors), "predicted": len(valid),
+                      "errors": len(errors), "advice_lookups": lookups, "default_advice_rows": skipped}) + "\n"
+
+@router.post("/predict-batch")
+async def predict_batch(request: Request, advice: str = Query("inline")):
+    """Fertilizer for every row of a soil-test sheet (JSON array or CSV), streamed back as NDJSON.
+
+    All rows go through one model.predict; rows in the same advice bins share a
+    single Gemini lookup. Result lines carry their "row" index and arrive as
+    their advice becomes ready, so they are not in sheet order.
+    """
+    if advice not in BATCH_ADVICE_MODES:
+        return JSONResponse(content={
+            "error": f"advice must be one of: {', '.join(BATCH_ADVICE_MODES)}.",
+            "status": "error"
+        }, status_code=422)
+    try:
+        rows = await read_batch_rows(request)
+    except Exception as e:
+        return JSONResponse(content={"error": f"Could not read the sheet: {str(e)}", "status": "error"},
+                            status_code=400)
+    if len(rows) > MAX_BATCH_ROWS:
+        return JSONResponse(content={
+            "error": f"Too many rows. Maximum is {MAX_BATCH_ROWS} per request",
+            "status": "error"
+        }, status_code=413)
+
+    valid, errors = validate_rows(rows)
+    try:
+        predictions = await run_in_threadpool(predict_fertilizer_many, [input_dict for _, input_dict in valid]) if valid else []
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
 
+    return StreamingResponse(
+        stream_batch(valid, errors, predictions, advice),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/health")
+def health_check():
+    """Fertilizer model version and advice cache counters"""
+    return {
+        "status": "healthy",
+        "model": registry.status(["fertilizer_model"])["fertilizer_model"],
+        "advice_cache": advice_cache.stats()
+    }
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark decode + resize of plant photos: the original full-decode LANCZOS path
+against process_image_for_gemini (JPEG draft decoding, reducing_gap resize,
+EXIF orientation). Each variant runs in a fresh process so peak RSS is measured
+independently.
+
+Usage (from backend/):
+    python -m Plant_Disease.benchmark_image_decode --images path/to/phone_photos
+    python -m Plant_Disease.benchmark_image_decode --generate 20
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from .image_pipeline import process_image_for_gemini
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def legacy_process(image_bytes: bytes) -> Image.Image:
+    """The decode path used before JPEG draft mode (full decode, single LANCZOS pass)"""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    max_size = 1024
+    if max(image.size) > max_size:
+        ratio = max_size / max(image.size)
+        new_size = tuple(int(dim * ratio) for dim in image.size)
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    return image
+
+
+VARIANTS = {
+    "legacy": legacy_process,
+    "current": process_image_for_gemini
+}
+
+
+def reset_peak_rss() -> None:
+    """Reset the kernel's high-water mark (Linux) so the peak reflects decoding only"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_variant(variant: str, paths, repeat: int):
+    """Runs inside a fresh worker process"""
+    import logging
+    logging.disable(logging.INFO)
+
+    process = VARIANTS[variant]
+    payloads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            payloads.append(f.read())
+
+    reset_peak_rss()
+    baseline_rss = peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        for payload in payloads:
+            start = time.perf_counter()
+            image = process(payload)
+            timings.append((time.perf_counter() - start) * 1000)
+            del image
+
+    timings.sort()
+    return {
+        "variant": variant,
+        "samples": len(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def generate_corpus(directory: str, count: int, size=(4032, 3024)):
+    """Write synthetic 12 MP phone-like JPEGs, half of them with a rotated EXIF orientation"""
+    paths = []
+    for i in range(count):
+        gradient = Image.linear_gradient("L").resize(size)
+        noise = Image.effect_noise(size, 48 + i % 16)
+        image = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+        exif = Image.Exif()
+        if i % 2:
+            exif[0x0112] = 6
+        path = os.path.join(directory, f"synthetic_{i:03d}.jpg")
+        image.save(path, format="JPEG", quality=90, exif=exif.tobytes())
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Directory of representative phone photos")
+    parser.add_argument("--generate", type=int, default=0, help="Generate N synthetic 12 MP JPEGs instead")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus per variant")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.images:
+            paths = sorted(
+                os.path.join(args.images, name) for name in os.listdir(args.images)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif args.generate:
+            print(f"📊 Generating {args.generate} synthetic 12 MP JPEGs...")
+            paths = generate_corpus(tmp_dir, args.generate)
+        else:
+            parser.error("pass --images DIR or --generate N")
+        if not paths:
+            parser.error("no images found")
+
+        total_mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+        print(f"📊 Corpus: {len(paths)} images, {total_mb:.1f} MB, {args.repeat} passes per variant\n")
+
+        results = []
+        context = multiprocessing.get_context("spawn")
+        for variant in VARIANTS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results.append(executor.submit(run_variant, variant, paths, args.repeat).result())
+
+    print(f"{'variant':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak RSS MB':>14}{'decode RSS MB':>16}")
+    for r in results:
+        if r["peak_rss_mb"] is not None:
+            rss = f"{r['peak_rss_mb']:.1f}"
+            delta = f"{r['peak_rss_mb'] - r['baseline_rss_mb']:.1f}"
+        else:
+            rss = delta = "n/a"
+        print(f"{r['variant']:<10}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{rss:>14}{delta:>16}")
+
+    legacy, current = results
+    print(f"\n✅ Speedup (mean): {legacy['mean_ms'] / current['mean_ms']:.2f}x")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
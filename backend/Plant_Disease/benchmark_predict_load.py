@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for POST /plant/disease/predict: concurrent multipart uploads,
+reporting p50/p95/p99 latency, throughput and worker RSS.
+
+By default the disease router runs in-process behind httpx's ASGI transport
+with VISION_BACKEND=replay, so no Gemini quota is used and the diagnosis cache
+is disabled so every request decodes and "calls" the vision backend. Pass
+--url to drive a running server instead (set VISION_BACKEND=replay there, and
+--pid to sample its RSS).
+
+Usage (from backend/):
+    python -m Plant_Disease.benchmark_predict_load --requests 200 --concurrency 16
+    python -m Plant_Disease.benchmark_predict_load --latency-ms 800 --failure-rate 0.05 --profile triage
+    python -m Plant_Disease.benchmark_predict_load --url http://localhost:8000 --pid 12345 --images photos/
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .benchmark_image_decode import IMAGE_EXTENSIONS, generate_corpus
+
+PREDICT_PATH = "/plant/disease/predict"
+
+
+def rss_mb(pid: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """Current and peak resident set size of a process (Linux /proc)"""
+    values: Dict[str, Optional[float]] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_mb"] = int(line.split()[1]) / 1024
+                elif line.startswith("VmHWM:"):
+                    values["peak_rss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return values
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def build_app():
+    """The disease router mounted as in main.py, without the other services' dependencies"""
+    from fastapi import FastAPI
+    from .routes import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/plant")
+    return app
+
+
+async def run_load(client: httpx.AsyncClient, payloads: List[bytes], total: int, concurrency: int,
+                   params: Dict[str, Any]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    cache_matches: Counter = Counter()
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request
+        while next_request < total:
+            index = next_request
+            next_request += 1
+            payload = payloads[index % len(payloads)]
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    PREDICT_PATH, params=params,
+                    files={"file": (f"leaf_{index}.jpg", payload, "image/jpeg")}
+                )
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    cache_matches[response.json().get("cache_match") or "miss"] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] if latencies else float("nan"),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "cache_matches": dict(cache_matches)
+    }
+
+
+async def main_async(args, payloads: List[bytes]) -> Dict[str, Any]:
+    params = {"profile": args.profile}
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+    else:
+        transport = httpx.ASGITransport(app=build_app())
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout)
+
+    async with client:
+        if args.warmup:
+            await run_load(client, payloads, args.warmup, min(args.warmup, args.concurrency), params)
+        result = await run_load(client, payloads, args.requests, args.concurrency, params)
+        health = await client.get("/plant/disease/health")
+        if health.status_code == 200:
+            result["vision_executor"] = health.json().get("vision_executor")
+    result.update(rss_mb(args.pid))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--pid", type=int, help="Server process to sample RSS from when using --url")
+    parser.add_argument("--images", help="Directory of plant photos to upload")
+    parser.add_argument("--generate", type=int, default=8, help="Synthetic photos to generate if --images is not given")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=8)
+    parser.add_argument("--profile", default="full", choices=["triage", "standard", "full"])
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request, seconds")
+    parser.add_argument("--latency-ms", type=float, default=1500.0, help="Replay backend median latency (in-process)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Replay backend log-normal sigma (in-process)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Replay backend failure rate (in-process)")
+    parser.add_argument("--cache", action="store_true", help="Keep the diagnosis cache on (in-process)")
+    parser.add_argument("--json", action="store_true", help="Print only the JSON result")
+    args = parser.parse_args()
+
+    if not args.url:
+        # Configure the router before it is imported by build_app()
+        os.environ.setdefault("VISION_BACKEND", "replay")
+        os.environ["REPLAY_LATENCY_MS"] = str(args.latency_ms)
+        os.environ["REPLAY_LATENCY_SIGMA"] = str(args.latency_sigma)
+        os.environ["REPLAY_FAILURE_RATE"] = str(args.failure_rate)
+        if not args.cache:
+            os.environ["DIAGNOSIS_CACHE_SIZE"] = "0"
+            os.environ.pop("DIAGNOSIS_CACHE_DIR", None)
+            os.environ["IMAGE_STORE_MAX_BYTES"] = "0"
+        import logging
+        logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.images:
+            paths = sorted(
+                os.path.join(args.images, name) for name in os.listdir(args.images)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            paths = generate_corpus(tmp_dir, args.generate, size=(2016, 1512))
+        if not paths:
+            parser.error("no images found")
+        payloads = []
+        for path in paths:
+            with open(path, "rb") as f:
+                payloads.append(f.read())
+
+    result = asyncio.run(main_async(args, payloads))
+    if args.json:
+        print(json.dumps(result))
+        return
+
+    target = args.url or f"in-process, replay {args.latency_ms:g} ms (sigma {args.latency_sigma:g}), failure rate {args.failure_rate:g}"
+    print(f"📊 {args.requests} requests, concurrency {args.concurrency}, profile {args.profile}, {len(payloads)} images ({target})\n")
+    print(f"   throughput   {result['throughput_rps']:.2f} req/s over {result['elapsed_s']:.1f} s")
+    print(f"   latency      p50 {result['p50_ms']:.0f} ms   p95 {result['p95_ms']:.0f} ms   p99 {result['p99_ms']:.0f} ms   max {result['max_ms']:.0f} ms")
+    print(f"   statuses     {result['statuses']}")
+    print(f"   cache        {result['cache_matches']}")
+    if result["rss_mb"] is not None:
+        print(f"   worker RSS   {result['rss_mb']:.0f} MB (peak {result['peak_rss_mb']:.0f} MB)")
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Benchmark extract_structured_response against the previous if/elif line parser
+on the recorded Gemini responses in recorded_responses/, and check parity: the
+identification fields must match and every list item the old parser kept must
+still be extracted.
+
+Usage (from backend/):
+    python -m Plant_Disease.benchmark_response_parser
+    python -m Plant_Disease.benchmark_response_parser --responses path/to/dumps --iterations 2000
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from typing import Dict, Any, List
+
+from .response_parser import extract_structured_response, SCALAR_FIELDS
+
+RESPONSES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recorded_responses")
+
+
+def legacy_extract_structured_response(response_text: str) -> Dict[str, Any]:
+    """The line parser used before response_parser (kept verbatim for parity checks)"""
+    try:
+        # Try to extract JSON if present
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+        
+        # Fall back to text parsing with improved structure
+        lines = response_text.strip().split('\n')
+        result = {
+            "plant_type": "Unknown",
+            "condition": "Unknown",
+            "confidence": "Medium",
+            "identification_process": [],
+            "symptoms": [],
+            "causes": [],
+            "why_happens": [],
+            "impact_progression": [],
+            "immediate_actions": [],
+            "precautions": [],
+            "timeline": [],
+            "additional_tips": [],
+            "urgency_level": "Monitor",
+            "treatment": {
+                "organic": [],
+                "chemical": [],
+                "prevention": []
+            }
+        }
+        
+        current_section = None
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+                
+            # Check for structured section headers (with **)
+            if line.startswith('**') and line.endswith('**'):
+                header = line.replace('**', '').strip().lower()
+                if 'plant type' in header:
+                    current_section = 'plant_type'
+                elif 'specific condition' in header or 'condition' in header:
+                    current_section = 'condition'
+                elif 'confidence' in header:
+                    current_section = 'confidence'
+                elif 'how i identified' in header or 'identification' in header:
+                    current_section = 'identification_process'
+                elif 'detailed symptoms' in header or 'symptoms' in header:
+                    current_section = 'symptoms'
+                elif 'what causes' in header or 'causes' in header:
+                    current_section = 'causes'
+                elif 'why this happens' in header:
+                    current_section = 'why_happens'
+                elif 'impact and progression' in header:
+                    current_section = 'impact_progression'
+                elif 'immediate actions' in header:
+                    current_section = 'immediate_actions'
+                elif 'important precautions' in header or 'precautions' in header:
+                    current_section = 'precautions'
+                elif 'expected timeline' in header or 'timeline' in header:
+                    current_section = 'timeline'
+                elif 'additional tips' in header:
+                    current_section = 'additional_tips'
+                elif 'urgency level' in header or 'urgency' in header:
+                    current_section = 'urgency_level'
+                elif 'organic treatment' in header:
+                    current_section = 'organic'
+                elif 'chemical treatment' in header:
+                    current_section = 'chemical'
+                elif 'prevention and future care' in header or 'prevention' in header:
+                    current_section = 'prevention'
+                continue
+            
+            # Check for key-value pairs (with :)
+            if ':' in line and not line.startswith('-'):
+                key, value = line.split(':', 1)
+                key = key.strip().lower().replace('**', '')
+                value = value.strip().replace('[', '').replace(']', '')
+                
+                if 'plant type' in key:
+                    result["plant_type"] = value
+                elif 'specific condition' in key or 'condition' in key:
+                    result["condition"] = value
+                elif 'confidence' in key:
+                    result["confidence"] = value
+                elif 'urgency' in key:
+                    result["urgency_level"] = value
+                continue
+            
+            # Handle list items
+            if line.startswith('-') or line.startswith('•') or line.startswith('*'):
+                item = line[1:].strip()
+                if not item or item.startswith('[') and item.endswith(']'):
+                    continue
+                    
+                if current_section == 'identification_process':
+                    result["identification_process"].append(item)
+                elif current_section == 'symptoms':
+                    result["symptoms"].append(item)
+                elif current_section == 'causes':
+                    result["causes"].append(item)
+                elif current_section == 'why_happens':
+                    result["why_happens"].append(item)
+                elif current_section == 'impact_progression':
+                    result["impact_progression"].append(item)
+                elif current_section == 'immediate_actions':
+                    result["immediate_actions"].append(item)
+                elif current_section == 'precautions':
+                    result["precautions"].append(item)
+                elif current_section == 'timeline':
+                    result["timeline"].append(item)
+                elif current_section == 'additional_tips':
+                    result["additional_tips"].append(item)
+                elif current_section == 'organic':
+                    result["treatment"]["organic"].append(item)
+                elif current_section == 'chemical':
+                    result["treatment"]["chemical"].append(item)
+                elif current_section == 'prevention':
+                    result["treatment"]["prevention"].append(item)
+            
+            # Handle urgency level as text (not list item)
+            elif current_section == 'urgency_level' and line.strip():
+                result["urgency_level"] = line.strip()
+        
+        # Clean up empty bracket placeholders
+        if result["plant_type"] in ["[Name of the plant species, e.g., Tomato, Corn, Apple, etc.]", "Unknown"]:
+            result["plant_type"] = "Unknown Plant"
+        if result["condition"] in ["[Name the specific disease, pest, or condition - be specific, e.g., \"Tomato Late Blight\", \"Apple Scab\", \"Healthy Plant\", etc.]", "Unknown"]:
+            result["condition"] = "Unknown Condition"
+            
+        return result
+        
+    except Exception as e:
+        return {
+            "plant_type": "Unknown",
+            "condition": "Analysis Error",
+            "confidence": "Low",
+            "raw_response": response_text
+        }
+
+
+def list_items(result: Dict[str, Any]) -> List[str]:
+    items = []
+    for value in result.values():
+        if isinstance(value, list):
+            items.extend(value)
+        elif isinstance(value, dict):
+            items.extend(list_items(value))
+    return items
+
+
+def check_parity(name: str, legacy: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    problems = []
+    for field in sorted(SCALAR_FIELDS & legacy.keys()):
+        # The old parser left the closing "**" of "**Plant Type:** Tomato" in the value
+        if legacy[field].lstrip("* ") != current.get(field):
+            problems.append(f"{name}: {field} {legacy[field]!r} != {current.get(field)!r}")
+    missing = set(list_items(legacy)) - set(list_items(current))
+    for item in sorted(missing):
+        problems.append(f"{name}: item dropped: {item!r}")
+    return problems
+
+
+def time_parsers(parsers, texts: List[str], iterations: int, repeats: int = 7) -> List[float]:
+    """Best of several interleaved runs, to keep scheduler and frequency noise out of the comparison"""
+    best = [float("inf")] * len(parsers)
+    for _ in range(repeats):
+        for index, parse in enumerate(parsers):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for text in texts:
+                    parse(text)
+            best[index] = min(best[index], time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", default=RESPONSES_DIR, help="Directory of recorded response .txt files")
+    parser.add_argument("--iterations", type=int, default=200, help="Passes over the corpus per timed run")
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(args.responses) if name.endswith(".txt"))
+    texts = []
+    for name in names:
+        with open(os.path.join(args.responses, name), encoding="utf-8") as f:
+            texts.append(f.read())
+    total_kb = sum(len(text.encode("utf-8")) for text in texts) / 1024
+    print(f"📊 Corpus: {len(texts)} responses, {total_kb:.1f} KB, {args.iterations} passes per parser\n")
+
+    problems = []
+    print(f"{'response':<36}{'old items':>10}{'new items':>10}")
+    for name, text in zip(names, texts):
+        legacy = legacy_extract_structured_response(text)
+        current = extract_structured_response(text)
+        problems.extend(check_parity(name, legacy, current))
+        print(f"{name:<36}{len(list_items(legacy)):>10}{len(list_items(current)):>10}")
+
+    legacy_seconds, current_seconds = time_parsers(
+        (legacy_extract_structured_response, extract_structured_response), texts, args.iterations
+    )
+    parsed_mb = total_kb * args.iterations / 1024
+    print(f"\n{'parser':<10}{'total s':>10}{'MB/s':>10}{'us/response':>14}")
+    for label, seconds in (("legacy", legacy_seconds), ("current", current_seconds)):
+        per_response = seconds / (len(texts) * args.iterations) * 1e6
+        print(f"{label:<10}{seconds:>10.3f}{parsed_mb / seconds:>10.1f}{per_response:>14.1f}")
+    print(f"\n✅ Speedup: {legacy_seconds / current_seconds:.2f}x")
+
+    if problems:
+        print("\n❌ Parity problems:")
+        for problem in problems:
+            print(f"   {problem}")
+        raise SystemExit(1)
+    print("✅ Parity: identification fields match and no list item was dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import io
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def image_cache_key(image: Image.Image) -> str:
+    """Content hash of a normalized image (mode, size and raw pixel bytes)"""
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class DiagnosisCache:
+    """LRU + TTL cache of structured diagnoses with an optional on-disk tier"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 7 * 24 * 3600,
+                 disk_dir: Optional[str] = None, disk_prune_interval: int = 200):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_prune_interval = disk_prune_interval
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.error(f"Disabling on-disk diagnosis cache at {self.disk_dir}: {str(e)}")
+                self.disk_dir = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.disk_dir is not None
+
+    def _is_fresh(self, created: float) -> bool:
+        return self.ttl_seconds <= 0 or (time.time() - created) < self.ttl_seconds
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key: str, created: float, analysis: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (created, analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[Dict[str, Any]]:
+        """Return a cached analysis for the key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, analysis = entry
+                if self._is_fresh(created):
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return analysis
+                del self._entries[key]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if self._is_fresh(stored["created"]):
+                    self._remember(key, stored["created"], stored["analysis"])
+                    with self._lock:
+                        self.disk_hits += 1
+                    return stored["analysis"]
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable diagnosis cache entry {key}: {str(e)}")
+
+        if count_miss:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key: str, analysis: Dict[str, Any]) -> None:
+        """Store an analysis in memory and, if configured, on disk"""
+        created = time.time()
+        self._remember(key, created, analysis)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"created": created, "analysis": analysis}, f)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to persist diagnosis cache entry {key}: {str(e)}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+
+            with self._lock:
+                self._disk_writes += 1
+                should_prune = self._disk_writes % self.disk_prune_interval == 0
+            if should_prune:
+                self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Delete expired entries from the on-disk tier"""
+        if not self.disk_dir or self.ttl_seconds <= 0:
+            return 0
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            with os.scandir(self.disk_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                        try:
+                            os.remove(entry.path)
+                            removed += 1
+                        except OSError:
+                            pass
+        except OSError as e:
+            logger.warning(f"Failed to prune diagnosis cache directory: {str(e)}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the health endpoint"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": self.disk_dir is not None,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class ImageStore:
+    """Byte-bounded LRU of normalized images so a triaged upload can be re-analyzed later.
+
+    The optional disk tier is pruned every disk_prune_interval writes: images
+    older than ttl_seconds go first, then the oldest ones until the directory
+    is back under max_disk_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 jpeg_quality: int = 90, ttl_seconds: float = 7 * 24 * 3600,
+                 max_disk_bytes: int = 1024 * 1024 * 1024, disk_prune_interval: int = 200):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.jpeg_quality = jpeg_quality
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_prune_interval = disk_prune_interval
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.disk_pruned = 0
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.error(f"Disabling on-disk image store at {self.disk_dir}: {str(e)}")
+                self.disk_dir = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.disk_dir is not None
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.jpg")
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def put(self, key: str, image: Image.Image) -> None:
+        """Encode and keep an image (blocking; call from a worker thread)"""
+        if not self.enabled or self.contains(key):
+            return
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.jpeg_quality)
+        data = buffer.getvalue()
+        self._remember(key, data)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to persist image {key}: {str(e)}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+
+            with self._lock:
+                self._disk_writes += 1
+                should_prune = self._disk_writes % self.disk_prune_interval == 0
+            if should_prune:
+                self.prune_disk()
+
+    def _disk_fresh(self, path: str) -> bool:
+        try:
+            return self.ttl_seconds <= 0 or (time.time() - os.stat(path).st_mtime) < self.ttl_seconds
+        except OSError:
+            return False
+
+    def prune_disk(self) -> int:
+        """Delete expired images from the on-disk tier, then the oldest ones over max_disk_bytes"""
+        if not self.disk_dir:
+            return 0
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds > 0 else None
+        removed = 0
+        kept = []
+        try:
+            with os.scandir(self.disk_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".jpg"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                        if cutoff is not None and stat.st_mtime < cutoff:
+                            os.remove(entry.path)
+                            removed += 1
+                        else:
+                            kept.append((stat.st_mtime, stat.st_size, entry.path))
+                    except OSError:
+                        pass
+        except OSError as e:
+            logger.warning(f"Failed to prune image store directory: {str(e)}")
+            return removed
+
+        total = sum(size for _, size, _ in kept)
+        if self.max_disk_bytes > 0 and total > self.max_disk_bytes:
+            for _, size, path in sorted(kept):
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                    total -= size
+                except OSError:
+                    pass
+        with self._lock:
+            self.disk_pruned += removed
+        return removed
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.disk_dir) and self._disk_fresh(self._disk_path(key))
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        """Return the stored image, or None if it was never stored or has been evicted"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+
+        if data is None and self.disk_dir:
+            if not self._disk_fresh(self._disk_path(key)):
+                return None
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+                self._remember(key, data)
+            except OSError:
+                return None
+
+        if data is None:
+            return None
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "disk_tier": self.disk_dir is not None,
+                "ttl_seconds": self.ttl_seconds,
+                "max_disk_bytes": self.max_disk_bytes,
+                "disk_pruned": self.disk_pruned
+            }
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Export the 38-class Keras leaf model to TensorFlow Lite for the local classifier.
+
+TensorFlow is only needed on the machine running this export; the server loads
+the resulting .tflite file with ai-edge-litert / tflite-runtime.
+
+Usage (from backend/):
+    python Plant_Disease/export_local_model.py \
+        --model Plant_Disease/trained_model_savedmodel \
+        --output Plant_Disease/plant_disease.tflite --float16
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from local_classifier import CLASS_NAMES
+
+
+def convert(model_path: str, output_path: str, float16: bool) -> tf.keras.Model:
+    print(f"🔄 Loading Keras model from: {model_path}")
+    model = tf.keras.models.load_model(model_path)
+    print(f"   Input shape: {model.input_shape}, output shape: {model.output_shape}")
+    if model.output_shape[-1] != len(CLASS_NAMES):
+        raise ValueError(f"Model has {model.output_shape[-1]} outputs, expected {len(CLASS_NAMES)}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if float16:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    tflite_model = converter.convert()
+
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    print(f"✅ Wrote {output_path} ({len(tflite_model) / 1024 / 1024:.1f} MB)")
+    return model
+
+
+def verify(model: tf.keras.Model, output_path: str, samples: int, input_scale: float) -> None:
+    """Compare Keras and TFLite outputs on random inputs"""
+    interpreter = tf.lite.Interpreter(model_path=output_path)
+    interpreter.allocate_tensors()
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+    size = model.input_shape[1]
+
+    rng = np.random.default_rng(42)
+    max_diff = 0.0
+    agree = 0
+    for _ in range(samples):
+        batch = (rng.integers(0, 256, size=(1, size, size, 3)) * input_scale).astype(np.float32)
+        expected = model.predict(batch, verbose=0)[0]
+        interpreter.set_tensor(input_index, batch)
+        interpreter.invoke()
+        actual = interpreter.get_tensor(output_index)[0]
+        max_diff = max(max_diff, float(np.max(np.abs(expected - actual))))
+        agree += int(np.argmax(expected) == np.argmax(actual))
+
+    print(f"📊 Parity over {samples} random inputs: top-1 agreement {agree}/{samples}, max |diff| {max_diff:.6f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(os.path.dirname(__file__), "trained_model_savedmodel"),
+                        help="Keras model (.keras/.h5 file or SavedModel directory)")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "plant_disease.tflite"))
+    parser.add_argument("--float16", action="store_true", help="Store weights as float16 (about half the size)")
+    parser.add_argument("--verify-samples", type=int, default=16)
+    parser.add_argument("--input-scale", type=float, default=1.0 / 255.0,
+                        help="Scale applied to 0-255 pixels, must match LOCAL_MODEL_INPUT_SCALE")
+    args = parser.parse_args()
+
+    model = convert(args.model, args.output, args.float16)
+    if args.verify_samples > 0:
+        verify(model, args.output, args.verify_samples, args.input_scale)
+
+
+if __name__ == "__main__":
+    main()
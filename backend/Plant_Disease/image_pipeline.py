@@ -0,0 +1,105 @@
+import io
+import logging
+from typing import Union
+
+from PIL import Image
+
+from .diagnosis_cache import image_cache_key
+from .perceptual_hash import dhash
+
+# Kept free of router state so it can be imported cheaply by decode worker processes
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_SIZE = 1024
+
+EXIF_ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, so the decoder never copies the whole upload"""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        count = max(0, min(len(b), len(self._view) - self._pos))
+        b[:count] = self._view[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def open_buffer(image_bytes: Union[bytes, bytearray, memoryview]):
+    # BytesIO shares an immutable bytes object without copying; other buffers get a reader
+    if isinstance(image_bytes, bytes):
+        return io.BytesIO(image_bytes)
+    return BufferReader(image_bytes)
+
+
+def process_image_for_gemini(image_bytes: Union[bytes, bytearray, memoryview]) -> Image.Image:
+    """Process image for optimal Gemini analysis"""
+    try:
+        image = Image.open(open_buffer(image_bytes))
+        orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+
+        # Keep aspect ratio and cap the longest side
+        new_size = image.size
+        if max(image.size) > MAX_IMAGE_SIZE:
+            ratio = MAX_IMAGE_SIZE / max(image.size)
+            new_size = tuple(int(dim * ratio) for dim in image.size)
+            # JPEG can decode at 1/2, 1/4 or 1/8 scale; pick the smallest that still covers new_size
+            if image.format == "JPEG":
+                image.draft("RGB", new_size)
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        if image.size != new_size:
+            # reducing_gap does a cheap integer box reduction before the LANCZOS pass
+            image = image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        # Rotate after resizing so the transpose touches as few pixels as possible
+        if orientation in ORIENTATION_TRANSPOSE:
+            image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+
+        # Drop EXIF (GPS, device details) and other metadata carried over from the upload
+        image.info = {}
+
+        logger.info(f"Processed image size: {image.size}")
+        return image
+
+    except Exception as e:
+        logger.error(f"Error processing image: {str(e)}")
+        raise
+
+
+def prepare_image(image_bytes: Union[bytes, bytearray, memoryview]):
+    """Decode an upload and compute its exact and perceptual cache keys (runs in the decode pool)"""
+    image = process_image_for_gemini(image_bytes)
+    return image, image_cache_key(image), dhash(image)
@@ -0,0 +1,152 @@
+import os
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Output order of the 38-class PlantVillage leaf model in trained_model_savedmodel/
+CLASS_NAMES = [
+    "Apple___Apple_scab", "Apple___Black_rot", "Apple___Cedar_apple_rust", "Apple___healthy",
+    "Blueberry___healthy", "Cherry_(including_sour)___Powdery_mildew", "Cherry_(including_sour)___healthy",
+    "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot", "Corn_(maize)___Common_rust_", "Corn_(maize)___Northern_Leaf_Blight",
+    "Corn_(maize)___healthy", "Grape___Black_rot", "Grape___Esca_(Black_Measles)",
+    "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)", "Grape___healthy",
+    "Orange___Haunglongbing_(Citrus_greening)", "Peach___Bacterial_spot", "Peach___healthy",
+    "Pepper,_bell___Bacterial_spot", "Pepper,_bell___healthy", "Potato___Early_blight", "Potato___Late_blight",
+    "Potato___healthy", "Raspberry___healthy", "Soybean___healthy", "Squash___Powdery_mildew",
+    "Strawberry___Leaf_scorch", "Strawberry___healthy", "Tomato___Bacterial_spot", "Tomato___Early_blight",
+    "Tomato___Late_blight", "Tomato___Leaf_Mold", "Tomato___Septoria_leaf_spot",
+    "Tomato___Spider_mites Two-spotted_spider_mite", "Tomato___Target_Spot",
+    "Tomato___Tomato_Yellow_Leaf_Curl_Virus", "Tomato___Tomato_mosaic_virus", "Tomato___healthy"
+]
+
+
+def _load_interpreter_class():
+    """Find a TFLite interpreter, preferring the standalone runtimes over full TensorFlow"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+    except ImportError:
+        return None
+
+
+def readable_class_name(class_name: str):
+    """Split 'Tomato___Late_blight' into ('Tomato', 'Tomato Late Blight')"""
+    plant, _, disease = class_name.partition("___")
+    plant = plant.replace("_", " ").replace(",", "").strip()
+    disease = disease.replace("_", " ").strip()
+    if disease.lower() == "healthy":
+        return plant, f"Healthy {plant}"
+    return plant, f"{plant} {disease.title()}"
+
+
+class LocalClassifier:
+    """On-box CPU leaf classifier running the exported TFLite model"""
+
+    def __init__(self, model_path: str, input_size: int = 128, input_scale: float = 1.0 / 255.0,
+                 num_threads: int = 2):
+        self.model_path = model_path
+        self.input_size = input_size
+        self.input_scale = input_scale
+        self.num_threads = num_threads
+        self._interpreter = None
+        self._input_index = None
+        self._output_index = None
+        # TFLite interpreters are not thread-safe
+        self._lock = threading.Lock()
+        self.error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self._interpreter is not None
+
+    def load(self) -> bool:
+        """Load the TFLite model; returns False (and records why) if it cannot be used"""
+        if not os.path.exists(self.model_path):
+            self.error = f"Model file not found at {self.model_path}"
+            return False
+        interpreter_class = _load_interpreter_class()
+        if interpreter_class is None:
+            self.error = "No TFLite runtime installed (ai-edge-litert or tflite-runtime)"
+            return False
+        try:
+            interpreter = interpreter_class(model_path=self.model_path, num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            input_details = interpreter.get_input_details()[0]
+            output_details = interpreter.get_output_details()[0]
+            if output_details["shape"][-1] != len(CLASS_NAMES):
+                raise ValueError(f"Model has {output_details['shape'][-1]} outputs, expected {len(CLASS_NAMES)}")
+        except Exception as e:
+            self.error = f"Failed to load local model: {str(e)}"
+            return False
+
+        self._input_index = input_details["index"]
+        self._output_index = output_details["index"]
+        self._interpreter = interpreter
+        self.error = None
+        return True
+
+    def classify(self, image: Image.Image, top_k: int = 5) -> Dict[str, Any]:
+        """Classify a leaf image and return an analysis dict shaped like the Gemini one (blocking)"""
+        if self._interpreter is None:
+            raise ValueError("Local classifier not loaded")
+
+        resized = image.convert("RGB").resize((self.input_size, self.input_size))
+        input_arr = np.asarray(resized, dtype=np.float32)[np.newaxis, ...] * self.input_scale
+
+        with self._lock:
+            self._interpreter.set_tensor(self._input_index, input_arr)
+            self._interpreter.invoke()
+            prediction = self._interpreter.get_tensor(self._output_index)[0].astype(np.float64)
+
+        if not np.isclose(prediction.sum(), 1.0, atol=1e-3) or prediction.min() < 0:
+            exp = np.exp(prediction - prediction.max())
+            prediction = exp / exp.sum()
+
+        top_indices = np.argsort(prediction)[::-1][:top_k]
+        top_predictions: List[Dict[str, Any]] = [
+            {"class": CLASS_NAMES[i], "probability": round(float(prediction[i]), 4)} for i in top_indices
+        ]
+        top_probability = float(prediction[top_indices[0]])
+        class_name = CLASS_NAMES[top_indices[0]]
+        plant_type, condition = readable_class_name(class_name)
+        healthy = class_name.endswith("___healthy")
+
+        if top_probability >= 0.9:
+            confidence = "High"
+        elif top_probability >= 0.6:
+            confidence = "Medium"
+        else:
+            confidence = "Low"
+
+        return {
+            "plant_type": plant_type,
+            "condition": condition,
+            "confidence": confidence,
+            "confidence_score": round(top_probability * 100, 2),
+            "urgency_level": "Monitor" if healthy else "Medium",
+            "top_predictions": top_predictions,
+            "model_type": "local_classifier",
+            "profile": "triage"
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "model_path": self.model_path,
+            "error": self.error
+        }
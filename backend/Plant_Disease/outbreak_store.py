@@ -0,0 +1,228 @@
+import os
+import sys
+import math
+import json
+import time
+import queue
+import bisect
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def normalize_label(text: str) -> str:
+    """'Tomato (Solanum lycopersicum), early fruiting' -> 'Tomato', so reports group by disease"""
+    for separator in (" (", ",", " - "):
+        text = text.split(separator, 1)[0]
+    return text.strip() or "Unknown"
+
+
+class OutbreakStore:
+    """Append-only log of diagnoses with a lat/lon grid index for regional queries.
+
+    Records are [timestamp, lat, lon, plant_type, condition, urgency] lines in an
+    NDJSON file, written by a background thread so requests never wait on disk.
+    In memory each grid cell keeps its records in time order, so a query only
+    visits the cells overlapping the search circle and bisects to the time window.
+    """
+
+    def __init__(self, path: Optional[str] = None, cell_km: float = 10.0, retention_days: float = 90.0):
+        self.path = path
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.retention_seconds = retention_days * 86400
+        self._cells: Dict[Tuple[int, int], Tuple[List[float], List[list]]] = defaultdict(lambda: ([], []))
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.records = 0
+        self._adds = 0
+        self.written = 0
+        self.write_errors = 0
+        self._writer = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._load()
+            self._writer = threading.Thread(target=self._write_loop, name="outbreak-writer", daemon=True)
+            self._writer.start()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def _index(self, record: list) -> None:
+        timestamps, records = self._cells[self._cell(record[1], record[2])]
+        if timestamps and record[0] < timestamps[-1]:
+            position = bisect.bisect_right(timestamps, record[0])
+            timestamps.insert(position, record[0])
+            records.insert(position, record)
+        else:
+            timestamps.append(record[0])
+            records.append(record)
+        self.records += 1
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        cutoff = time.time() - self.retention_seconds
+        kept = expired = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record[0] < cutoff:
+                    expired += 1
+                    continue
+                record[3:] = [sys.intern(label) for label in record[3:]]
+                self._index(record)
+                kept += 1
+        logger.info(f"📍 Loaded {kept} disease reports from {self.path}")
+        if expired > kept:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the log without expired records (startup only, before the writer runs)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for _, records in self._cells.values():
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _write_loop(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            # Drain whatever else is queued so bursts become one write
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = None in lines
+            lines = [line for line in lines if line is not None]
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("".join(lines))
+                    self.written += len(lines)
+                except OSError as e:
+                    self.write_errors += len(lines)
+                    logger.error(f"Failed to append disease reports: {str(e)}")
+            if closing:
+                return
+
+    def add(self, lat: float, lon: float, plant_type: str, condition: str, urgency: str,
+            timestamp: Optional[float] = None) -> None:
+        """Index a diagnosis immediately and queue it for the log (non-blocking)"""
+        # Interned labels are shared between the many records of the same disease
+        record = [round(timestamp or time.time(), 3), round(lat, 5), round(lon, 5),
+                  sys.intern(normalize_label(plant_type)), sys.intern(normalize_label(condition)), sys.intern(urgency)]
+        with self._lock:
+            self._index(record)
+        self._adds += 1
+        if self._adds % 4096 == 0:
+            self.prune()
+        if self._writer is not None:
+            self._queue.put(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def query(self, lat: float, lon: float, radius_km: float, days: float,
+              plant_type: Optional[str] = None, include_healthy: bool = False) -> Dict[str, Any]:
+        """Reports within radius_km of (lat, lon) over the last `days` days, grouped by condition"""
+        since = time.time() - days * 86400
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + lat_span)))))
+        lat_lo, lon_lo = self._cell(lat - lat_span, lon - lon_span)
+        lat_hi, lon_hi = self._cell(lat + lat_span, lon + lon_span)
+        plant_filter = plant_type.lower() if plant_type else None
+
+        groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        total = 0
+        cells_scanned = 0
+        with self._lock:
+            for lat_index in range(lat_lo, lat_hi + 1):
+                for lon_index in range(lon_lo, lon_hi + 1):
+                    cell = self._cells.get((lat_index, lon_index))
+                    if cell is None:
+                        continue
+                    cells_scanned += 1
+                    timestamps, records = cell
+                    for record in records[bisect.bisect_left(timestamps, since):]:
+                        timestamp, record_lat, record_lon, record_plant, condition, urgency = record
+                        if plant_filter and plant_filter not in record_plant.lower():
+                            continue
+                        if not include_healthy and "healthy" in condition.lower():
+                            continue
+                        distance = haversine_km(lat, lon, record_lat, record_lon)
+                        if distance > radius_km:
+                            continue
+                        total += 1
+                        group = groups.get((record_plant, condition))
+                        if group is None:
+                            group = groups[(record_plant, condition)] = {
+                                "plant_type": record_plant,
+                                "condition": condition,
+                                "count": 0,
+                                "urgency_counts": defaultdict(int),
+                                "first_seen": timestamp,
+                                "last_seen": timestamp,
+                                "nearest_km": distance
+                            }
+                        group["count"] += 1
+                        group["urgency_counts"][urgency] += 1
+                        group["first_seen"] = min(group["first_seen"], timestamp)
+                        group["last_seen"] = max(group["last_seen"], timestamp)
+                        group["nearest_km"] = min(group["nearest_km"], distance)
+
+        outbreaks = sorted(groups.values(), key=lambda g: (-g["count"], -g["last_seen"]))
+        for group in outbreaks:
+            group["urgency_counts"] = dict(group["urgency_counts"])
+            group["nearest_km"] = round(group["nearest_km"], 2)
+        return {"total_reports": total, "cells_scanned": cells_scanned, "outbreaks": outbreaks}
+
+    def prune(self) -> int:
+        """Drop expired records from memory; the log keeps them until the next startup compaction"""
+        cutoff = time.time() - self.retention_seconds
+        dropped = 0
+        with self._lock:
+            for key in list(self._cells):
+                timestamps, records = self._cells[key]
+                position = bisect.bisect_left(timestamps, cutoff)
+                if position:
+                    del timestamps[:position]
+                    del records[:position]
+                    dropped += position
+                if not timestamps:
+                    del self._cells[key]
+            self.records -= dropped
+        return dropped
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "cells": len(self._cells),
+            "cell_km": round(self.cell_deg * KM_PER_DEGREE, 2),
+            "retention_days": self.retention_seconds / 86400,
+            "path": self.path,
+            "pending_writes": self._queue.qsize(),
+            "written": self.written,
+            "write_errors": self.write_errors
+        }
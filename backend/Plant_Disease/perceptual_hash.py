@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+HASH_BITS = 64
+# Flat, blank or overexposed frames hash to (almost) all zeros or all ones and would
+# all match each other; hashes with fewer minority bits than this carry too little detail
+DEFAULT_MIN_HASH_BITS = 8
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: compares horizontally adjacent pixels of a 9x8 thumbnail"""
+    thumbnail = image.resize((9, 8), Image.Resampling.BOX).convert("L")
+    pixels = list(thumbnail.getdata())
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class PerceptualHashIndex:
+    """Near-duplicate lookup over 64-bit image hashes using multi-index hashing.
+
+    The hash is split into ``max_distance + 1`` disjoint bit ranges. By the
+    pigeonhole principle any hash within ``max_distance`` bits of the query
+    matches it exactly on at least one range, so a lookup only verifies the
+    few entries that share a bucket instead of scanning the whole index.
+    Each entry points at a diagnosis cache key; analyses themselves live in
+    the diagnosis cache.
+    """
+
+    def __init__(self, max_distance: int = 4, max_entries: int = 50000, min_bits: int = DEFAULT_MIN_HASH_BITS):
+        self.max_distance = max(0, min(max_distance, HASH_BITS - 1))
+        self.max_entries = max_entries
+        self.min_bits = min_bits
+        chunks = self.max_distance + 1
+        bounds = [round(i * HASH_BITS / chunks) for i in range(chunks + 1)]
+        self._ranges: List[Tuple[int, int]] = [
+            (bounds[i], (1 << (bounds[i + 1] - bounds[i])) - 1) for i in range(chunks)
+        ]
+        self._tables: List[Dict[int, set]] = [{} for _ in range(chunks)]
+        self._entries: "OrderedDict[int, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.low_detail = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def informative(self, value: int) -> bool:
+        """Whether a hash has enough set and unset bits to tell images apart"""
+        ones = value.bit_count()
+        return min(ones, HASH_BITS - ones) >= self.min_bits
+
+    def _chunks(self, value: int):
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            yield table, (value >> shift) & mask
+
+    def add(self, value: int, cache_key: str) -> None:
+        """Register a hash for a cached diagnosis, evicting the oldest entry when full"""
+        if not self.enabled or not self.informative(value):
+            return
+        with self._lock:
+            if value in self._entries:
+                self._entries[value] = cache_key
+                self._entries.move_to_end(value)
+                return
+            self._entries[value] = cache_key
+            for table, chunk in self._chunks(value):
+                table.setdefault(chunk, set()).add(value)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._discard_chunks(evicted)
+
+    def _discard_chunks(self, value: int) -> None:
+        for table, chunk in self._chunks(value):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del table[chunk]
+
+    def remove(self, value: int) -> None:
+        with self._lock:
+            if self._entries.pop(value, None) is not None:
+                self._discard_chunks(value)
+
+    def find(self, value: int) -> Optional[Tuple[int, str, int]]:
+        """Return (hash, cache_key, distance) of the closest indexed hash within max_distance"""
+        if not self.enabled:
+            return None
+        if not self.informative(value):
+            with self._lock:
+                self.low_detail += 1
+            return None
+        with self._lock:
+            best_value, best_distance = None, self.max_distance + 1
+            for table, chunk in self._chunks(value):
+                for candidate in table.get(chunk, ()):
+                    distance = (candidate ^ value).bit_count()
+                    if distance < best_distance:
+                        best_value, best_distance = candidate, distance
+                        if distance == 0:
+                            break
+            if best_value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_value)
+            return best_value, self._entries[best_value], best_distance
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "min_bits": self.min_bits,
+                "hits": self.hits,
+                "misses": self.misses,
+                "low_detail_skipped": self.low_detail
+            }
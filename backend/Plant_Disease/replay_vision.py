@@ -0,0 +1,124 @@
+import os
+import time
+import random
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RESPONSES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recorded_responses")
+
+
+class ReplayUpstreamError(Exception):
+    """Injected failure standing in for a Gemini error response"""
+
+
+class ReplayResponse:
+    """The parts of a Gemini GenerateContentResponse that the router reads"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates: List[Any] = []
+
+
+class ReplayVisionModel:
+    """Stand-in for gemini_model that replays recorded responses, for load testing without quota.
+
+    Responses come from recorded_responses/<profile>_*.txt and are chosen by the
+    prompt of the request. Latency is log-normal around latency_ms (sigma 0 gives
+    a fixed latency) and failure_rate of the calls raise ReplayUpstreamError.
+    """
+
+    def __init__(self, responses_dir: str = RESPONSES_DIR, latency_ms: float = 2000.0,
+                 latency_sigma: float = 0.5, failure_rate: float = 0.0, stream_chunks: int = 8,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self._random = random.Random(seed)
+        self._profile_for_prompt: Dict[str, str] = {}
+        self.calls = 0
+        self.failures = 0
+
+        self.responses: Dict[str, List[str]] = {}
+        for name in sorted(os.listdir(responses_dir)):
+            if name.endswith(".txt"):
+                with open(os.path.join(responses_dir, name), encoding="utf-8") as f:
+                    self.responses.setdefault(name.split("_", 1)[0], []).append(f.read())
+        if not self.responses:
+            raise ValueError(f"No recorded responses found in {responses_dir}")
+
+    @classmethod
+    def from_env(cls) -> "ReplayVisionModel":
+        seed = os.getenv("REPLAY_SEED")
+        return cls(
+            responses_dir=os.getenv("REPLAY_RESPONSES_DIR", RESPONSES_DIR),
+            latency_ms=float(os.getenv("REPLAY_LATENCY_MS", "2000")),
+            latency_sigma=float(os.getenv("REPLAY_LATENCY_SIGMA", "0.5")),
+            failure_rate=float(os.getenv("REPLAY_FAILURE_RATE", "0")),
+            seed=int(seed) if seed else None
+        )
+
+    def bind_prompts(self, prompts: Dict[str, str]) -> None:
+        """Map each analysis profile's prompt to the profile whose recordings answer it"""
+        self._profile_for_prompt = {prompt: profile for profile, prompt in prompts.items()}
+
+    def _pick_response(self, contents) -> str:
+        prompt = contents[0] if isinstance(contents, (list, tuple)) and contents else contents
+        profile = self._profile_for_prompt.get(prompt, "full")
+        candidates = self.responses.get(profile) or self.responses.get("full") or next(iter(self.responses.values()))
+        return self._random.choice(candidates)
+
+    def _latency_seconds(self) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        return self._random.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000
+
+    def generate_content(self, contents, generation_config=None, stream: bool = False,
+                         request_options: Optional[Dict[str, Any]] = None):
+        """Blocking, like the SDK call it replaces; honours request_options["timeout"]"""
+        self.calls += 1
+        latency = self._latency_seconds()
+        timeout = (request_options or {}).get("timeout")
+        failed = self._random.random() < self.failure_rate
+        text = self._pick_response(contents)
+
+        if stream:
+            return self._stream(text, latency, timeout, failed)
+
+        time.sleep(min(latency, timeout) if timeout else latency)
+        if timeout and latency > timeout:
+            self.failures += 1
+            raise ReplayUpstreamError(f"504 Deadline exceeded after {timeout:g}s (replayed)")
+        if failed:
+            self.failures += 1
+            raise ReplayUpstreamError("503 The model is overloaded. Please try again later. (replayed)")
+        return ReplayResponse(text)
+
+    def _stream(self, text: str, latency: float, timeout: Optional[float], failed: bool):
+        # Spread the latency over the chunks; an injected failure happens midway through
+        size = max(1, len(text) // self.stream_chunks)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        elapsed = 0.0
+        for index, chunk in enumerate(chunks):
+            step = latency / len(chunks)
+            if timeout and elapsed + step > timeout:
+                self.failures += 1
+                raise ReplayUpstreamError(f"504 Deadline exceeded after {timeout:g}s (replayed)")
+            time.sleep(step)
+            elapsed += step
+            if failed and index >= len(chunks) // 2:
+                self.failures += 1
+                raise ReplayUpstreamError("503 The model is overloaded. Please try again later. (replayed)")
+            yield ReplayResponse(chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": self.latency_ms,
+            "latency_sigma": self.latency_sigma,
+            "failure_rate": self.failure_rate,
+            "calls": self.calls,
+            "failures": self.failures,
+            "recorded_responses": {profile: len(texts) for profile, texts in self.responses.items()}
+        }
@@ -0,0 +1,204 @@
+import re
+import json
+import logging
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Header keywords -> result field, checked in order so the more specific headers win
+# (e.g. "Similar Diseases to Rule Out" before "How I Diagnosed This Disease").
+SCALAR_SECTIONS = (
+    (("plant type",), "plant_type"),
+    (("overall health", "health status"), "overall_health"),
+    (("urgency",), "urgency_level"),
+    (("confidence",), "confidence"),
+    (("specific condition", "condition"), "condition"),
+)
+LIST_SECTIONS = (
+    (("similar disease", "rule out", "differential"), "differential_diagnosis"),
+    (("visual analysis", "what i see"), "visual_analysis"),
+    (("how i identified", "how i diagnosed", "identification", "diagnos"), "identification_process"),
+    (("symptom",), "symptoms"),
+    (("biology", "pathology"), "biology"),
+    (("why this happens",), "why_happens"),
+    (("what causes", "causes", "contributing factors"), "causes"),
+    (("impact",), "impact_progression"),
+    (("recovery",), "recovery_monitoring"),
+    (("timeline",), "timeline"),
+    (("immediate action", "emergency response"), "immediate_actions"),
+    (("organic",), "organic"),
+    (("chemical",), "chemical"),
+    (("integrated management",), "integrated_management"),
+    (("prevention",), "prevention"),
+    (("safety",), "safety"),
+    (("precaution",), "precautions"),
+    (("professional",), "professional_recommendations"),
+    (("environmental modification",), "environmental_modifications"),
+    (("economic",), "economics"),
+    (("research", "latest development"), "research"),
+    (("regional",), "regional"),
+    (("additional tips",), "additional_tips"),
+)
+TREATMENT_SECTIONS = ("organic", "chemical", "prevention")
+SECTION_TABLE = SCALAR_SECTIONS + LIST_SECTIONS
+SCALAR_FIELDS = {field for _, field in SCALAR_SECTIONS}
+LIST_FIELDS = tuple(field for _, field in LIST_SECTIONS if field not in TREATMENT_SECTIONS)
+
+SCALAR_DEFAULTS = {
+    "plant_type": "Unknown",
+    "condition": "Unknown",
+    "confidence": "Medium",
+    "overall_health": "Unknown",
+    "urgency_level": "Monitor"
+}
+
+BULLET_MARKS = "-•*"
+JSON_DECODER = json.JSONDecoder()
+NUMBERED_ITEM = re.compile(r"\d{1,2}[.)]\s+")
+PLACEHOLDER_PLANT = "[Name of the plant species, e.g., Tomato, Corn, Apple, etc.]"
+PLACEHOLDER_CONDITION = "[Name the specific disease, pest, or condition - be specific, e.g., \"Tomato Late Blight\", \"Apple Scab\", \"Healthy Plant\", etc.]"
+
+
+@lru_cache(maxsize=512)
+def resolve_section(header: str) -> Optional[str]:
+    """Map a section header to its result field, or None if the prompt never asks for it"""
+    header = header.strip(" \t*#:").lower()
+    if not header:
+        return None
+    for keywords, field in SECTION_TABLE:
+        if any(keyword in header for keyword in keywords):
+            return field
+    return None
+
+
+def empty_result() -> Dict[str, Any]:
+    result: Dict[str, Any] = dict(SCALAR_DEFAULTS)
+    result.update(zip(LIST_FIELDS, ([] for _ in LIST_FIELDS)))
+    result["treatment"] = {"organic": [], "chemical": [], "prevention": []}
+    return result
+
+
+def extract_json(response_text: str) -> Optional[Dict[str, Any]]:
+    """Decode the first JSON object in the response (triage answers, fenced or not)"""
+    start = response_text.find("{")
+    if start < 0:
+        return None
+    try:
+        value, _ = JSON_DECODER.raw_decode(response_text, start)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def split_bold_header(line: str):
+    """Split "**Header**: rest", "**Header:** rest" or "**Header: rest**" into (header, rest)"""
+    end = line.find("**", 2)
+    if end <= 2:
+        return None, ""
+    header, _, inline = line[2:end].partition(":")
+    rest = line[end + 2:].lstrip(" :")
+    return header, f"{inline.strip()} {rest}".strip() if inline else rest
+
+
+class SectionParser:
+    """Line-by-line state machine behind extract_structured_response.
+
+    feed() takes one line at a time, so a streamed response can be parsed as
+    its lines complete instead of re-parsing everything received so far.
+    """
+
+    def __init__(self):
+        self.result = empty_result()
+        # List the current section's items go to, or the identification field awaiting its value
+        self.target = None
+        self.pending_field = None
+
+    def feed(self, line: str) -> None:
+        result = self.result
+        line = line.strip()
+        if not line:
+            return
+
+        # Dispatch on the first character: bullet item, header, or plain text
+        first = line[0]
+        header = item = None
+        if first == "*" and line.startswith("**"):
+            header, rest = split_bold_header(line)
+        elif first in BULLET_MARKS:
+            item = line[1:].strip()
+        elif first == "#":
+            line = line.lstrip("#").strip()
+            header, rest = split_bold_header(line) if line.startswith("**") else (line, "")
+        elif first.isdigit():
+            numbered = NUMBERED_ITEM.match(line)
+            if numbered:
+                item = line[numbered.end():]
+
+        if header is not None:
+            field = resolve_section(header)
+            if field is None:
+                # Headers the prompt never asks for (sub-headings) keep the current section
+                return
+            if field in SCALAR_FIELDS:
+                if rest:
+                    result[field] = rest.replace("[", "").replace("]", "")
+                else:
+                    self.pending_field = field
+                self.target = None
+                return
+            self.target = result["treatment"][field] if field in TREATMENT_SECTIONS else result[field]
+            self.pending_field = None
+            item = rest
+        elif item is None:
+            if self.pending_field is not None:
+                # Text under a bare "**Urgency Level**" style header
+                result[self.pending_field] = line
+                self.pending_field = None
+                return
+            # Plain "Key: value" lines only fill identification fields not seen yet
+            key, colon, value = line.partition(":")
+            if colon and len(key) <= 60:
+                field = resolve_section(key)
+                if field in SCALAR_FIELDS and result[field] == SCALAR_DEFAULTS[field]:
+                    result[field] = value.strip().replace("[", "").replace("]", "")
+            return
+
+        if self.target is not None and item and not (item[0] == "[" and item[-1] == "]"):
+            self.target.append(item)
+
+    def scalar(self, field: str) -> Any:
+        """An identification field with empty bracket placeholders cleaned up"""
+        value = self.result[field]
+        if field == "plant_type" and value in (PLACEHOLDER_PLANT, "Unknown"):
+            return "Unknown Plant"
+        if field == "condition" and value in (PLACEHOLDER_CONDITION, "Unknown"):
+            return "Unknown Condition"
+        return value
+
+    def finish(self) -> Dict[str, Any]:
+        self.result["plant_type"] = self.scalar("plant_type")
+        self.result["condition"] = self.scalar("condition")
+        return self.result
+
+
+def extract_structured_response(response_text: str) -> Dict[str, Any]:
+    """Extract structured information from Gemini's response"""
+    try:
+        structured = extract_json(response_text)
+        if structured is not None:
+            return structured
+
+        parser = SectionParser()
+        for line in response_text.splitlines():
+            parser.feed(line)
+        return parser.finish()
+
+    except Exception as e:
+        logger.error(f"Error extracting structured response: {str(e)}")
+        return {
+            "plant_type": "Unknown",
+            "condition": "Analysis Error",
+            "confidence": "Low",
+            "raw_response": response_text
+        }
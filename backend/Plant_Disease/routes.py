@@ -1,7 +1,7 @@
 import os
 import base64
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from PIL import Image
 import io
 import json
@@ -9,7 +9,23 @@ import re
 import google.generativeai as genai
 from dotenv import load_dotenv
 import logging
-from typing import Dict, Any
+import asyncio
+import hashlib
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from .diagnosis_cache import DiagnosisCache, ImageStore
+from .perceptual_hash import PerceptualHashIndex
+from .vision_executor import VisionExecutor, VisionTimeoutError, VisionUnavailableError
+from .local_classifier import LocalClassifier
+from .image_pipeline import process_image_for_gemini, prepare_image
+from .upload_reader import read_image_upload, UploadRejected
+from .response_parser import extract_structured_response, extract_json, SectionParser
+from .replay_vision import ReplayVisionModel
+from .outbreak_store import OutbreakStore
+from model_registry import registry, ModelSpec
 
 # Load environment variables
 load_dotenv()
@@ -20,194 +36,157 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/disease", tags=["Plant Disease"])
 
-# Initialize Gemini API
-try:
-    google_api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-    if not google_api_key:
-        raise ValueError("No Google API key found in environment variables")
+# Initialize Gemini API. VISION_BACKEND=replay serves recorded responses instead,
+# so load tests can run without spending Gemini quota.
+VISION_BACKEND = os.getenv("VISION_BACKEND", "gemini")
+if VISION_BACKEND == "replay":
+    gemini_model = ReplayVisionModel.from_env()
+    logger.warning("⚠️ VISION_BACKEND=replay: answering with recorded vision responses, not Gemini")
+else:
+    try:
+        google_api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+        if not google_api_key:
+            raise ValueError("No Google API key found in environment variables")
     
-    genai.configure(api_key=google_api_key)
-    gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-    logger.info("✅ Gemini Vision API initialized successfully")
+        genai.configure(api_key=google_api_key)
+        gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+        logger.info("✅ Gemini Vision API initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize Gemini API: {str(e)}")
+        gemini_model = None
+
+# On-box leaf classifier answers first; Gemini is only called when it is unsure.
+# It loads through the shared registry, so a new export can be hot-swapped in.
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", os.path.join(os.path.dirname(__file__), "plant_disease.tflite"))
+LOCAL_MODEL_INPUT_SCALE = float(os.getenv("LOCAL_MODEL_INPUT_SCALE", str(1.0 / 255.0)))
+LOCAL_MODEL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_MODEL_CONFIDENCE_THRESHOLD", "0.85"))
+
+def load_local_classifier(path: str) -> LocalClassifier:
+    """TFLite maps the model file itself, so loading only parses the flatbuffer"""
+    classifier = LocalClassifier(model_path=path, input_scale=LOCAL_MODEL_INPUT_SCALE)
+    if not classifier.load():
+        raise RuntimeError(classifier.error)
+    return classifier
+
+registry.register(ModelSpec(
+    "plant_disease_classifier",
+    os.path.basename(LOCAL_MODEL_PATH),
+    load_local_classifier,
+    repo_id=os.getenv("LOCAL_MODEL_REPO"),
+    local_paths=[LOCAL_MODEL_PATH]
+))
+# Stands in (with available=False and the reason in stats()) while no model is loaded
+disabled_classifier = LocalClassifier(model_path=LOCAL_MODEL_PATH, input_scale=LOCAL_MODEL_INPUT_SCALE)
+def current_classifier() -> LocalClassifier:
+    return registry.get("plant_disease_classifier") or disabled_classifier
+
+try:
+    registry.load("plant_disease_classifier")
+    logger.info(f"✅ Local plant disease classifier loaded from {current_classifier().model_path}")
 except Exception as e:
-    logger.error(f"Failed to initialize Gemini API: {str(e)}")
-    gemini_model = None
+    disabled_classifier.error = str(e)
+    logger.warning(f"Local plant disease classifier disabled: {disabled_classifier.error}")
 
-def process_image_for_gemini(image_bytes: bytes) -> Image.Image:
-    """Process image for optimal Gemini analysis"""
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Resize for optimal processing (Gemini works well with various sizes)
-        # Keep aspect ratio and ensure reasonable size
-        max_size = 1024
-        if max(image.size) > max_size:
-            ratio = max_size / max(image.size)
-            new_size = tuple(int(dim * ratio) for dim in image.size)
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        logger.info(f"Processed image size: {image.size}")
-        return image
-        
-    except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
-        raise
+# Gemini calls are blocking; run them on a bounded pool so the event loop stays free.
+# The concurrency limit backs off when calls get slower than the target latency, and
+# the circuit breaker fails fast (to the cached or local answer) while Gemini is erroring.
+vision_executor = VisionExecutor(
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+    timeout_seconds=float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60")),
+    min_concurrency=int(os.getenv("GEMINI_MIN_CONCURRENCY", "1")),
+    target_latency_seconds=float(os.getenv("GEMINI_TARGET_LATENCY_SECONDS", "30")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "32")),
+    failure_threshold=int(os.getenv("GEMINI_CIRCUIT_FAILURES", "5")),
+    reset_seconds=float(os.getenv("GEMINI_CIRCUIT_RESET_SECONDS", "30"))
+)
 
-def extract_structured_response(response_text: str) -> Dict[str, Any]:
-    """Extract structured information from Gemini's response"""
-    try:
-        # Try to extract JSON if present
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
-        
-        # Fall back to text parsing with improved structure
-        lines = response_text.strip().split('\n')
-        result = {
-            "plant_type": "Unknown",
-            "condition": "Unknown",
-            "confidence": "Medium",
-            "identification_process": [],
-            "symptoms": [],
-            "causes": [],
-            "why_happens": [],
-            "impact_progression": [],
-            "immediate_actions": [],
-            "precautions": [],
-            "timeline": [],
-            "additional_tips": [],
-            "urgency_level": "Monitor",
-            "treatment": {
-                "organic": [],
-                "chemical": [],
-                "prevention": []
-            }
-        }
-        
-        current_section = None
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check for structured section headers (with **)
-            if line.startswith('**') and line.endswith('**'):
-                header = line.replace('**', '').strip().lower()
-                if 'plant type' in header:
-                    current_section = 'plant_type'
-                elif 'specific condition' in header or 'condition' in header:
-                    current_section = 'condition'
-                elif 'confidence' in header:
-                    current_section = 'confidence'
-                elif 'how i identified' in header or 'identification' in header:
-                    current_section = 'identification_process'
-                elif 'detailed symptoms' in header or 'symptoms' in header:
-                    current_section = 'symptoms'
-                elif 'what causes' in header or 'causes' in header:
-                    current_section = 'causes'
-                elif 'why this happens' in header:
-                    current_section = 'why_happens'
-                elif 'impact and progression' in header:
-                    current_section = 'impact_progression'
-                elif 'immediate actions' in header:
-                    current_section = 'immediate_actions'
-                elif 'important precautions' in header or 'precautions' in header:
-                    current_section = 'precautions'
-                elif 'expected timeline' in header or 'timeline' in header:
-                    current_section = 'timeline'
-                elif 'additional tips' in header:
-                    current_section = 'additional_tips'
-                elif 'urgency level' in header or 'urgency' in header:
-                    current_section = 'urgency_level'
-                elif 'organic treatment' in header:
-                    current_section = 'organic'
-                elif 'chemical treatment' in header:
-                    current_section = 'chemical'
-                elif 'prevention and future care' in header or 'prevention' in header:
-                    current_section = 'prevention'
-                continue
-            
-            # Check for key-value pairs (with :)
-            if ':' in line and not line.startswith('-'):
-                key, value = line.split(':', 1)
-                key = key.strip().lower().replace('**', '')
-                value = value.strip().replace('[', '').replace(']', '')
-                
-                if 'plant type' in key:
-                    result["plant_type"] = value
-                elif 'specific condition' in key or 'condition' in key:
-                    result["condition"] = value
-                elif 'confidence' in key:
-                    result["confidence"] = value
-                continue
-            
-            # Handle list items
-            if line.startswith('-') or line.startswith('•') or line.startswith('*'):
-                item = line[1:].strip()
-                if not item or item.startswith('[') and item.endswith(']'):
-                    continue
-                    
-                if current_section == 'identification_process':
-                    result["identification_process"].append(item)
-                elif current_section == 'symptoms':
-                    result["symptoms"].append(item)
-                elif current_section == 'causes':
-                    result["causes"].append(item)
-                elif current_section == 'why_happens':
-                    result["why_happens"].append(item)
-                elif current_section == 'impact_progression':
-                    result["impact_progression"].append(item)
-                elif current_section == 'immediate_actions':
-                    result["immediate_actions"].append(item)
-                elif current_section == 'precautions':
-                    result["precautions"].append(item)
-                elif current_section == 'timeline':
-                    result["timeline"].append(item)
-                elif current_section == 'additional_tips':
-                    result["additional_tips"].append(item)
-                elif current_section == 'organic':
-                    result["treatment"]["organic"].append(item)
-                elif current_section == 'chemical':
-                    result["treatment"]["chemical"].append(item)
-                elif current_section == 'prevention':
-                    result["treatment"]["prevention"].append(item)
-            
-            # Handle urgency level as text (not list item)
-            elif current_section == 'urgency_level' and line.strip():
-                result["urgency_level"] = line.strip()
-        
-        # Clean up empty bracket placeholders
-        if result["plant_type"] in ["[Name of the plant species, e.g., Tomato, Corn, Apple, etc.]", "Unknown"]:
-            result["plant_type"] = "Unknown Plant"
-        if result["condition"] in ["[Name the specific disease, pest, or condition - be specific, e.g., \"Tomato Late Blight\", \"Apple Scab\", \"Healthy Plant\", etc.]", "Unknown"]:
-            result["condition"] = "Unknown Condition"
-            
-        return result
-        
-    except Exception as e:
-        logger.error(f"Error extracting structured response: {str(e)}")
-        return {
-            "plant_type": "Unknown",
-            "condition": "Analysis Error",
-            "confidence": "Low",
-            "raw_response": response_text
-        }
+# Decoding and resizing uploads is CPU-bound; keep it off the event loop too. With
+# IMAGE_DECODE_PROCESSES > 0 decoding runs in worker processes so it never holds the GIL.
+image_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_DECODE_WORKERS", "4")),
+    thread_name_prefix="image-decode"
+)
+IMAGE_DECODE_PROCESSES = int(os.getenv("IMAGE_DECODE_PROCESSES", "0"))
+decode_executor = ProcessPoolExecutor(max_workers=IMAGE_DECODE_PROCESSES) if IMAGE_DECODE_PROCESSES > 0 else image_executor
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+# Uploads above this are rejected while streaming, before they are fully buffered
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
 
-async def analyze_plant_with_gemini(image: Image.Image) -> Dict[str, Any]:
-    """Use Gemini Vision to analyze plant health"""
-    if gemini_model is None:
-        raise ValueError("Gemini model not initialized")
-    
-    try:
-        # Create an extremely comprehensive prompt for detailed plant disease analysis
-        prompt = """
+# Content-addressed cache of diagnoses so repeat uploads skip the Gemini call
+diagnosis_cache = DiagnosisCache(
+    max_entries=int(os.getenv("DIAGNOSIS_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("DIAGNOSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    disk_dir=os.getenv("DIAGNOSIS_CACHE_DIR") or None
+)
+
+# Perceptual-hash index so re-encoded or re-shot photos of the same leaf reuse a cached diagnosis
+phash_index = PerceptualHashIndex(
+    max_distance=int(os.getenv("PHASH_MAX_DISTANCE", "4")),
+    max_entries=int(os.getenv("PHASH_INDEX_SIZE", "50000")) if diagnosis_cache.enabled else 0,
+    min_bits=int(os.getenv("PHASH_MIN_BITS", "8"))
+)
+
+# Normalized images of non-full analyses, kept so their detailed report can be requested later
+image_store = ImageStore(
+    max_bytes=int(os.getenv("IMAGE_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+    disk_dir=os.path.join(diagnosis_cache.disk_dir, "images") if diagnosis_cache.disk_dir else None,
+    ttl_seconds=float(os.getenv("IMAGE_STORE_TTL_SECONDS", os.getenv("DIAGNOSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))),
+    max_disk_bytes=int(os.getenv("IMAGE_STORE_MAX_DISK_BYTES", str(1024 * 1024 * 1024)))
+)
+
+# Geotagged diagnoses, queried by /outbreaks for regional disease pressure
+outbreak_store = OutbreakStore(
+    path=os.getenv("OUTBREAK_STORE_PATH") or None,
+    cell_km=float(os.getenv("OUTBREAK_CELL_KM", "10")),
+    retention_days=float(os.getenv("OUTBREAK_RETENTION_DAYS", "90"))
+)
+
+def decode_payload(contents: memoryview):
+    """Buffer to hand the decode pool: zero-copy for threads, plain bytes for worker processes"""
+    return bytes(contents) if IMAGE_DECODE_PROCESSES > 0 else contents
+
+def profile_cache_key(cache_key: str, profile: str) -> str:
+    return f"{cache_key}-{profile}"
+
+def lookup_analysis(cache_key: str, profile: str, count_miss: bool = True):
+    """Cached analysis of an image for the requested profile or any richer one"""
+    candidates = PROFILE_ORDER[PROFILE_ORDER.index(profile):]
+    for candidate in candidates:
+        analysis = diagnosis_cache.get(profile_cache_key(cache_key, candidate),
+                                       count_miss=count_miss and candidate == candidates[-1])
+        if analysis is not None:
+            return analysis
+    return None
+
+def remember_analysis(cache_key: str, image_hash: int, analysis: Dict[str, Any]) -> None:
+    if diagnosis_cache.enabled:
+        diagnosis_cache.set(profile_cache_key(cache_key, analysis.get("profile", "full")), analysis)
+        phash_index.add(image_hash, cache_key)
+
+def find_cached_analysis(cache_key: str, image_hash: int, profile: str):
+    """Look up a diagnosis by exact content hash, then by perceptual near-duplicate"""
+    if not diagnosis_cache.enabled:
+        return None, None
+
+    analysis = lookup_analysis(cache_key, profile)
+    if analysis is not None:
+        return analysis, "exact"
+
+    match = phash_index.find(image_hash)
+    if match is None:
+        return None, None
+    _, similar_key, distance = match
+    analysis = lookup_analysis(similar_key, profile)
+    if analysis is None:
+        return None, None
+    logger.info(f"Reusing diagnosis of near-duplicate image (hamming distance {distance})")
+    diagnosis_cache.set(profile_cache_key(cache_key, analysis.get("profile", "full")), analysis)
+    return analysis, "near_duplicate"
+
+# Extremely comprehensive prompt for detailed plant disease analysis. The short
+# identification fields come first so streamed responses surface them early.
+FULL_ANALYSIS_PROMPT = """
 You are a world-renowned plant pathologist and agricultural specialist with 30+ years of experience. Analyze this plant image with extreme detail and provide the most comprehensive assessment possible. Don't limit information - provide EVERYTHING you can observe and analyze.
 
 IMPORTANT: Be extremely thorough, detailed, and educational. Provide unlimited information in a structured format. This analysis will be used to educate farmers and help save their crops.
@@ -220,6 +199,7 @@ Please examine every detail in the image and provide:
 
 **Specific Condition/Disease**: [Provide the exact disease name, alternative names, scientific pathogen name if applicable]
 **Confidence Level**: [High/Medium/Low - explain in detail why you are confident or uncertain, what additional angles/images would help]
+**Urgency Classification**: [Critical/High/Medium/Low - with detailed explanation of timeframe and consequences of delay]
 
 **Detailed Visual Analysis - What I See in the Image**:
 - [Describe EVERY visible symptom in extreme detail]
@@ -379,15 +359,85 @@ Please examine every detail in the image and provide:
 - [Regional treatment preferences]
 - [Climate-specific recommendations]
 
-**Urgency Classification**: [Critical/High/Medium/Low - with detailed explanation of timeframe and consequences of delay]
-
 Be extremely detailed, scientific, and practical. Provide as much information as possible - there are no limits. Think like you're writing a comprehensive case study that will be used to train future plant pathologists.
 """
+
+# Compact triage prompt: identification and urgency only, as JSON
+TRIAGE_PROMPT = """
+You are an expert plant pathologist. Look at this plant image and identify the plant and its main health condition.
+
+Respond with ONLY a JSON object and nothing else, in exactly this form:
+{"plant_type": "<plant species>", "condition": "<specific disease or pest name, or Healthy Plant>", "confidence": "<High|Medium|Low>", "urgency_level": "<Critical|High|Medium|Low|Monitor>"}
+"""
+
+# Mid-sized prompt covering the sections the app displays, with bounded list lengths
+STANDARD_PROMPT = """
+You are an experienced plant pathologist advising a farmer. Analyze this plant image and answer concisely in exactly this structure:
+
+Plant Type: [plant species]
+Specific Condition: [exact disease or pest name, or "Healthy Plant"]
+Confidence: [High/Medium/Low]
+Urgency Level: [Critical/High/Medium/Low - one short reason]
+
+**Symptoms**
+- [up to 4 visible symptoms]
+
+**Causes**
+- [up to 3 causes]
+
+**Immediate Actions**
+- [up to 4 steps for the next 48 hours]
+
+**Organic Treatment**
+- [up to 3 remedies and how to apply them]
+
+**Chemical Treatment**
+- [up to 3 options with active ingredient and dose]
+
+**Prevention**
+- [up to 3 measures]
+"""
+
+# Analysis profiles from lightest to richest; a cached richer analysis also answers lighter requests
+ANALYSIS_PROFILES = {
+    "triage": {
+        "prompt": TRIAGE_PROMPT,
+        "generation_config": {"response_mime_type": "application/json", "max_output_tokens": 256}
+    },
+    "standard": {
+        "prompt": STANDARD_PROMPT,
+        "generation_config": {"max_output_tokens": 2048}
+    },
+    "full": {
+        "prompt": FULL_ANALYSIS_PROMPT,
+        "generation_config": None
+    }
+}
+PROFILE_ORDER = list(ANALYSIS_PROFILES)
+DEFAULT_ANALYSIS_PROFILE = os.getenv("DEFAULT_ANALYSIS_PROFILE", "full")
+if DEFAULT_ANALYSIS_PROFILE not in ANALYSIS_PROFILES:
+    logger.warning(f"Unknown DEFAULT_ANALYSIS_PROFILE '{DEFAULT_ANALYSIS_PROFILE}', using 'full'")
+    DEFAULT_ANALYSIS_PROFILE = "full"
+if isinstance(gemini_model, ReplayVisionModel):
+    gemini_model.bind_prompts({name: settings["prompt"] for name, settings in ANALYSIS_PROFILES.items()})
+
+async def analyze_plant_with_gemini(image: Image.Image, profile: str = DEFAULT_ANALYSIS_PROFILE) -> Dict[str, Any]:
+    """Use Gemini Vision to analyze plant health"""
+    if gemini_model is None:
+        raise ValueError("Gemini model not initialized")
+    
+    settings = ANALYSIS_PROFILES[profile]
+    try:
+        logger.info(f"Sending image to Gemini for {profile} analysis...")
         
-        logger.info("Sending image to Gemini for analysis...")
-        
-        # Generate response using Gemini Vision
-        response = gemini_model.generate_content([prompt, image])
+        # Generate response using Gemini Vision without blocking the event loop
+        response = await vision_executor.run(
+            lambda: gemini_model.generate_content(
+                [settings["prompt"], image],
+                generation_config=settings["generation_config"],
+                request_options={"timeout": vision_executor.timeout_seconds}
+            )
+        )
         
         # Check if response was blocked or empty
         if not response.text:
@@ -403,6 +453,7 @@ Be extremely detailed, scientific, and practical. Provide as much information as
         # Process the response
         structured_response = extract_structured_response(response.text)
         structured_response["raw_response"] = response.text
+        structured_response["profile"] = profile
         
         return structured_response
         
@@ -410,6 +461,94 @@ Be extremely detailed, scientific, and practical. Provide as much information as
         logger.error(f"Error analyzing with Gemini: {str(e)}")
         raise
 
+# Parser defaults, which mean the field has not been seen in the stream yet
+STREAM_SUMMARY_DEFAULTS = {
+    "plant_type": "Unknown Plant",
+    "condition": "Unknown Condition",
+    "confidence": "Medium",
+    "urgency_level": "Monitor"
+}
+
+async def stream_plant_analysis(image: Image.Image, profile: str = DEFAULT_ANALYSIS_PROFILE):
+    """Stream Gemini's analysis as events: partial text, early summaries, then the final analysis"""
+    if gemini_model is None:
+        raise ValueError("Gemini model not initialized")
+
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    settings = ANALYSIS_PROFILES[profile]
+
+    def generate():
+        response = gemini_model.generate_content(
+            [settings["prompt"], image],
+            generation_config=settings["generation_config"],
+            stream=True,
+            request_options={"timeout": vision_executor.timeout_seconds}
+        )
+        for chunk in response:
+            if chunk.text:
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+
+    logger.info("Streaming image analysis from Gemini...")
+    generation = asyncio.ensure_future(vision_executor.run(generate))
+    generation.add_done_callback(lambda _: chunks.put_nowait(None))
+
+    pieces = []
+    summary: Dict[str, Any] = {}
+    # Only newly completed lines are parsed; the unfinished tail waits for the next chunk
+    parser = SectionParser()
+    tail = ""
+    json_lines: Optional[List[str]] = None
+    json_depth = 0
+    started = False
+    while True:
+        text = await chunks.get()
+        if text is None:
+            break
+        pieces.append(text)
+        yield {"type": "partial", "text": text}
+
+        # Surface the identification fields as soon as their lines are complete
+        complete, newline, tail = (tail + text).rpartition("\n")
+        if not newline:
+            continue
+        if not started and complete.strip():
+            # A response opening with a JSON object (fenced or not) is a triage answer
+            started = True
+            if complete.lstrip().startswith(("{", "```")):
+                json_lines = []
+        if json_lines is not None:
+            # Triage answers are JSON; decode once the top-level object has closed
+            json_lines.append(complete)
+            opened = json_depth > 0 or "{" in complete
+            json_depth += complete.count("{") - complete.count("}")
+            partial = extract_json("\n".join(json_lines)) if opened and json_depth <= 0 else None
+            if partial is None:
+                continue
+            json_lines = []
+        else:
+            for line in complete.split("\n"):
+                parser.feed(line)
+            partial = {field: parser.scalar(field) for field in STREAM_SUMMARY_DEFAULTS}
+        update = {
+            field: partial[field] for field, default in STREAM_SUMMARY_DEFAULTS.items()
+            if partial.get(field) not in (None, default, summary.get(field))
+        }
+        if update:
+            summary.update(update)
+            yield {"type": "summary", **summary}
+
+    generation.result()
+    full_text = "".join(pieces)
+    if not full_text:
+        raise ValueError("Empty response from Gemini")
+
+    logger.info("Received streamed response from Gemini")
+    structured_response = extract_structured_response(full_text)
+    structured_response["raw_response"] = full_text
+    structured_response["profile"] = profile
+    yield {"type": "analysis", "analysis": structured_response}
+
 def format_advice_response(analysis: Dict[str, Any]) -> str:
     """Format the analysis into a user-friendly advice response"""
     try:
@@ -458,8 +597,8 @@ def format_advice_response(analysis: Dict[str, Any]) -> str:
         chemical = treatment.get("chemical", [])
         if chemical:
             advice_parts.append("### Chemical Treatments")
-            for treatment in chemical:
-                advice_parts.append(f"- {treatment}")
+            for option in chemical:
+                advice_parts.append(f"- {option}")
             advice_parts.append("")
         
         prevention = treatment.get("prevention", [])
@@ -492,39 +631,300 @@ def determine_confidence_score(analysis: Dict[str, Any]) -> float:
     except Exception:
         return 65.0
 
+async def keep_image_for_details(image: Image.Image, cache_key: str, profile: str) -> None:
+    """Store the image of a non-full analysis so /details can run the richer profile later"""
+    if profile != PROFILE_ORDER[-1] and image_store.enabled:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(image_executor, image_store.put, cache_key, image)
+
+async def fallback_analysis(image: Image.Image, cache_key: str, error: Exception,
+                            local_classifier: LocalClassifier, local_analysis: Optional[Dict[str, Any]] = None):
+    """Answer from a lighter cached analysis or the local classifier when the vision backend fails"""
+    # The request already counted its cache miss; the fallback lookup must not count another
+    fallback, cache_match = lookup_analysis(cache_key, PROFILE_ORDER[0], count_miss=False), "exact"
+    if fallback is None and local_classifier.available:
+        loop = asyncio.get_running_loop()
+        fallback = local_analysis or await loop.run_in_executor(image_executor, local_classifier.classify, image)
+        cache_match = None
+    if fallback is None:
+        return None, None
+    logger.warning(f"Vision backend unavailable ({str(error)}), answering with the {fallback.get('profile')} "
+                   f"{fallback.get('model_type', 'gemini_vision')} result")
+    await keep_image_for_details(image, cache_key, fallback.get("profile", "full"))
+    return {**fallback, "fallback_reason": str(error)}, cache_match
+
+async def diagnose_image(image: Image.Image, cache_key: str, image_hash: int,
+                         profile: str = DEFAULT_ANALYSIS_PROFILE, full_report: bool = False):
+    """Return (analysis, cache_match) from the cache, the local classifier, or a fresh Gemini call"""
+    analysis, cache_match = find_cached_analysis(cache_key, image_hash, profile)
+    if analysis is not None:
+        await keep_image_for_details(image, cache_key, analysis.get("profile", "full"))
+        return analysis, cache_match
+
+    loop = asyncio.get_running_loop()
+    # One version for the whole request, even if a reload swaps it meanwhile
+    local_classifier = current_classifier()
+    local_analysis = None
+    if local_classifier.available and not full_report:
+        local_analysis = await loop.run_in_executor(image_executor, local_classifier.classify, image)
+        if local_analysis["confidence_score"] >= LOCAL_MODEL_CONFIDENCE_THRESHOLD * 100 or gemini_model is None:
+            await keep_image_for_details(image, cache_key, local_analysis["profile"])
+            return local_analysis, None
+        logger.info(f"Local classifier unsure ({local_analysis['confidence_score']}%), escalating to Gemini")
+
+    try:
+        analysis = await analyze_plant_with_gemini(image, profile)
+    except (VisionUnavailableError, VisionTimeoutError) as e:
+        fallback, cache_match = await fallback_analysis(image, cache_key, e, local_classifier, local_analysis)
+        if fallback is None:
+            raise
+        return fallback, cache_match
+
+    await keep_image_for_details(image, cache_key, profile)
+    remember_analysis(cache_key, image_hash, analysis)
+    return analysis, None
+
+def build_prediction_response(analysis: Dict[str, Any], cache_match, cache_key: Optional[str] = None) -> Dict[str, Any]:
+    """Shape a structured analysis into the /predict response body"""
+    profile = analysis.get("profile", "full")
+    condition = analysis.get("condition", "Unknown Condition")
+    confidence_score = analysis.get("confidence_score") or determine_confidence_score(analysis)
+    advice = format_advice_response(analysis)
+
+    response = {
+        "class": condition,
+        "confidence": round(confidence_score, 2),
+        "advice": advice,
+        "model_type": analysis.get("model_type", "gemini_vision"),
+        "status": "success",
+        "cached": cache_match is not None,
+        "cache_match": cache_match,
+        "cache_key": cache_key,
+        "profile": profile,
+        "details_available": profile != PROFILE_ORDER[-1],
+        "plant_type": analysis.get("plant_type", "Unknown"),
+        "urgency_level": analysis.get("urgency_level", "Monitor"),
+        "analysis_details": {
+            "overall_health": analysis.get("overall_health", "Unknown"),
+            "visual_analysis": analysis.get("visual_analysis", []),
+            "identification_process": analysis.get("identification_process", []),
+            "symptoms": analysis.get("symptoms", []),
+            "biology": analysis.get("biology", []),
+            "causes": analysis.get("causes", []),
+            "why_happens": analysis.get("why_happens", []),
+            "impact_progression": analysis.get("impact_progression", []),
+            "immediate_actions": analysis.get("immediate_actions", []),
+            "precautions": analysis.get("precautions", []),
+            "safety": analysis.get("safety", []),
+            "timeline": analysis.get("timeline", []),
+            "recovery_monitoring": analysis.get("recovery_monitoring", []),
+            "additional_tips": analysis.get("additional_tips", []),
+            "treatments": analysis.get("treatment", {}),
+            "integrated_management": analysis.get("integrated_management", []),
+            "professional_recommendations": analysis.get("professional_recommendations", []),
+            "environmental_modifications": analysis.get("environmental_modifications", []),
+            "differential_diagnosis": analysis.get("differential_diagnosis", []),
+            "economics": analysis.get("economics", []),
+            "research": analysis.get("research", []),
+            "regional": analysis.get("regional", [])
+        }
+    }
+    if "top_predictions" in analysis:
+        response["top_predictions"] = analysis["top_predictions"]
+    if "fallback_reason" in analysis:
+        response["fallback_reason"] = analysis["fallback_reason"]
+    return response
+
+def vision_unavailable_response(error: VisionUnavailableError) -> JSONResponse:
+    """503 telling the client when to retry while the vision backend is shedding load"""
+    retry_after = max(1, math.ceil(error.retry_after))
+    return JSONResponse(content={
+        "error": f"Plant analysis is temporarily unavailable: {str(error)}",
+        "status": "error",
+        "retry_after": retry_after
+    }, status_code=503, headers={"Retry-After": str(retry_after)})
+
+URGENCY_LEVELS = ["Monitor", "Low", "Medium", "High", "Critical"]
+
+def urgency_rank(urgency_level: str) -> int:
+    """Map free-text urgency to an index into URGENCY_LEVELS (0 = monitor/unknown)"""
+    text = (urgency_level or "").lower()
+    for rank in range(len(URGENCY_LEVELS) - 1, 0, -1):
+        if URGENCY_LEVELS[rank].lower() in text:
+            return rank
+    return 0
+
+def valid_location(lat: Optional[float], lon: Optional[float]) -> bool:
+    return lat is not None and lon is not None and -90 <= lat <= 90 and -180 <= lon <= 180
+
+def record_observation(analysis: Dict[str, Any], cache_match, lat: Optional[float], lon: Optional[float]) -> None:
+    """Add a geotagged diagnosis to the outbreak store; re-uploads of the same photo are not new reports"""
+    if not valid_location(lat, lon) or cache_match == "exact":
+        return
+    outbreak_store.add(
+        lat, lon,
+        analysis.get("plant_type", "Unknown"),
+        analysis.get("condition", "Unknown Condition"),
+        URGENCY_LEVELS[urgency_rank(analysis.get("urgency_level", "Monitor"))]
+    )
+
+def summarize_field(results) -> Dict[str, Any]:
+    """Aggregate per-image batch results into a field-level summary"""
+    analyzed = [r for r in results if r.get("status") == "success"]
+    condition_counts: Dict[str, int] = {}
+    plant_type_counts: Dict[str, int] = {}
+    urgency_counts: Dict[str, int] = {}
+    healthy = 0
+    highest = None
+
+    for result in analyzed:
+        condition = result.get("class", "Unknown Condition")
+        plant_type = result.get("plant_type", "Unknown")
+        urgency = result.get("urgency_level", "Monitor")
+        condition_counts[condition] = condition_counts.get(condition, 0) + 1
+        plant_type_counts[plant_type] = plant_type_counts.get(plant_type, 0) + 1
+        urgency_label = URGENCY_LEVELS[urgency_rank(urgency)]
+        urgency_counts[urgency_label] = urgency_counts.get(urgency_label, 0) + 1
+        if "healthy" in condition.lower():
+            healthy += 1
+        if highest is None or urgency_rank(urgency) > urgency_rank(highest["urgency_level"]):
+            highest = {"condition": condition, "plant_type": plant_type, "urgency_level": urgency}
+
+    diseased = len(analyzed) - healthy
+    most_common = max(condition_counts.items(), key=lambda item: item[1])[0] if condition_counts else None
+    return {
+        "total_images": len(results),
+        "analyzed": len(analyzed),
+        "failed": len(results) - len(analyzed),
+        "healthy": healthy,
+        "diseased": diseased,
+        "disease_incidence": round(diseased / len(analyzed) * 100, 1) if analyzed else 0.0,
+        "most_common_condition": most_common,
+        "condition_counts": condition_counts,
+        "plant_type_counts": plant_type_counts,
+        "urgency_counts": urgency_counts,
+        "most_urgent": highest
+    }
+
+def format_stream_event(event: Dict[str, Any], stream_format: str) -> str:
+    """Frame an event as a Server-Sent Event or an NDJSON line"""
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+async def stream_prediction(image: Image.Image, cache_key: str, image_hash: int,
+                            profile: str, stream_format: str,
+                            lat: Optional[float] = None, lon: Optional[float] = None):
+    """Event stream for /predict?stream=...: partial output, then the full prediction response"""
+    try:
+        await keep_image_for_details(image, cache_key, profile)
+        analysis, cache_match = find_cached_analysis(cache_key, image_hash, profile)
+        if analysis is None:
+            try:
+                async for event in stream_plant_analysis(image, profile):
+                    if event["type"] == "analysis":
+                        analysis = event["analysis"]
+                    else:
+                        yield format_stream_event(event, stream_format)
+                remember_analysis(cache_key, image_hash, analysis)
+            except (VisionUnavailableError, VisionTimeoutError) as e:
+                # Same fallback as the non-streaming path, sent as the final event
+                analysis, cache_match = await fallback_analysis(image, cache_key, e, current_classifier())
+                if analysis is None:
+                    raise
+
+        response = build_prediction_response(analysis, cache_match, cache_key)
+        record_observation(analysis, cache_match, lat, lon)
+        logger.info(f"Streamed analysis completed: {response['class']} (cache: {cache_match})")
+        yield format_stream_event({"type": "final", "result": response}, stream_format)
+    except Exception as e:
+        logger.error(f"Streaming analysis failed: {str(e)}")
+        event = {
+            "type": "error",
+            "error": f"Plant analysis failed: {str(e)}",
+            "status": "error"
+        }
+        if isinstance(e, VisionUnavailableError):
+            event["retry_after"] = max(1, math.ceil(e.retry_after))
+        yield format_stream_event(event, stream_format)
+
 @router.post("/predict")
-async def predict(file: UploadFile = File(...)):
-    """Analyze plant image using Gemini Vision API"""
+async def predict(
+    file: UploadFile = File(...),
+    stream: Optional[str] = Query(None, description="Stream partial output as 'sse' or 'ndjson'"),
+    profile: str = Query(DEFAULT_ANALYSIS_PROFILE, description="Analysis depth: 'triage', 'standard' or 'full'"),
+    full_report: bool = Query(False, description="Skip the local classifier and always ask Gemini"),
+    lat: Optional[float] = Form(None, description="Latitude of the photo, for regional outbreak tracking"),
+    lon: Optional[float] = Form(None, description="Longitude of the photo, for regional outbreak tracking")
+):
+    """Analyze plant image with the local classifier, escalating to Gemini Vision when needed"""
     
-    if gemini_model is None:
+    if stream is not None and stream not in STREAM_MEDIA_TYPES:
+        return JSONResponse(content={
+            "error": "stream must be 'sse' or 'ndjson'.",
+            "status": "error"
+        }, status_code=422)
+    if profile not in ANALYSIS_PROFILES:
+        return JSONResponse(content={
+            "error": f"profile must be one of: {', '.join(PROFILE_ORDER)}.",
+            "status": "error"
+        }, status_code=422)
+    if (lat is not None or lon is not None) and not valid_location(lat, lon):
+        return JSONResponse(content={
+            "error": "lat and lon must be given together, within -90..90 and -180..180.",
+            "status": "error"
+        }, status_code=422)
+
+
+    if gemini_model is None and (stream or full_report or not current_classifier().available):
         return JSONResponse(content={
             "error": "Gemini Vision API not available. Please check your API key configuration.",
             "status": "error"
         }, status_code=500)
 
     try:
-        # Read and validate the uploaded file
-        contents = await file.read()
-        if not contents or len(contents) < 10:
+        # Read and validate the uploaded file, stopping as soon as it is too large or not an image
+        try:
+            contents = await read_image_upload(file, MAX_UPLOAD_BYTES)
+        except UploadRejected as e:
             return JSONResponse(content={
-                "error": "Uploaded file is empty or invalid. Please upload a valid image file.",
+                "error": str(e),
                 "status": "error"
-            }, status_code=422)
+            }, status_code=e.status_code)
 
         logger.info(f"Processing uploaded file: {file.filename}, size: {len(contents)} bytes")
 
-        # Process the image
+        # Process the image off the event loop
         try:
-            processed_image = process_image_for_gemini(contents)
+            loop = asyncio.get_running_loop()
+            processed_image, cache_key, image_hash = await loop.run_in_executor(
+                decode_executor, prepare_image, decode_payload(contents)
+            )
         except Exception as e:
             return JSONResponse(content={
                 "error": "Invalid image file. Please upload a clear photo of the plant.",
                 "status": "error"
             }, status_code=422)
 
-        # Analyze with Gemini Vision
+        if stream:
+            return StreamingResponse(
+                stream_prediction(processed_image, cache_key, image_hash, profile, stream, lat, lon),
+                media_type=STREAM_MEDIA_TYPES[stream],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        # Serve repeat uploads and near-duplicates from the diagnosis cache, else ask Gemini
         try:
-            analysis = await analyze_plant_with_gemini(processed_image)
+            analysis, cache_match = await diagnose_image(processed_image, cache_key, image_hash, profile, full_report)
+        except VisionUnavailableError as e:
+            logger.warning(f"Gemini analysis rejected: {str(e)}")
+            return vision_unavailable_response(e)
+        except VisionTimeoutError as e:
+            logger.error(f"Gemini analysis timed out: {str(e)}")
+            return JSONResponse(content={
+                "error": f"Plant analysis timed out: {str(e)}",
+                "status": "error"
+            }, status_code=504)
         except Exception as e:
             logger.error(f"Gemini analysis failed: {str(e)}")
             return JSONResponse(content={
@@ -532,35 +932,9 @@ async def predict(file: UploadFile = File(...)):
                 "status": "error"
             }, status_code=500)
 
-        # Format the response
-        condition = analysis.get("condition", "Unknown Condition")
-        confidence_score = determine_confidence_score(analysis)
-        advice = format_advice_response(analysis)
-        
-        # Create the comprehensive response
-        response = {
-            "class": condition,
-            "confidence": round(confidence_score, 2),
-            "advice": advice,
-            "model_type": "gemini_vision",
-            "status": "success",
-            "plant_type": analysis.get("plant_type", "Unknown"),
-            "urgency_level": analysis.get("urgency_level", "Monitor"),
-            "analysis_details": {
-                "identification_process": analysis.get("identification_process", []),
-                "symptoms": analysis.get("symptoms", []),
-                "causes": analysis.get("causes", []),
-                "why_happens": analysis.get("why_happens", []),
-                "impact_progression": analysis.get("impact_progression", []),
-                "immediate_actions": analysis.get("immediate_actions", []),
-                "precautions": analysis.get("precautions", []),
-                "timeline": analysis.get("timeline", []),
-                "additional_tips": analysis.get("additional_tips", []),
-                "treatments": analysis.get("treatment", {})
-            }
-        }
-
-        logger.info(f"Analysis completed: {condition} with {confidence_score}% confidence")
+        response = build_prediction_response(analysis, cache_match, cache_key)
+        record_observation(analysis, cache_match, lat, lon)
+        logger.info(f"Analysis completed: {response['class']} with {response['confidence']}% confidence (cache: {cache_match})")
         return response
 
     except Exception as e:
@@ -572,14 +946,208 @@ async def predict(file: UploadFile = File(...)):
             "status": "error"
         }, status_code=500)
 
+@router.post("/predict-batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...),
+    profile: str = Query(DEFAULT_ANALYSIS_PROFILE, description="Analysis depth: 'triage', 'standard' or 'full'"),
+    full_report: bool = Query(False, description="Skip the local classifier and always ask Gemini"),
+    lat: Optional[float] = Form(None, description="Latitude of the field, for regional outbreak tracking"),
+    lon: Optional[float] = Form(None, description="Longitude of the field, for regional outbreak tracking")
+):
+    """Analyze a field visit's worth of plant images with bounded parallelism"""
+
+    if profile not in ANALYSIS_PROFILES:
+        return JSONResponse(content={
+            "error": f"profile must be one of: {', '.join(PROFILE_ORDER)}.",
+            "status": "error"
+        }, status_code=422)
+    if (lat is not None or lon is not None) and not valid_location(lat, lon):
+        return JSONResponse(content={
+            "error": "lat and lon must be given together, within -90..90 and -180..180.",
+            "status": "error"
+        }, status_code=422)
+
+    if gemini_model is None and (full_report or not current_classifier().available):
+        return JSONResponse(content={
+            "error": "Gemini Vision API not available. Please check your API key configuration.",
+            "status": "error"
+        }, status_code=500)
+
+    if len(files) > MAX_BATCH_FILES:
+        return JSONResponse(content={
+            "error": f"Too many files in one batch ({len(files)}). The limit is {MAX_BATCH_FILES}.",
+            "status": "error"
+        }, status_code=413)
+
+    loop = asyncio.get_running_loop()
+    results: List[Dict[str, Any]] = [{} for _ in files]
+
+    # Read uploads and collapse byte-identical files before decoding
+    first_by_digest: Dict[str, int] = {}
+    decode_jobs: Dict[int, Any] = {}
+    duplicate_of: Dict[int, int] = {}
+    for index, upload in enumerate(files):
+        results[index] = {"index": index, "filename": upload.filename}
+        try:
+            contents = await read_image_upload(upload, MAX_UPLOAD_BYTES)
+        except UploadRejected as e:
+            results[index].update({"status": "error", "error": str(e)})
+            continue
+        digest = hashlib.sha256(contents).hexdigest()
+        if digest in first_by_digest:
+            duplicate_of[index] = first_by_digest[digest]
+            continue
+        first_by_digest[digest] = index
+        decode_jobs[index] = loop.run_in_executor(decode_executor, prepare_image, decode_payload(contents))
+
+    # Decode and resize in the image pool, then collapse images with the same normalized content
+    first_by_key: Dict[str, int] = {}
+    first_key_of: Dict[int, str] = {}
+    diagnose_jobs: Dict[int, Any] = {}
+    decoded = await asyncio.gather(*decode_jobs.values(), return_exceptions=True)
+    for index, outcome in zip(decode_jobs.keys(), decoded):
+        if isinstance(outcome, Exception):
+            results[index].update({"status": "error", "error": "Invalid image file. Please upload a clear photo of the plant."})
+            continue
+        image, cache_key, image_hash = outcome
+        if cache_key in first_by_key:
+            duplicate_of[index] = first_by_key[cache_key]
+            continue
+        first_by_key[cache_key] = index
+        first_key_of[index] = cache_key
+        diagnose_jobs[index] = diagnose_image(image, cache_key, image_hash, profile, full_report)
+
+    # Fan out to the vision backend; the vision executor caps concurrency
+    vision_calls = 0
+    local_answers = 0
+    diagnosed = await asyncio.gather(*diagnose_jobs.values(), return_exceptions=True)
+    for index, outcome in zip(diagnose_jobs.keys(), diagnosed):
+        if isinstance(outcome, Exception):
+            logger.error(f"Batch analysis failed for image {index}: {str(outcome)}")
+            results[index].update({"status": "error", "error": f"Plant analysis failed: {str(outcome)}"})
+            if isinstance(outcome, VisionUnavailableError):
+                results[index]["retry_after"] = max(1, math.ceil(outcome.retry_after))
+            continue
+        analysis, cache_match = outcome
+        if analysis.get("model_type") == "local_classifier":
+            local_answers += 1
+        elif cache_match is None:
+            vision_calls += 1
+        results[index].update(build_prediction_response(analysis, cache_match, first_key_of[index]))
+        record_observation(analysis, cache_match, lat, lon)
+
+    for index, original in duplicate_of.items():
+        copied = {k: v for k, v in results[original].items() if k not in ("index", "filename")}
+        results[index].update(copied, duplicate_of=original)
+
+    summary = summarize_field(results)
+    summary.update({
+        "unique_images": len(diagnose_jobs),
+        "duplicates": len(duplicate_of),
+        "vision_calls": vision_calls,
+        "local_answers": local_answers
+    })
+    logger.info(f"Batch analysis completed: {summary['analyzed']}/{summary['total_images']} images, {vision_calls} vision calls")
+    return {
+        "status": "success",
+        "results": results,
+        "summary": summary
+    }
+
+@router.get("/details/{cache_key}")
+async def get_details(
+    cache_key: str,
+    profile: str = Query("full", description="Analysis depth: 'triage', 'standard' or 'full'")
+):
+    """Run a richer analysis profile for an image that was previously triaged"""
+
+    if profile not in ANALYSIS_PROFILES:
+        return JSONResponse(content={
+            "error": f"profile must be one of: {', '.join(PROFILE_ORDER)}.",
+            "status": "error"
+        }, status_code=422)
+    if not re.fullmatch(r"[0-9a-f]{64}", cache_key):
+        return JSONResponse(content={
+            "error": "Invalid cache key.",
+            "status": "error"
+        }, status_code=422)
+
+    analysis = lookup_analysis(cache_key, profile) if diagnosis_cache.enabled else None
+    if analysis is not None:
+        return build_prediction_response(analysis, "exact", cache_key)
+
+    if gemini_model is None:
+        return JSONResponse(content={
+            "error": "Gemini Vision API not available. Please check your API key configuration.",
+            "status": "error"
+        }, status_code=500)
+
+    loop = asyncio.get_running_loop()
+    image = await loop.run_in_executor(image_executor, image_store.get, cache_key)
+    if image is None:
+        return JSONResponse(content={
+            "error": "This image is no longer available. Please upload it again.",
+            "status": "error"
+        }, status_code=404)
+
+    try:
+        analysis = await analyze_plant_with_gemini(image, profile)
+    except VisionUnavailableError as e:
+        logger.warning(f"Gemini analysis rejected: {str(e)}")
+        return vision_unavailable_response(e)
+    except VisionTimeoutError as e:
+        logger.error(f"Gemini analysis timed out: {str(e)}")
+        return JSONResponse(content={
+            "error": f"Plant analysis timed out: {str(e)}",
+            "status": "error"
+        }, status_code=504)
+    except Exception as e:
+        logger.error(f"Gemini analysis failed: {str(e)}")
+        return JSONResponse(content={
+            "error": f"Plant analysis failed: {str(e)}",
+            "status": "error"
+        }, status_code=500)
+
+    if diagnosis_cache.enabled:
+        diagnosis_cache.set(profile_cache_key(cache_key, profile), analysis)
+    return build_prediction_response(analysis, None, cache_key)
+
+@router.get("/outbreaks")
+def get_outbreaks(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(25.0, gt=0, le=500),
+    days: float = Query(14.0, gt=0),
+    plant_type: Optional[str] = Query(None, description="Only reports for this plant, e.g. 'Tomato'"),
+    include_healthy: bool = Query(False)
+):
+    """Diseases reported within radius_km of a point over the last `days` days, most reported first"""
+    start = time.perf_counter()
+    result = outbreak_store.query(lat, lon, radius_km, days, plant_type, include_healthy)
+    return {
+        "status": "success",
+        "query": {"lat": lat, "lon": lon, "radius_km": radius_km, "days": days, "plant_type": plant_type},
+        **result,
+        "query_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
 @router.get("/health")
 def health_check():
     """Health check endpoint to verify Gemini Vision API status"""
     return {
         "status": "healthy",
         "model_type": "gemini_vision",
+        "vision_backend": VISION_BACKEND,
         "gemini_initialized": gemini_model is not None,
         "api_available": gemini_model is not None,
+        "diagnosis_cache": diagnosis_cache.stats(),
+        "near_duplicate_index": phash_index.stats(),
+        "vision_executor": vision_executor.stats(),
+        "image_store": image_store.stats(),
+        "local_classifier": current_classifier().stats(),
+        "outbreak_store": outbreak_store.stats(),
+        "local_confidence_threshold": LOCAL_MODEL_CONFIDENCE_THRESHOLD,
+        "default_profile": DEFAULT_ANALYSIS_PROFILE,
         "version": "2.0.0"
     }
 
@@ -599,6 +1167,6 @@ def get_api_info():
             "Prevention advice"
         ],
         "supported_formats": ["JPEG", "PNG", "WEBP"],
-        "max_file_size": "10MB",
+        "max_file_size": f"{MAX_UPLOAD_BYTES / (1024 * 1024):g}MB",
         "status": "active" if gemini_model else "unavailable"
     }
@@ -0,0 +1,60 @@
+from typing import Optional
+
+from fastapi import UploadFile
+
+HEADER_BYTES = 16
+CHUNK_BYTES = 256 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload failed validation; carries the HTTP status to respond with"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Identify JPEG, PNG and WEBP uploads from their magic bytes"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+async def read_image_upload(file: UploadFile, max_bytes: int) -> memoryview:
+    """Read an image upload into a bounded buffer, rejecting it as early as possible.
+
+    Oversized uploads with a known size are rejected before any bytes are read,
+    non-images after the first HEADER_BYTES, and uploads of unknown size as soon
+    as they cross max_bytes. The returned memoryview shares the read buffer.
+    """
+    limit_mb = max_bytes / (1024 * 1024)
+    if file.size is not None and file.size > max_bytes:
+        raise UploadRejected(f"Image is larger than the {limit_mb:.3g} MB limit.", 413)
+
+    header = await file.read(HEADER_BYTES)
+    if len(header) < 10:
+        raise UploadRejected("Uploaded file is empty or invalid. Please upload a valid image file.", 422)
+    if sniff_image_format(header) is None:
+        raise UploadRejected("Unsupported file type. Please upload a JPEG, PNG or WEBP image.", 415)
+
+    buffer = bytearray(file.size if file.size is not None else min(max_bytes, 4 * CHUNK_BYTES))
+    buffer[:len(header)] = header
+    length = len(header)
+    while True:
+        chunk = await file.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        end = length + len(chunk)
+        if end > max_bytes:
+            raise UploadRejected(f"Image is larger than the {limit_mb:.3g} MB limit.", 413)
+        if end > len(buffer):
+            buffer.extend(bytes(min(max_bytes, max(end, 2 * len(buffer))) - len(buffer)))
+        buffer[length:end] = chunk
+        length = end
+
+    return memoryview(buffer)[:length]
@@ -0,0 +1,234 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class VisionTimeoutError(Exception):
+    """Raised when a vision model call exceeds its time budget"""
+
+
+class VisionUnavailableError(Exception):
+    """Raised without calling the vision model when it is failing or overloaded"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after consecutive vision failures, then lets one probe call through after a cooldown"""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "open" and self.retry_after() <= 0:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+        return self.state == "closed"
+
+    def cancel_probe(self) -> None:
+        """The half-open probe never reached the upstream; let the next call try"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("Vision circuit closed, upstream recovered")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(f"Vision circuit opened after {self.consecutive_failures} failures, "
+                               f"retrying in {self.reset_seconds:g}s")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_after_seconds": round(self.retry_after(), 1) if self.state == "open" else 0
+        }
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit: +1 per window of fast calls, multiplicative decrease on slow or failed ones"""
+
+    def __init__(self, min_limit: int, max_limit: int, target_latency_seconds: float, backoff: float = 0.7):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.target_latency_seconds = target_latency_seconds
+        self.backoff = backoff
+        self.value = float(self.max_limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_success(self, latency_seconds: float) -> None:
+        if latency_seconds > self.target_latency_seconds:
+            self.on_drop()
+        else:
+            self.value = min(self.max_limit, self.value + 1.0 / self.value)
+
+    def on_drop(self) -> None:
+        self.value = max(self.min_limit, self.value * self.backoff)
+
+
+class VisionExecutor:
+    """Runs blocking vision model calls on a bounded thread pool off the event loop.
+
+    A slot is held from submission until the worker thread actually finishes,
+    so a call that times out keeps counting against the concurrency limit
+    until the underlying SDK request returns. The limit adapts (AIMD) to the
+    observed latency, at most max_queue callers wait for a slot, and a circuit
+    breaker fails calls fast while the upstream keeps erroring.
+    """
+
+    def __init__(self, max_concurrency: int = 4, timeout_seconds: float = 60.0, min_concurrency: int = 1,
+                 target_latency_seconds: float = 30.0, max_queue: int = 32,
+                 failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix="vision")
+        self.limiter = AdaptiveLimit(min_concurrency, self.max_concurrency, target_latency_seconds)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self._waiters: deque = deque()
+        self.active = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.active < self.limiter.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def _release(self, future, call: Dict[str, Any]) -> None:
+        self.active -= 1
+        # Timed-out calls were already counted as failures when the caller gave up on them
+        if not call["timed_out"]:
+            if future.exception() is None:
+                self.breaker.record_success()
+                self.limiter.on_success(time.monotonic() - call["started"])
+            else:
+                self.failures += 1
+                self.breaker.record_failure()
+                self.limiter.on_drop()
+        self._wake_waiters()
+
+    def _reject(self, message: str, retry_after: float) -> VisionUnavailableError:
+        self.rejected += 1
+        return VisionUnavailableError(message, retry_after)
+
+    async def _acquire(self) -> None:
+        if self.active < self.limiter.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("Vision model is overloaded, too many requests are waiting", self.timeout_seconds / 4)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over right at the deadline
+                return
+            self._waiters.remove(waiter)
+            raise self._reject("Vision model is overloaded, no slot became free in time", self.timeout_seconds / 4)
+        except asyncio.CancelledError:
+            if waiter.done():
+                # The slot was handed over just as the caller went away; pass it on
+                self.active -= 1
+                self._wake_waiters()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) in the pool, waiting at most timeout_seconds for the result"""
+        loop = asyncio.get_running_loop()
+        if not self.breaker.allow():
+            raise self._reject("Vision model is failing, requests are paused", self.breaker.retry_after())
+
+        try:
+            await self._acquire()
+        except BaseException:
+            if self.breaker.state == "half_open":
+                self.breaker.cancel_probe()
+            raise
+
+        call = {"started": time.monotonic(), "timed_out": False}
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self.active -= 1
+            self._wake_waiters()
+            raise
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f, call))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            call["timed_out"] = True
+            # A timeout is both a failure and a latency signal, even though the thread is still running
+            self.breaker.record_failure()
+            self.limiter.on_drop()
+            logger.warning(f"Vision call exceeded {self.timeout_seconds}s timeout")
+            raise VisionTimeoutError(f"Vision model did not respond within {self.timeout_seconds:g} seconds")
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "concurrency_limit": self.limiter.limit,
+            "target_latency_seconds": self.limiter.target_latency_seconds,
+            "timeout_seconds": self.timeout_seconds,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "circuit": self.breaker.stats()
+        }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /price/forecast against calling /price/predict once per
+(series, month), checking that both give the same price for every cell.
+
+The router runs in-process behind httpx's ASGI transport with whichever model
+it loads (PRICE_MODEL_PATH, crop_price_model_2.pkl, or the mock). --synthetic
+trains a small one-hot + random forest pipeline on made-up prices first, so
+the numbers reflect a real sklearn predict call.
+
+Usage (from backend/):
+    python -m PricePrediction.benchmark_price_forecast --commodities 40 --horizon 12
+    python -m PricePrediction.benchmark_price_forecast --synthetic
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+import httpx
+
+COMMODITIES = ["Rice", "Wheat", "Maize", "Cotton", "Onion", "Potato", "Tomato", "Banana", "Turmeric", "Ginger"]
+LOCATIONS = [("Kerala", "Thrissur"), ("Punjab", "Ludhiana"), ("Maharashtra", "Nashik"), ("Karnataka", "Mysuru")]
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+
+
+def sample_series(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    series = []
+    for i in range(count):
+        state, district = LOCATIONS[rng.integers(len(LOCATIONS))]
+        low = float(rng.integers(800, 4000))
+        series.append({
+            "commodity_name": COMMODITIES[i % len(COMMODITIES)],
+            "state_name": state,
+            "district_name": district,
+            "avg_min_price": low,
+            "avg_max_price": low + float(rng.integers(100, 800)),
+            "calculationType": "Modal Price",
+            "change": float(rng.normal(0, 2))
+        })
+    return series
+
+
+def train_synthetic_model(path: str, seed: int = 0):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    import joblib
+
+    rng = np.random.default_rng(seed)
+    rows = pd.DataFrame([{**row, "month": MONTHS[rng.integers(12)]} for row in sample_series(3000, seed)])
+    target = (rows["avg_min_price"] + rows["avg_max_price"]) / 2 * (1 + 0.02 * rows["month"].map(MONTHS.index))
+    categorical = ["month", "commodity_name", "state_name", "district_name", "calculationType"]
+    model = Pipeline([
+        ("encode", ColumnTransformer([("onehot", OneHotEncoder(handle_unknown="ignore"), categorical)],
+                                     remainder="passthrough")),
+        ("forest", RandomForestRegressor(n_estimators=50, random_state=seed))
+    ]).fit(rows[["month", "commodity_name", "avg_min_price", "avg_max_price", "state_name",
+                 "district_name", "calculationType", "change"]], target)
+    joblib.dump(model, path)
+
+
+async def run(series, horizon: int, start_month: str):
+    from fastapi import FastAPI
+    from .routes import router
+
+    app = FastAPI()
+    app.include_router(router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=600) as client:
+        request = {"series": series, "start_month": start_month, "horizon": horizon}
+        await client.post("/price/forecast", json={**request, "series": series[:1]})
+
+        start = time.perf_counter()
+        response = await client.post("/price/forecast", json=request)
+        batch_seconds = time.perf_counter() - start
+        response.raise_for_status()
+        forecast = response.json()
+
+        start = time.perf_counter()
+        single = [[(await client.post("/price/predict", json={**item, "month": month})).json()["predicted_price"]
+                   for month in forecast["months"]] for item in series]
+        single_seconds = time.perf_counter() - start
+
+    mismatches = int(np.sum(~np.isclose(np.array(forecast["predicted_price"]), np.round(single, 2), atol=0.006)))
+    return forecast, batch_seconds, single_seconds, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commodities", type=int, default=40, help="Series (commodity, state, district) to forecast")
+    parser.add_argument("--horizon", type=int, default=12)
+    parser.add_argument("--start-month", default="January")
+    parser.add_argument("--synthetic", action="store_true", help="Train and serve a synthetic sklearn model")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        path = os.path.join(tempfile.mkdtemp(), "crop_price_model_2.pkl")
+        train_synthetic_model(path)
+        os.environ["PRICE_MODEL_PATH"] = path
+
+    series = sample_series(args.commodities, args.seed)
+    forecast, batch_seconds, single_seconds, mismatches = asyncio.run(run(series, args.horizon, args.start_month))
+
+    cells = args.commodities * args.horizon
+    print(f"📊 {args.commodities} series × {args.horizon} months = {cells} prices "
+          f"(model: {'mock' if forecast['model_type'] == 'mock' else 'loaded'})\n")
+    print(f"   /forecast   {batch_seconds * 1000:.1f} ms, 1 request")
+    print(f"   /predict    {single_seconds * 1000:.1f} ms, {cells} requests ({single_seconds / cells * 1000:.2f} ms each)")
+    print(f"   speedup     {single_seconds / batch_seconds:.0f}x")
+    if forecast["model_type"] == "mock":
+        # The mock reseeds on every call, so its draws depend on batch size
+        print("   parity      skipped (mock model)")
+        return
+    print(f"   parity      {'OK' if not mismatches else f'{mismatches} MISMATCHES'} on {cells} prices")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
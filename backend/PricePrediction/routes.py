@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from fastapi.responses import JSONResponse
 import joblib
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import os
+import time
+
+from model_registry import registry, ModelSpec, admin_error, is_admin, path_error
+from model_shadow import ShadowModelManager
 
 # ✅ Router for Price Prediction
 router = APIRouter(prefix="/price", tags=["Price Prediction"])
@@ -13,48 +19,77 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "crop_price_model_2.pkl")  # Look for model in same directory
 MODEL_PATH_FALLBACK = os.path.join(BASE_DIR, "models", "crop_price_model_2.pkl")  # Fallback in models subdirectory
 
-# ✅ Load model with fallback
-model = None
-model_loaded = False
-
-for path in [MODEL_PATH, MODEL_PATH_FALLBACK]:
-    try:
-        if os.path.exists(path):
-            print(f"\n🔄 Loading price prediction model from: {path}")
-            model = joblib.load(path)
-            print("\n✅ Price prediction model loaded successfully")
-            model_loaded = True
-            break
-    except Exception as e:
-        print(f"\n❌ Failed to load price prediction model from {path}: {e}")
-        continue
+# ✅ Load model with fallback, through the shared registry so it can be hot-swapped
+# (mmap_mode only ever sees the registry's immutable objects/<sha256>/ copy, never the watched file)
+registry.register(ModelSpec(
+    "price_model",
+    "crop_price_model_2.pkl",
+    lambda path: joblib.load(path, mmap_mode="r"),
+    repo_id=os.getenv("PRICE_MODEL_REPO"),
+    local_paths=[os.getenv("PRICE_MODEL_PATH"), MODEL_PATH, MODEL_PATH_FALLBACK]
+))
 
-if not model_loaded:
+try:
+    print(f"\n🔄 Loading price prediction model")
+    registry.load("price_model")
+    print("\n✅ Price prediction model loaded successfully")
+except Exception as e:
+    print(f"\n❌ Failed to load price prediction model: {e}")
     print(f"\n⚠️  No price prediction model found. Checked paths:")
     print(f"   - {MODEL_PATH}")
     print(f"   - {MODEL_PATH_FALLBACK}")
     print(f"\n📝 To enable predictions, place your trained model file at one of these locations.")
     print(f"\n🔧 Creating mock model for development/testing...")
-    
-    # Create a simple mock model for development/testing
-    class MockPricePredictionModel:
-        def predict(self, df):
-            # Return a mock prediction based on input data
-            import numpy as np
-            np.random.seed(42)  # For consistent results
-            # Generate a reasonable price prediction between min and max
-            if 'avg_min_price' in df.columns and 'avg_max_price' in df.columns:
-                avg_min = df['avg_min_price'].iloc[0] if len(df) > 0 else 1000
-                avg_max = df['avg_max_price'].iloc[0] if len(df) > 0 else 1500
-                # Predict a price within the range with some variation
-                predicted_price = np.random.uniform(avg_min * 0.95, avg_max * 1.05)
-            else:
-                predicted_price = np.random.uniform(1000, 2000)
-            return [predicted_price]
-    
-    model = MockPricePredictionModel()
-    model_loaded = "mock"
-    print("\n✅ Mock price prediction model created for development.")
+    print(f"\n👀 The model file is watched: once it appears it is loaded without a restart.")
+
+# Create a simple mock model for development/testing
+class MockPricePredictionModel:
+    def predict(self, df):
+        # Return a mock prediction per input row
+        np.random.seed(42)  # For consistent results
+        # Generate a reasonable price prediction between min and max
+        if 'avg_min_price' in df.columns and 'avg_max_price' in df.columns:
+            avg_min = df['avg_min_price'].to_numpy(dtype=float)
+            avg_max = df['avg_max_price'].to_numpy(dtype=float)
+            # Predict a price within the range with some variation
+            return np.random.uniform(avg_min * 0.95, avg_max * 1.05)
+        return np.random.uniform(1000, 2000, size=len(df))
+
+mock_model = MockPricePredictionModel()
+
+def current_model():
+    """Registry model (picking up any hot swap), or the mock when none could be loaded"""
+    return registry.get("price_model") or mock_model
+
+def model_type():
+    return True if registry.get("price_model") is not None else "mock"
+
+# New versions of the model file are loaded in the background and answer shadow
+# copies of live requests; they only go live on /price/model/promote (or on their
+# own, with PRICE_SHADOW_AUTO_PROMOTE, once they agree with the current model)
+model_manager = ShadowModelManager(
+    registry,
+    "price_model",
+    poll_seconds=float(os.getenv("PRICE_MODEL_WATCH_SECONDS", "30")),
+    sample_rate=float(os.getenv("PRICE_SHADOW_SAMPLE_RATE", "1.0")),
+    auto_promote=os.getenv("PRICE_SHADOW_AUTO_PROMOTE", "false").lower() in ("1", "true", "yes"),
+    min_shadow_requests=int(os.getenv("PRICE_SHADOW_MIN_REQUESTS", "200")),
+    max_relative_diff=float(os.getenv("PRICE_SHADOW_MAX_RELATIVE_DIFF", "0.05")),
+    max_latency_ratio=float(os.getenv("PRICE_SHADOW_MAX_LATENCY_RATIO", "1.5"))
+)
+
+@router.on_event("startup")
+def start_model_watcher():
+    model_manager.start()
+
+def predict_and_shadow(df: pd.DataFrame):
+    """Predict with the live model; the shadow candidate, if any, sees the same frame afterwards"""
+    model = current_model()
+    start = time.perf_counter()
+    predictions = model.predict(df)
+    if model is not mock_model:
+        model_manager.observe(df, predictions, time.perf_counter() - start)
+    return predictions
 
 # Input schema for request body
 class CropPriceData(BaseModel):
@@ -74,23 +109,21 @@ def price_prediction_status():
         "status": "active",
         "service": "Crop Price Prediction",
         "version": "1.0.0",
-        "model_loaded": model is not None,
-        "model_type": model_loaded if model_loaded else "none",
-        "note": "Using mock model for demonstration" if model_loaded == "mock" else "Production model loaded" if model_loaded else "No model available"
+        "model_loaded": True,
+        "model_type": model_type(),
+        "model_version": registry.status(["price_model"])["price_model"].get("version"),
+        "note": "Using mock model for demonstration" if model_type() == "mock" else "Production model loaded"
     }
 
 @router.post("/predict")
 def predict_price(data: CropPriceData):
     """Predict crop price based on input data"""
-    if model is None:
-        return {"error": "Price prediction model not loaded"}
-    
     try:
         # Convert input to DataFrame (model expects same features as training)
         df = pd.DataFrame([data.dict()])
         
         # Predict
-        pred = model.predict(df)[0]
+        pred = predict_and_shadow(df)[0]
         
         return {
             "predicted_price": float(pred),
@@ -103,6 +136,146 @@ def predict_price(data: CropPriceData):
             "status": "error"
         }
 
+# --- Multi-horizon batch forecasts ---
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+MAX_FORECAST_HORIZON = int(os.getenv("PRICE_MAX_FORECAST_HORIZON", "24"))
+MAX_FORECAST_ROWS = int(os.getenv("PRICE_MAX_FORECAST_ROWS", "20000"))
+
+class PriceSeries(BaseModel):
+    commodity_name: str
+    state_name: str
+    district_name: str
+    avg_min_price: float
+    avg_max_price: float
+    calculationType: str = "Modal Price"
+    change: float = 0.0
+
+class PriceForecastRequest(BaseModel):
+    series: List[PriceSeries]
+    start_month: Optional[str] = None  # full month name; defaults to the current month
+    horizon: int = Field(12, ge=1)
+
+def forecast_months(start_month: Optional[str], horizon: int) -> List[str]:
+    """`horizon` consecutive month names from start_month, wrapping past December"""
+    start = MONTHS.index(start_month.strip().capitalize()) if start_month else time.localtime().tm_mon - 1
+    return [MONTHS[(start + offset) % 12] for offset in range(horizon)]
+
+def expand_forecast_frame(series: List[PriceSeries], months: List[str]) -> pd.DataFrame:
+    """series × months rows, series-major, in the /predict column order"""
+    horizon = len(months)
+    columns = {name: [getattr(item, name) for item in series] for name in PriceSeries.model_fields}
+    return pd.DataFrame({
+        "month": np.tile(np.array(months, dtype=object), len(series)),
+        "commodity_name": np.repeat(np.array(columns["commodity_name"], dtype=object), horizon),
+        "avg_min_price": np.repeat(np.array(columns["avg_min_price"], dtype=float), horizon),
+        "avg_max_price": np.repeat(np.array(columns["avg_max_price"], dtype=float), horizon),
+        "state_name": np.repeat(np.array(columns["state_name"], dtype=object), horizon),
+        "district_name": np.repeat(np.array(columns["district_name"], dtype=object), horizon),
+        "calculationType": np.repeat(np.array(columns["calculationType"], dtype=object), horizon),
+        "change": np.repeat(np.array(columns["change"], dtype=float), horizon)
+    })
+
+# Plain def: FastAPI runs it in the threadpool, so a large forecast doesn't block the event loop
+@router.post("/forecast")
+def forecast_prices(data: PriceForecastRequest):
+    """Price curve over the next `horizon` months for many series, from a single predict call.
+
+    Returns columnar arrays: predicted_price[i][j] is series i in months[j].
+    """
+    if data.start_month and data.start_month.strip().capitalize() not in MONTHS:
+        return JSONResponse(content={
+            "error": "start_month must be a full month name, e.g. 'January'",
+            "status": "error"
+        }, status_code=422)
+    if data.horizon > MAX_FORECAST_HORIZON:
+        return JSONResponse(content={
+            "error": f"horizon can be at most {MAX_FORECAST_HORIZON} months",
+            "status": "error"
+        }, status_code=422)
+    if len(data.series) * data.horizon > MAX_FORECAST_ROWS:
+        return JSONResponse(content={
+            "error": f"Too many series × months. Maximum is {MAX_FORECAST_ROWS} per request",
+            "status": "error"
+        }, status_code=413)
+
+    months = forecast_months(data.start_month, data.horizon)
+    if not data.series:
+        return {"months": months, "series": {"commodity_name": [], "state_name": [], "district_name": []},
+                "predicted_price": [], "model_type": model_type(), "status": "success"}
+
+    try:
+        frame = expand_forecast_frame(data.series, months)
+        predictions = np.asarray(predict_and_shadow(frame), dtype=float).reshape(len(data.series), data.horizon)
+        # JSONResponse directly: the payload is plain lists, skip jsonable_encoder
+        return JSONResponse(content={
+            "months": months,
+            "series": {
+                "commodity_name": [item.commodity_name for item in data.series],
+                "state_name": [item.state_name for item in data.series],
+                "district_name": [item.district_name for item in data.series]
+            },
+            "predicted_price": np.round(predictions, 2).tolist(),
+            "model_type": model_type(),
+            "status": "success"
+        })
+    except Exception as e:
+        return JSONResponse(content={
+            "error": f"Forecast failed: {str(e)}",
+            "status": "error"
+        }, status_code=500)
+
+# --- Model versions: shadow candidate status, promotion and rejection ---
+class CandidateRequest(BaseModel):
+    path: Optional[str] = None
+
+@router.get("/model")
+def price_model_status(x_admin_token: Optional[str] = Header(None)):
+    """Live price model, shadow candidate and its prediction/latency comparison (file paths for admins only)"""
+    return model_manager.status(include_paths=is_admin(x_admin_token))
+
+# Plain def: loading runs in the threadpool while the live model keeps serving
+@router.post("/model/candidate")
+def load_price_candidate(request: Optional[CandidateRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    """Load a version (the watched file, or `path`) as the shadow candidate now"""
+    error = admin_error("price_model", x_admin_token)
+    if error:
+        return error
+    path, error = path_error(request.path if request else None)
+    if error:
+        return error
+    try:
+        candidate = model_manager.load_candidate(path)
+    except Exception as e:
+        return JSONResponse(content={"error": f"Loading candidate failed: {str(e)}", "status": "error"},
+                            status_code=500)
+    if candidate is None:
+        # Already live, or nothing real was serving so it went live directly
+        return {"status": "success", **model_manager.status(include_paths=True)}
+    return {"status": "success", "candidate": candidate.describe()}
+
+@router.post("/model/promote")
+def promote_price_candidate(x_admin_token: Optional[str] = Header(None)):
+    error = admin_error("price_model", x_admin_token)
+    if error:
+        return error
+    try:
+        artifact = model_manager.promote()
+    except LookupError as e:
+        return JSONResponse(content={"error": str(e), "status": "error"}, status_code=409)
+    return {"status": "success", **artifact.describe()}
+
+@router.post("/model/reject")
+def reject_price_candidate(x_admin_token: Optional[str] = Header(None)):
+    error = admin_error("price_model", x_admin_token)
+    if error:
+        return error
+    try:
+        candidate = model_manager.reject()
+    except LookupError as e:
+        return JSONResponse(content={"error": str(e), "status": "error"}, status_code=409)
+    return {"status": "success", "rejected": candidate.describe()}
+
 @router.get("/commodities")
 def get_supported_commodities():
     """Get list of supported commodities"""
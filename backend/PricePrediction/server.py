@@ -14,6 +14,8 @@ import uvicorn
 # Add current directory to Python path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
+# backend/ holds the shared model_registry module
+sys.path.append(os.path.dirname(current_dir))
 
 # Import the price prediction routes
 from routes import router as price_router
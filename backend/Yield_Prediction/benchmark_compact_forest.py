@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare sklearn and CompactForest predict latency, single row and batched, for
+the models exported by compact_forest.py, checking parity on every batch.
+
+Usage (from backend/):
+    python -m Yield_Prediction.benchmark_compact_forest --model-dir Yield_Prediction/saved_models \\
+        --compact-dir Yield_Prediction/compact_models --production Yield_Prediction/crop_production.csv
+"""
+
+import os
+import time
+import pickle
+import argparse
+
+import numpy as np
+
+from .compact_forest import CompactForest, check_parity, sample_inputs, script_dir
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=os.getenv("YIELD_MODEL_DIR"))
+    parser.add_argument("--compact-dir", default=os.path.join(script_dir, "compact_models"))
+    parser.add_argument("--production", help="crop_production.csv to draw yield rows from")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 100, 5000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    if not args.model_dir:
+        parser.error("--model-dir (or YIELD_MODEL_DIR) is required")
+
+    for name in ("crop_recommend_model", "crop_yield_model"):
+        with open(os.path.join(args.model_dir, f"{name}.pkl"), "rb") as f:
+            model = pickle.load(f)
+        compact = CompactForest(os.path.join(args.compact_dir, f"{name}.forest"))
+        frame = sample_inputs(name, model, args.production, max(args.batch))
+
+        print(f"📊 {name}")
+        for size in args.batch:
+            batch = frame.iloc[:size]
+            parity = check_parity(model, compact, batch)
+            sklearn_seconds = best_of(lambda: model.predict(batch), args.repeats)
+            compact_seconds = best_of(lambda: compact.predict(batch), args.repeats)
+            status = "parity OK" if not parity["mismatches"] else f"{parity['mismatches']} MISMATCHES"
+            print(f"   {size:>6} rows   sklearn {sklearn_seconds * 1000:9.2f} ms   "
+                  f"compact {compact_seconds * 1000:9.2f} ms   {sklearn_seconds / compact_seconds:6.1f}x   {status}")
+
+
+if __name__ == "__main__":
+    main()
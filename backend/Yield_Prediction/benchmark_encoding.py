@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare categorical encodings for the yield pipeline on crop_production.csv:
+training time, pickled model size, predict latency and held-out MAE.
+
+    dense    OneHotEncoder(sparse_output=False), the original yield-final.py setup
+    sparse   OneHotEncoder with sparse output (no dense matrix; splits may differ slightly)
+    sparse+dense
+             trained sparse, then given a dense encoder for serving (what train_models.py
+             and yield-final.py save); its predictions must equal the sparse model's
+    ordinal  OrdinalEncoder, one column per categorical feature
+
+Usage (from backend/):
+    python -m Yield_Prediction.benchmark_encoding --production Yield_Prediction/crop_production.csv
+    python -m Yield_Prediction.benchmark_encoding --rows 50000 --trees 20 --encodings sparse ordinal
+"""
+
+import os
+import time
+import pickle
+import argparse
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+from .train_models import CATEGORICAL_FEATURES, YIELD_FEATURES, build_yield_pipeline, dense_for_serving, load_production
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--production", default=os.path.join(script_dir, "crop_production.csv"))
+    parser.add_argument("--rows", type=int, default=0, help="Sample this many rows (default: all)")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--predict-rows", type=int, default=5000)
+    parser.add_argument("--encodings", nargs="+", default=["dense", "sparse", "sparse+dense", "ordinal"])
+    args = parser.parse_args()
+
+    df = load_production(args.production, args.rows)
+    X_train, X_test, y_train, y_test = train_test_split(df[YIELD_FEATURES], df['Yield_log'],
+                                                        test_size=0.2, random_state=42)
+    batch = X_test.iloc[:args.predict_rows]
+    single = X_test.iloc[:1]
+    print(f"📊 {len(X_train)} training rows, {args.trees} trees, "
+          f"{sum(df[c].nunique() for c in CATEGORICAL_FEATURES)} categories\n")
+    print(f"   {'encoding':<12} {'train s':>9} {'model MB':>9} {'1 row ms':>9} {f'{len(batch)} rows ms':>14} {'MAE':>7}")
+
+    for encoding in args.encodings:
+        train_encoding, _, serve_encoding = encoding.partition("+")
+        pipeline = build_yield_pipeline(train_encoding, n_jobs=args.n_jobs, n_estimators=args.trees)
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        if serve_encoding == "dense":
+            trained = pipeline
+            pipeline = dense_for_serving(trained, X_train)
+        train_seconds = time.perf_counter() - start
+        if serve_encoding == "dense" and not np.array_equal(trained.predict(X_test), pipeline.predict(X_test)):
+            raise SystemExit(f"❌ {encoding}: the dense serving encoder changed the predictions")
+
+        model_mb = len(pickle.dumps(pipeline, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6
+        single_ms = best_of(lambda: pipeline.predict(single), 5) * 1000
+        batch_ms = best_of(lambda: pipeline.predict(batch), 3) * 1000
+        mae = mean_absolute_error(y_test, pipeline.predict(X_test))
+        print(f"   {encoding:<12} {train_seconds:>9.1f} {model_mb:>9.1f} {single_ms:>9.2f} {batch_ms:>14.1f} {mae:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
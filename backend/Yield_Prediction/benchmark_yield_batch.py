@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /yield/predict-yield-batch against calling /yield/predict-yield
+once per row, checking that both give the same crop and yield for every row.
+
+Rows are sampled from crop_recommendation.csv (soil and climate) and, when
+--production is given, from the (state, district, season) combinations in
+crop_production.csv. The router runs in-process behind httpx's ASGI transport.
+
+Usage (from backend/):
+    YIELD_MODEL_DIR=Yield_Prediction/saved_models python -m Yield_Prediction.benchmark_yield_batch --rows 5000
+    python -m Yield_Prediction.benchmark_yield_batch --rows 2000 --production crop_production.csv
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+import numpy as np
+import pandas as pd
+import httpx
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+LOCATIONS = [
+    ("Uttar Pradesh", "LUCKNOW", "Kharif"),
+    ("Kerala", "THRISSUR", "Whole Year"),
+    ("Punjab", "LUDHIANA", "Rabi")
+]
+
+
+def sample_rows(count: int, production_path, seed: int):
+    rng = np.random.default_rng(seed)
+    soil = pd.read_csv(os.path.join(script_dir, "crop_recommendation.csv")).drop(columns="label")
+    soil = soil.iloc[rng.integers(0, len(soil), count)].reset_index(drop=True)
+
+    if production_path:
+        production = pd.read_csv(production_path, usecols=["State_Name", "District_Name", "Season"])
+        locations = production.apply(lambda c: c.str.strip()).drop_duplicates().to_numpy()
+    else:
+        locations = np.array(LOCATIONS, dtype=object)
+    picked = locations[rng.integers(0, len(locations), count)]
+
+    rows = soil.to_dict("records")
+    for row, (state, district, season), year in zip(rows, picked, rng.integers(1997, 2015, count)):
+        row.update(State_Name=state, District_Name=district, Season=season, Crop_Year=int(year))
+    return rows
+
+
+async def run(rows, per_row_limit: int):
+    from fastapi import FastAPI
+    from .routes import router, model_loader
+
+    app = FastAPI()
+    app.include_router(router, prefix="/yield")
+    model_loader.start()
+    while not model_loader.ready:
+        if model_loader.state == "failed":
+            raise SystemExit(f"Model loading failed: {model_loader.error}")
+        await asyncio.sleep(0.1)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=600) as client:
+        await client.post("/yield/predict-yield-batch", json={"rows": rows[:10]})
+
+        start = time.perf_counter()
+        response = await client.post("/yield/predict-yield-batch", json={"rows": rows})
+        batch_seconds = time.perf_counter() - start
+        response.raise_for_status()
+        batch = response.json()["results"]
+
+        single_rows = rows[:per_row_limit]
+        start = time.perf_counter()
+        single = [(await client.post("/yield/predict-yield", json=row)).json() for row in single_rows]
+        single_seconds = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(batch, single))
+    return batch_seconds, single_seconds, len(single_rows), mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--per-row", type=int, default=500, help="Rows to send one by one for comparison")
+    parser.add_argument("--production", help="crop_production.csv to sample locations from")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = sample_rows(args.rows, args.production, args.seed)
+    batch_seconds, single_seconds, single_count, mismatches = asyncio.run(run(rows, args.per_row))
+
+    per_row_ms = single_seconds / single_count * 1000
+    print(f"📊 {args.rows} rows\n")
+    print(f"   batch      {batch_seconds:.2f} s  ({args.rows / batch_seconds:,.0f} rows/s)")
+    print(f"   per-row    {per_row_ms:.1f} ms/row over {single_count} rows "
+          f"(~{per_row_ms * args.rows / 1000:.1f} s for all {args.rows})")
+    print(f"   speedup    {per_row_ms * args.rows / 1000 / batch_seconds:.0f}x")
+    print(f"   parity     {'OK' if not mismatches else f'{mismatches} MISMATCHES'} on {single_count} rows")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Precompute the yield pipeline's prediction for every (state, district, season,
+crop) combination in crop_production.csv across a range of years, into a
+memory-mapped table that /yield/predict-yield serves from (YIELD_TABLE_DIR).
+
+Crops are both the ones observed in the production data and the recommendation
+model's labels for every observed (state, district, season), since the serving
+path predicts the yield of the recommended crop. The yield model's SHA-256 is
+recorded so the server ignores a table built from a different model.
+
+Usage (from backend/):
+    python -m Yield_Prediction.build_yield_table --model-dir Yield_Prediction/saved_models \\
+        --production Yield_Prediction/crop_production.csv --years 1997-2030 --out Yield_Prediction/yield_table
+"""
+
+import os
+import json
+import time
+import pickle
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .yield_table import YieldTable, build_perfect_hash, file_sha256, table_key
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+YIELD_COLUMNS = ['State_Name', 'District_Name', 'Crop_Year', 'Season', 'Crop']
+
+
+def load_combinations(production_path: str, recommended_crops) -> pd.DataFrame:
+    df = pd.read_csv(production_path, usecols=['State_Name', 'District_Name', 'Season', 'Crop'])
+    # Same cleaning as yield-final.py, so the keys match the categories the encoder learned
+    df = df.dropna().apply(lambda column: column.str.strip())
+    observed = df.drop_duplicates()
+    locations = observed[['State_Name', 'District_Name', 'Season']].drop_duplicates()
+    recommended = locations.merge(pd.DataFrame({'Crop': list(recommended_crops)}), how='cross')
+    return pd.concat([observed, recommended]).drop_duplicates().reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=os.getenv("YIELD_MODEL_DIR"),
+                        help="Directory with crop_yield_model.pkl and crop_recommend_model.pkl "
+                             "(default: YIELD_MODEL_DIR, else download from YIELD_MODEL_REPO)")
+    parser.add_argument("--production", default=os.path.join(script_dir, "crop_production.csv"))
+    parser.add_argument("--years", default="1997-2030", help="Inclusive Crop_Year range, e.g. 1997-2030")
+    parser.add_argument("--out", default=os.path.join(script_dir, "yield_table"))
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Rows per predict call (bounds memory)")
+    args = parser.parse_args()
+
+    first_year, last_year = (int(part) for part in args.years.split("-"))
+    years = np.arange(first_year, last_year + 1)
+    if len(years) == 0:
+        raise SystemExit(f"❌ Empty year range {args.years}")
+
+    paths = {}
+    for name in ("crop_yield_model.pkl", "crop_recommend_model.pkl"):
+        if args.model_dir:
+            paths[name] = os.path.join(args.model_dir, name)
+        else:
+            from huggingface_hub import hf_hub_download
+            paths[name] = hf_hub_download(repo_id=os.getenv("YIELD_MODEL_REPO", "adityaarun1010/my-new-models"),
+                                          filename=name)
+    with open(paths["crop_yield_model.pkl"], "rb") as f:
+        yield_model_pipeline = pickle.load(f)
+    with open(paths["crop_recommend_model.pkl"], "rb") as f:
+        recommend_model = pickle.load(f)
+
+    combos = load_combinations(args.production, recommend_model.classes_)
+    if combos.empty:
+        # A zero-slot table can't be indexed; don't replace a working one with it
+        raise SystemExit(f"❌ No (state, district, season, crop) combinations in {args.production}")
+    keys = [table_key(*row) for row in combos.itertuples(index=False, name=None)]
+    print(f"--- {len(combos)} combinations x {len(years)} years = {len(combos) * len(years)} predictions ---")
+
+    start = time.perf_counter()
+    displacements, fingerprints, slot_of_key = build_perfect_hash(keys)
+    print(f"Perfect hash built in {time.perf_counter() - start:.1f}s")
+
+    tmp_dir = f"{args.out}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, "displacements.npy"), displacements)
+    np.save(os.path.join(tmp_dir, "fingerprints.npy"), fingerprints)
+    values = np.lib.format.open_memmap(os.path.join(tmp_dir, "values.npy"), mode="w+",
+                                       dtype=np.float64, shape=(len(keys), len(years)))
+
+    # Rows are (combination, year) in combination-major order, predicted chunk by chunk
+    start = time.perf_counter()
+    combos_per_chunk = max(1, args.chunk_size // len(years))
+    for chunk_start in range(0, len(combos), combos_per_chunk):
+        chunk = combos.iloc[chunk_start:chunk_start + combos_per_chunk]
+        frame = chunk.loc[chunk.index.repeat(len(years))].assign(Crop_Year=np.tile(years, len(chunk)))
+        predicted = np.expm1(yield_model_pipeline.predict(frame[YIELD_COLUMNS]))
+        values[slot_of_key[chunk_start:chunk_start + len(chunk)]] = predicted.reshape(len(chunk), len(years))
+        done = chunk_start + len(chunk)
+        print(f"  {done}/{len(combos)} combinations ({time.perf_counter() - start:.0f}s)", end="\r")
+    values.flush()
+    del values
+    print()
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "first_year": first_year,
+            "last_year": last_year,
+            "combinations": len(keys),
+            "model_sha256": file_sha256(paths["crop_yield_model.pkl"]),
+            "production": os.path.basename(args.production),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }, f, indent=2)
+
+    # Spot-check the table against the forest before publishing it
+    table = YieldTable(tmp_dir)
+    sample = combos.sample(min(200, len(combos)), random_state=42).assign(
+        Crop_Year=np.random.default_rng(42).choice(years, min(200, len(combos))))
+    expected = np.expm1(yield_model_pipeline.predict(sample[YIELD_COLUMNS]))
+    looked_up = np.array([table.lookup(r.State_Name, r.District_Name, r.Season, r.Crop, int(r.Crop_Year))
+                          for r in sample.itertuples()])
+    if not np.allclose(looked_up, expected, rtol=0, atol=1e-9):
+        raise SystemExit(f"❌ Table disagrees with the model; left {tmp_dir} for inspection")
+
+    if os.path.exists(args.out):
+        # Servers that already mapped the old files keep reading them until they reload
+        shutil.rmtree(args.out)
+    os.replace(tmp_dir, args.out)
+    size_mb = sum(os.path.getsize(os.path.join(args.out, name)) for name in os.listdir(args.out)) / 1e6
+    print(f"✅ Yield table written to {args.out} ({size_mb:.1f} MB, spot check OK on {len(sample)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Compact inference for the random forests trained in yield-final.py.
+
+export_forest() flattens a fitted random forest or extra-trees classifier or
+regressor, or the yield Pipeline (OneHotEncoder or OrdinalEncoder + passthrough
+-> forest), into contiguous NumPy arrays, and CompactForest predicts
+from them for a whole batch at once, walking every (tree, row) pair one level
+per step. One-hot splits are kept as "category == code" tests on the original
+column, so rows are never expanded into hundreds of dense one-hot columns.
+
+Usage (from backend/), exporting next to the pickles and checking parity:
+    python -m Yield_Prediction.compact_forest --model-dir Yield_Prediction/saved_models \\
+        --out Yield_Prediction/compact_models --production Yield_Prediction/crop_production.csv
+"""
+
+import os
+import json
+import time
+import pickle
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .yield_table import file_sha256
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ARRAY_NAMES = ("feature", "lower", "upper", "children", "leaf_of_node", "leaf_values", "roots")
+# Below this many (tree, row) pairs a single thread is faster than splitting the trees
+PARALLEL_MIN_PAIRS = 20000
+
+# One pool for every CompactForest, so hot swaps and rollbacks don't each leave a pool of threads behind
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(os.cpu_count() or 1, thread_name_prefix="forest")
+        return _executor
+
+
+def _split_pipeline(model):
+    """(input schema, forest) where each schema entry is {"name", "categories" or None}"""
+    from sklearn.pipeline import Pipeline
+
+    if not isinstance(model, Pipeline):
+        return [{"name": str(name), "categories": None} for name in model.feature_names_in_], None, model
+
+    preprocessor, forest = model.steps[0][1], model.steps[-1][1]
+    inputs: List[Dict[str, Any]] = []
+    # Transformed column index -> (input index, category code or None)
+    columns: List[tuple] = []
+    for name, transformer, feature_names in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        feature_names = [preprocessor.feature_names_in_[i] if isinstance(i, (int, np.integer)) else i
+                         for i in feature_names]
+        if hasattr(transformer, "categories_"):
+            if getattr(transformer, "drop", None) is not None or getattr(transformer, "infrequent_categories_", None):
+                raise ValueError("Only encoders without drop or infrequent categories are supported")
+            one_hot = hasattr(transformer, "sparse_output")
+            if not one_hot and transformer.unknown_value not in (-1, None):
+                raise ValueError("OrdinalEncoder must use unknown_value=-1")
+            for feature_name, categories in zip(feature_names, transformer.categories_):
+                inputs.append({"name": str(feature_name), "categories": [str(c) for c in categories]})
+                if one_hot:
+                    columns.extend((len(inputs) - 1, code) for code in range(len(categories)))
+                else:
+                    # Ordinal codes are split on numerically, like any passthrough column
+                    columns.append((len(inputs) - 1, None))
+        elif transformer == "passthrough" or getattr(transformer, "func", "not passthrough") is None:
+            for feature_name in feature_names:
+                inputs.append({"name": str(feature_name), "categories": None})
+                columns.append((len(inputs) - 1, None))
+        else:
+            raise ValueError(f"Unsupported transformer {name!r}: {transformer!r}")
+    return inputs, columns, forest
+
+
+def export_forest(model, path: str, source_sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Write the model's trees as .npy arrays plus meta.json into the directory `path`"""
+    from sklearn.ensemble import ExtraTreesClassifier, ExtraTreesRegressor, RandomForestClassifier, RandomForestRegressor
+
+    inputs, columns, forest = _split_pipeline(model)
+    if not isinstance(forest, (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)):
+        raise ValueError(f"Unsupported model {type(forest).__name__}")
+    is_classifier = isinstance(forest, (RandomForestClassifier, ExtraTreesClassifier))
+    if forest.n_outputs_ != 1:
+        raise ValueError("Only single-output forests are supported")
+
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in ARRAY_NAMES}
+    node_offset = leaf_offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # Leaves point to themselves, so finished rows can keep stepping until the next compaction
+        children = np.stack([np.where(is_leaf, nodes, tree.children_left),
+                             np.where(is_leaf, nodes, tree.children_right)], axis=1) + node_offset
+        feature = np.where(is_leaf, 0, tree.feature)
+        # A row goes right when lower < x <= upper; leaves never go right
+        lower = np.where(is_leaf, np.inf, tree.threshold)
+        upper = np.full(tree.node_count, np.inf)
+
+        if columns is not None:
+            # A one-hot split "x_j <= 0.5" goes right exactly when the column's code equals j's category
+            mapped = [columns[f] for f in feature]
+            feature = np.array([input_index for input_index, _ in mapped])
+            codes = np.array([-1 if code is None else code for _, code in mapped])
+            is_category = ~is_leaf & (codes >= 0)
+            if np.any((tree.threshold[is_category] < 0) | (tree.threshold[is_category] >= 1)):
+                raise ValueError("Unexpected threshold on a one-hot column")
+            lower = np.where(is_category, codes - 0.5, lower)
+            upper = np.where(is_category, codes + 0.5, upper)
+
+        values = tree.value[is_leaf][:, 0, :]
+        if is_classifier:
+            totals = values.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            values = values / totals
+        leaf_of_node = np.full(tree.node_count, -1)
+        leaf_of_node[is_leaf] = np.arange(is_leaf.sum()) + leaf_offset
+
+        parts["feature"].append(feature.astype(np.int32))
+        parts["lower"].append(lower.astype(np.float64))
+        parts["upper"].append(upper)
+        parts["children"].append(children.astype(np.int32).ravel())
+        parts["leaf_of_node"].append(leaf_of_node.astype(np.int32))
+        parts["leaf_values"].append(values.astype(np.float64))
+        parts["roots"].append(np.array([node_offset], dtype=np.int32))
+        node_offset += tree.node_count
+        leaf_offset += len(values)
+
+    meta = {
+        "kind": "classifier" if is_classifier else "regressor",
+        "inputs": inputs,
+        "classes": [str(c) for c in forest.classes_] if is_classifier else None,
+        "n_trees": len(forest.estimators_),
+        "n_nodes": node_offset,
+        "max_depth": max(estimator.tree_.max_depth for estimator in forest.estimators_),
+        "source_sha256": source_sha256,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    os.makedirs(path, exist_ok=True)
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(path, f"{name}.npy"), np.concatenate(parts[name]))
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class CompactForest:
+    """Batch predictor over a forest exported by export_forest(); a drop-in for its predict()
+
+    Large batches split the trees into n_threads chunks on the module's shared
+    pool; NumPy releases the GIL while gathering, so the chunks run in parallel
+    like sklearn's n_jobs.
+    """
+
+    def __init__(self, path: str, mmap: bool = False, n_threads: Optional[int] = None):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        mmap_mode = "r" if mmap else None
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+        self.inputs = self.meta["inputs"]
+        self.category_codes = [
+            {category: code for code, category in enumerate(spec["categories"])} if spec["categories"] else None
+            for spec in self.inputs
+        ]
+        self.classes_ = np.array(self.meta["classes"], dtype=object) if self.meta["classes"] else None
+        self.n_trees = self.meta["n_trees"]
+        self.source_sha256 = self.meta.get("source_sha256")
+        # Only category tests have a finite upper bound; purely numeric forests skip that check
+        self.has_categories = any(spec["categories"] for spec in self.inputs)
+        self.n_threads = max(1, min(n_threads or os.cpu_count() or 1, self.n_trees))
+
+    def encode(self, data) -> np.ndarray:
+        """(rows, inputs) float64 matrix from a DataFrame or a dict of columns; unknown categories become -1"""
+        columns = []
+        for spec, codes in zip(self.inputs, self.category_codes):
+            values = data[spec["name"]]
+            if codes is None:
+                # sklearn compares float32 inputs against the thresholds; match it exactly
+                columns.append(np.asarray(values, dtype=np.float32).astype(np.float64))
+            else:
+                columns.append(np.array([codes.get(str(value), -1) for value in values], dtype=np.float64))
+        return np.column_stack(columns)
+
+    def _walk(self, X: np.ndarray, roots: np.ndarray) -> np.ndarray:
+        n_rows, n_inputs = X.shape
+        flat_X = X.ravel()
+        nodes = np.repeat(roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows) * n_inputs, len(roots))
+        positions = np.arange(len(nodes))
+        reached = np.empty(len(nodes), dtype=np.int32)
+        level = 0
+        while len(nodes):
+            x = np.take(flat_X, row_offsets + np.take(self.feature, nodes))
+            go_right = x > np.take(self.lower, nodes)
+            if self.has_categories:
+                go_right &= x <= np.take(self.upper, nodes)
+            next_nodes = np.take(self.children, nodes * 2 + go_right)
+            level += 1
+            # Dropping finished pairs costs a few passes, so only do it every few levels
+            if level % 4:
+                nodes = next_nodes
+                continue
+            done = next_nodes == nodes
+            reached[positions[done]] = nodes[done]
+            active = ~done
+            nodes, row_offsets, positions = next_nodes[active], row_offsets[active], positions[active]
+        return np.take(self.leaf_of_node, reached).reshape(len(roots), n_rows)
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """(trees, rows) leaf indices reached by each row in each tree"""
+        if self.n_threads == 1 or self.n_trees * len(X) < PARALLEL_MIN_PAIRS:
+            return self._walk(X, self.roots)
+        chunks = np.array_split(self.roots, self.n_threads)
+        return np.concatenate(list(shared_executor().map(lambda roots: self._walk(X, roots), chunks)))
+
+    def _accumulate(self, data) -> np.ndarray:
+        # Summing over the tree axis adds tree by tree, in the same order as sklearn
+        return np.add.reduce(np.take(self.leaf_values, self.leaves(self.encode(data)), axis=0), axis=0) / self.n_trees
+
+    def predict_proba(self, data) -> np.ndarray:
+        return self._accumulate(data)
+
+    def predict(self, data) -> np.ndarray:
+        if self.meta["kind"] == "classifier":
+            return self.classes_[np.argmax(self._accumulate(data), axis=1)]
+        return self._accumulate(data)[:, 0]
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+
+def sample_inputs(name: str, model, production_path: Optional[str], rows: int, seed: int = 42):
+    """Realistic rows to compare the compact forest with sklearn on"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    if name == "crop_recommend_model":
+        frame = pd.read_csv(os.path.join(script_dir, "crop_recommendation.csv")).drop(columns="label")
+        frame = frame.iloc[rng.integers(0, len(frame), rows)].reset_index(drop=True)
+        # Jitter so rows also land between the training points
+        return frame * rng.uniform(0.9, 1.1, frame.shape)
+
+    inputs, _, _ = _split_pipeline(model)
+    if production_path:
+        production = pd.read_csv(production_path).dropna()
+        frame = production.iloc[rng.integers(0, len(production), rows)].reset_index(drop=True)
+        frame = frame.apply(lambda column: column.str.strip() if column.dtype == object else column)
+    else:
+        frame = pd.DataFrame({spec["name"]: rng.choice(spec["categories"], rows)
+                              for spec in inputs if spec["categories"]})
+        frame["Crop_Year"] = rng.integers(1997, 2031, rows)
+    # A few unseen categories exercise the handle_unknown='ignore' path
+    frame.loc[frame.index[::50], "District_Name"] = "UNSEEN DISTRICT"
+    return frame[list(model.feature_names_in_)]
+
+
+def check_parity(model, compact: CompactForest, frame) -> Dict[str, Any]:
+    expected = model.predict(frame)
+    actual = compact.predict(frame)
+    if compact.meta["kind"] == "classifier":
+        mismatches = int(np.sum(expected != actual))
+        max_error = float(np.max(np.abs(model.predict_proba(frame) - compact.predict_proba(frame))))
+    else:
+        mismatches = int(np.sum(~np.isclose(expected, actual, rtol=1e-12, atol=1e-12)))
+        max_error = float(np.max(np.abs(expected - actual)))
+    return {"rows": len(frame), "mismatches": mismatches, "max_abs_error": max_error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=os.getenv("YIELD_MODEL_DIR"),
+                        help="Directory with the .pkl models (default: YIELD_MODEL_DIR)")
+    parser.add_argument("--out", default=os.path.join(script_dir, "compact_models"))
+    parser.add_argument("--production", help="crop_production.csv to draw yield parity rows from")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows for the parity check")
+    args = parser.parse_args()
+    if not args.model_dir:
+        parser.error("--model-dir (or YIELD_MODEL_DIR) is required")
+
+    for name in ("crop_recommend_model", "crop_yield_model"):
+        pickle_path = os.path.join(args.model_dir, f"{name}.pkl")
+        start = time.perf_counter()
+        with open(pickle_path, "rb") as f:
+            model = pickle.load(f)
+        pickle_seconds = time.perf_counter() - start
+
+        path = os.path.join(args.out, f"{name}.forest")
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        meta = export_forest(model, tmp_path, source_sha256=file_sha256(pickle_path))
+        start = time.perf_counter()
+        compact = CompactForest(tmp_path)
+        compact_seconds = time.perf_counter() - start
+
+        parity = check_parity(model, compact, sample_inputs(name, model, args.production, args.rows))
+        if parity["mismatches"]:
+            raise SystemExit(f"❌ {name}: {parity['mismatches']}/{parity['rows']} predictions differ from sklearn; "
+                             f"left {tmp_path} for inspection")
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+        print(f"✅ {name}: {meta['n_trees']} trees, {meta['n_nodes']} nodes, depth {meta['max_depth']} -> {path}")
+        print(f"   {os.path.getsize(pickle_path) / 1e6:.1f} MB pickle ({pickle_seconds:.2f}s to load) vs "
+              f"{compact.nbytes() / 1e6:.1f} MB arrays ({compact_seconds:.2f}s); "
+              f"parity OK on {parity['rows']} rows (max abs error {parity['max_abs_error']:.2g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundModelLoader:
+    """Downloads and unpickles models on a background thread so the server starts instantly.
+
+    Until load_fn succeeds, `ready` is False and callers should answer 503 with
+    retry_after(). Failed loads (network, missing file) are retried with backoff.
+    """
+
+    def __init__(self, name: str, load_fn: Callable[[], Dict[str, Any]],
+                 expected_load_seconds: float = 30.0, max_retry_seconds: float = 300.0):
+        self.name = name
+        self.load_fn = load_fn
+        self.expected_load_seconds = expected_load_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.models: Dict[str, Any] = {}
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.load_seconds: Optional[float] = None
+        self._attempt_started = 0.0
+        self._next_attempt = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        """Start loading in the background (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-model-loader", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        delay = 5.0
+        while True:
+            self.attempts += 1
+            self.state = "loading"
+            self._attempt_started = time.monotonic()
+            try:
+                models = self.load_fn()
+            except Exception as e:
+                self.error = str(e)
+                self.state = "failed"
+                self._next_attempt = time.monotonic() + delay
+                print(f"❌ Error loading {self.name} models (attempt {self.attempts}, retrying in {delay:.0f}s): {e}")
+                time.sleep(delay)
+                delay = min(self.max_retry_seconds, delay * 2)
+                continue
+
+            self.models = models
+            self.load_seconds = time.monotonic() - self._attempt_started
+            self.error = None
+            self.state = "ready"
+            print(f"✅ {self.name} models ready in {self.load_seconds:.1f}s")
+            return
+
+    def retry_after(self) -> int:
+        """Seconds a client should wait before retrying"""
+        if self.state == "failed":
+            return max(1, int(self._next_attempt - time.monotonic()) + 1)
+        if self.state == "loading":
+            elapsed = time.monotonic() - self._attempt_started
+            return max(1, int(self.expected_load_seconds - elapsed) + 1)
+        return 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "models": sorted(self.models),
+            "attempts": self.attempts,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "error": self.error,
+            "retry_after": None if self.ready else self.retry_after()
+        }
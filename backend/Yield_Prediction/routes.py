@@ -4,48 +4,111 @@ import os
 import pickle
 import numpy as np
 import pandas as pd
+from typing import List
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from huggingface_hub import hf_hub_download
 from fastapi.middleware.cors import CORSMiddleware
 
+from .model_loader import BackgroundModelLoader
+from .yield_table import YieldTable
+from .compact_forest import CompactForest
+from model_registry import registry, ModelSpec
+
 # --- 1. Initialize FastAPI app ---
 router = APIRouter()
 
 # --- 2. Load The Trained Models ---
+# Downloading and unpickling the forests takes tens of seconds, so it happens on a
+# background thread after startup; until then the endpoints answer 503 with Retry-After.
+
+# Models resolve through the shared registry (local dirs, then its cache, then the hub)
+# and can be hot-swapped with POST /models/{name}/reload.
 
 # Get the absolute path of the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
-recommend_model_path = hf_hub_download(
-    repo_id="adityaarun1010/my-new-models",
-    filename="crop_recommend_model.pkl"
-)
-
-
-yield_model_path = hf_hub_download(
-    repo_id="adityaarun1010/my-new-models",
-    filename="crop_yield_model.pkl"
+MODEL_REPO_ID = os.getenv("YIELD_MODEL_REPO", "adityaarun1010/my-new-models")
+# Directory with crop_recommend_model.pkl / crop_yield_model.pkl (e.g. saved_models/ from
+# yield-final.py); when set, the Hugging Face download is skipped
+MODEL_DIR = os.getenv("YIELD_MODEL_DIR")
+MODEL_FILES = {
+    "recommend": "crop_recommend_model.pkl",
+    "yield": "crop_yield_model.pkl"
+}
+# Forests flattened by compact_forest.py; when present they are served instead of the pickles
+COMPACT_MODEL_DIR = os.getenv("YIELD_COMPACT_MODEL_DIR", os.path.join(script_dir, "compact_models"))
+# Precomputed predictions from build_yield_table.py, answered without running the forest
+YIELD_TABLE_DIR = os.getenv("YIELD_TABLE_DIR", os.path.join(script_dir, "yield_table"))
+
+def load_model_file(path):
+    if os.path.isdir(path):
+        # Memory-mapped so reloads and worker processes share the page cache
+        return CompactForest(path, mmap=True)
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+for name, filename in MODEL_FILES.items():
+    registry.register(ModelSpec(
+        f"crop_{name}_model",
+        filename,
+        load_model_file,
+        repo_id=MODEL_REPO_ID,
+        local_paths=[
+            COMPACT_MODEL_DIR and os.path.join(COMPACT_MODEL_DIR, filename.replace(".pkl", ".forest")),
+            MODEL_DIR and os.path.join(MODEL_DIR, filename)
+        ]
+    ))
+
+def current_model(name):
+    return registry.get(f"crop_{name}_model")
+
+def model_checksum(name):
+    """SHA-256 of the pickle a model came from (compact forests record their source's)"""
+    artifact = registry.artifact(f"crop_{name}_model")
+    return getattr(artifact.obj, "source_sha256", None) or artifact.sha256
+
+def load_yield_table(model_sha256):
+    if not YIELD_TABLE_DIR or not os.path.exists(os.path.join(YIELD_TABLE_DIR, "meta.json")):
+        return None
+    table = YieldTable(YIELD_TABLE_DIR)
+    if table.meta.get("model_sha256") != model_sha256:
+        print(f"⚠️ Ignoring yield table in {YIELD_TABLE_DIR}: it was built from a different yield model")
+        return None
+    print(f"✅ Loaded yield table with {table.n_slots} combinations ({table.first_year}-{table.last_year})")
+    return table
+
+def current_yield_table():
+    """The precomputed table, unless the yield model has been hot-swapped since it was built"""
+    table = model_loader.models.get("table")
+    if table is not None and table.meta.get("model_sha256") == model_checksum("yield"):
+        return table
+    return None
+
+def load_models():
+    for name in MODEL_FILES:
+        registry.load(f"crop_{name}_model")
+    return {"table": load_yield_table(model_checksum("yield"))}
+
+model_loader = BackgroundModelLoader(
+    "Yield prediction",
+    load_models,
+    expected_load_seconds=float(os.getenv("YIELD_MODEL_EXPECTED_LOAD_SECONDS", "30"))
 )
 
-
-try:
-    def load_and_use_model():
-        with open("your_model.pkl", "rb") as file:
-            model = pickle.load(file)
-    # use model here in this function only
-
-    print("✅ Crop recommendation model loaded successfully.")
-except FileNotFoundError:
-    print(f"❌ Error: Recommendation model not found at {recommend_model_path}")
-    recommend_model = None
-
-try:
-    with open(yield_model_path, 'rb') as file:
-        yield_model_pipeline = pickle.load(file)
-    print("✅ Crop yield prediction model loaded successfully.")
-except FileNotFoundError:
-    print(f"❌ Error: Yield model not found at {yield_model_path}")
-    yield_model_pipeline = None
+@router.on_event("startup")
+def start_model_loading():
+    model_loader.start()
+
+def models_loading_response():
+    """503 while the models are still downloading or unpickling"""
+    # Routers mounted without running startup events still get their models
+    model_loader.start()
+    retry_after = model_loader.retry_after()
+    return JSONResponse(content={
+        "error": "Models are still loading. Please retry shortly.",
+        "status": model_loader.state,
+        "retry_after": retry_after
+    }, status_code=503, headers={"Retry-After": str(retry_after)})
 
 # --- 3. Define the Input Data Model using Pydantic ---
 # This ensures that the data sent from the frontend matches what the model expects.
@@ -62,43 +125,102 @@ class CropInput(BaseModel):
     Season: str
     Crop_Year: int = 2024 # Default to current year or make it an input
 
+class CropBatchInput(BaseModel):
+    rows: List[CropInput]
+
+RECOMMEND_FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+YIELD_FEATURES = ['State_Name', 'District_Name', 'Crop_Year', 'Season', 'Crop']
+MAX_BATCH_ROWS = int(os.getenv("YIELD_MAX_BATCH_ROWS", "20000"))
+
+def predict_rows(rows: List[CropInput]):
+    """Recommended crop and yield for every row, with one predict call per model"""
+    columns = {name: [getattr(row, name) for row in rows] for name in RECOMMEND_FEATURES + YIELD_FEATURES[:-1]}
+
+    # Part A: Predict Crop Recommendation
+    recommend_features_df = pd.DataFrame({name: columns[name] for name in RECOMMEND_FEATURES})
+    recommended_crops = current_model("recommend").predict(recommend_features_df)
+
+    # Part B: Predict Yield for the Recommended Crop, from the precomputed table where possible
+    predicted_yield = np.full(len(rows), np.nan)
+    table = current_yield_table()
+    if table is not None:
+        predicted_yield[:] = [
+            np.nan if value is None else value
+            for value in table.lookup_many(zip(columns['State_Name'], columns['District_Name'],
+                                               columns['Season'], recommended_crops, columns['Crop_Year']))
+        ]
+    missing = np.flatnonzero(np.isnan(predicted_yield))
+    if len(missing):
+        yield_features_df = pd.DataFrame({
+            'State_Name': [columns['State_Name'][i] for i in missing],
+            'District_Name': [columns['District_Name'][i] for i in missing],
+            'Crop_Year': [columns['Crop_Year'][i] for i in missing],
+            'Season': [columns['Season'][i] for i in missing],
+            'Crop': recommended_crops[missing]
+        })
+        predicted_log_yield = current_model("yield").predict(yield_features_df)
+        predicted_yield[missing] = np.expm1(predicted_log_yield)
+    return recommended_crops, predicted_yield
+
 # --- 4. Create the Prediction Endpoint ---
 @router.post("/predict-yield")
 async def predict_yield(data: CropInput):
-    if not recommend_model or not yield_model_pipeline:
-        return {"error": "Models are not loaded. Please check server logs."}
+    if not model_loader.ready:
+        return models_loading_response()
 
     try:
-        # Part A: Predict Crop Recommendation
-        recommend_features_df = pd.DataFrame(
-            [[data.N, data.P, data.K, data.temperature, data.humidity, data.ph, data.rainfall]],
-            columns=['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-        )
-        recommended_crop = recommend_model.predict(recommend_features_df)[0]
-
-        # Part B: Predict Yield for the Recommended Crop
-        yield_features_df = pd.DataFrame({
-            'State_Name': [data.State_Name],
-            'District_Name': [data.District_Name],
-            'Crop_Year': [data.Crop_Year],
-            'Season': [data.Season],
-            'Crop': [recommended_crop]
-        })
-        
-        predicted_log_yield = yield_model_pipeline.predict(yield_features_df)
-        # Extract the float value from the numpy array
-        predicted_yield = np.expm1(predicted_log_yield)
+        recommended_crops, predicted_yield = predict_rows([data])
 
         # Return the results as JSON
         return {
-            "recommended_crop": recommended_crop.upper(),
+            "recommended_crop": recommended_crops[0].upper(),
             "predicted_yield": f"{predicted_yield[0]:.2f}"
         }
     except Exception as e:
         return {"error": f"An error occurred during prediction: {str(e)}"}
 
+# Plain def: FastAPI runs it in the threadpool, so a large batch doesn't block the event loop
+@router.post("/predict-yield-batch")
+def predict_yield_batch(data: CropBatchInput):
+    """Recommended crop and predicted yield for many rows, returned in request order"""
+    if not model_loader.ready:
+        return models_loading_response()
+    if len(data.rows) > MAX_BATCH_ROWS:
+        return JSONResponse(content={
+            "error": f"Too many rows. Maximum is {MAX_BATCH_ROWS} per request",
+            "status": "error"
+        }, status_code=413)
+    if not data.rows:
+        return {"count": 0, "results": []}
+
+    try:
+        recommended_crops, predicted_yield = predict_rows(data.rows)
+        # JSONResponse directly: the results are plain strings, skip jsonable_encoder
+        return JSONResponse(content={
+            "count": len(data.rows),
+            "results": [
+                {"recommended_crop": crop.upper(), "predicted_yield": f"{value:.2f}"}
+                for crop, value in zip(recommended_crops, predicted_yield.tolist())
+            ]
+        })
+    except Exception as e:
+        return JSONResponse(content={
+            "error": f"An error occurred during prediction: {str(e)}",
+            "status": "error"
+        }, status_code=500)
+
 # --- 5. Root endpoint for testing ---
 @router.get("/")
 def read_root():
     return {"message": "LeafLense Yield Prediction API is running."}
 
+@router.get("/health")
+def health_check():
+    """Readiness of the recommendation and yield models"""
+    return {
+        "status": "healthy" if model_loader.ready else "loading",
+        "models": model_loader.status(),
+        "versions": registry.status([f"crop_{name}_model" for name in MODEL_FILES]),
+        "yield_table": current_yield_table().stats() if model_loader.ready and current_yield_table() else None
+    }
+
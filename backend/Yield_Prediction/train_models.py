@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Train the crop recommendation and yield models into a versioned artifact directory.
+
+Both CSVs are read with explicit dtypes (categorical columns as pandas
+categories). Every hyperparameter combination of both models is trained as a
+separate trial on a process pool sized to the available cores, and the best
+trial per model (accuracy / MAE on the held-out 20%) is kept. The output is
+
+    <out>/<version>/crop_recommend_model.pkl
+    <out>/<version>/crop_yield_model.pkl
+    <out>/<version>/metadata.json      feature schema, params, metrics, sha256, timings
+    <out>/LATEST                       name of the newest version
+
+so YIELD_MODEL_DIR can point at <out>/<version>.
+
+Usage (from backend/):
+    python -m Yield_Prediction.train_models --production Yield_Prediction/crop_production.csv
+    python -m Yield_Prediction.train_models --jobs 8 \\
+        --yield-grid n_estimators=100,200 min_samples_leaf=1,2 --recommend-grid max_depth=None,20
+"""
+
+import os
+import ast
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import platform
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, mean_absolute_error
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+from .yield_table import file_sha256
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CATEGORICAL_FEATURES = ['State_Name', 'District_Name', 'Season', 'Crop']
+YIELD_FEATURES = ['State_Name', 'District_Name', 'Crop_Year', 'Season', 'Crop']
+RECOMMEND_FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+PRODUCTION_DTYPES = {
+    'State_Name': 'category',
+    'District_Name': 'category',
+    'Crop_Year': 'int16',
+    'Season': 'category',
+    'Crop': 'category',
+    'Area': 'float64',
+    'Production': 'float64'
+}
+RECOMMENDATION_DTYPES = {**{feature: 'float64' for feature in RECOMMEND_FEATURES}, 'label': 'category'}
+MODEL_FILES = {"recommend": "crop_recommend_model.pkl", "yield": "crop_yield_model.pkl"}
+
+
+def make_encoder(encoding: str):
+    if encoding == "dense":
+        return OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+    if encoding == "sparse":
+        return OneHotEncoder(handle_unknown='ignore', sparse_output=True)
+    if encoding == "ordinal":
+        return OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+    raise ValueError(f"Unknown encoding {encoding!r}")
+
+
+def build_yield_pipeline(encoding: str = "sparse", n_jobs: int = -1, **params) -> Pipeline:
+    preprocessor = ColumnTransformer(
+        transformers=[('cat', make_encoder(encoding), CATEGORICAL_FEATURES)],
+        remainder='passthrough'
+    )
+    params = {"n_estimators": 100, "random_state": 42, **params}
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('regressor', RandomForestRegressor(n_jobs=n_jobs, **params))
+    ])
+
+
+def dense_for_serving(pipeline: Pipeline, X: pd.DataFrame) -> Pipeline:
+    """Swap a sparse-trained yield pipeline's encoder for a dense one before it is saved.
+
+    Sparse one-hot output only pays off while fitting; a single-row predict on it is
+    slower than on a dense row. The dense encoder is fitted on the same rows, so the
+    columns, and therefore the forest's predictions, are unchanged.
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    encoder = preprocessor.named_transformers_['cat']
+    if not (isinstance(encoder, OneHotEncoder) and encoder.sparse_output):
+        return pipeline
+    dense = clone(preprocessor).set_params(cat__sparse_output=False).fit(X)
+    return Pipeline(steps=[('preprocessor', dense), ('regressor', pipeline.named_steps['regressor'])])
+
+
+def build_recommend_model(n_jobs: int = -1, **params) -> RandomForestClassifier:
+    return RandomForestClassifier(n_jobs=n_jobs, **{"n_estimators": 100, "random_state": 42, **params})
+
+
+def load_production(path: str, rows: int = 0) -> pd.DataFrame:
+    """crop_production.csv cleaned the same way as yield-final.py, with the log-yield target"""
+    df = pd.read_csv(path, dtype=PRODUCTION_DTYPES)
+    for column in CATEGORICAL_FEATURES:
+        stripped = df[column].cat.categories.str.strip()
+        if stripped.is_unique:
+            df[column] = df[column].cat.rename_categories(stripped)
+        else:
+            # Stripping merges categories (e.g. "Kharif     " and "Kharif"), so re-derive them
+            df[column] = df[column].str.strip().astype('category')
+    df = df.dropna()
+    df['Yield'] = df['Production'] / df['Area']
+    df = df.replace([np.inf, -np.inf], np.nan).dropna(subset=['Yield'])
+    df['Yield_log'] = np.log1p(df['Yield'])
+    if rows and rows < len(df):
+        df = df.sample(rows, random_state=42)
+    return df
+
+
+def load_recommendation(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, dtype=RECOMMENDATION_DTYPES)
+
+
+@lru_cache(maxsize=None)
+def load_split(model: str, path: str, rows: int):
+    """Train/test split per worker process, loaded once however many trials it runs"""
+    if model == "yield":
+        df = load_production(path, rows)
+        X, y = df[YIELD_FEATURES], df['Yield_log']
+    else:
+        df = load_recommendation(path)
+        X, y = df[RECOMMEND_FEATURES], df['label'].astype(str)
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def run_trial(model: str, path: str, rows: int, params: Dict[str, Any], encoding: str,
+              n_jobs: int, tmp_dir: str, trial: int) -> Dict[str, Any]:
+    """Fit one configuration, score it on the held-out split and pickle it to tmp_dir"""
+    timings = {}
+    start = time.perf_counter()
+    X_train, X_test, y_train, y_test = load_split(model, path, rows)
+    timings["load"] = time.perf_counter() - start
+
+    if model == "yield":
+        estimator = build_yield_pipeline(encoding, n_jobs=n_jobs, **params)
+    else:
+        estimator = build_recommend_model(n_jobs=n_jobs, **params)
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    timings["fit"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = estimator.predict(X_test)
+    if model == "yield":
+        metrics = {"mae_log_yield": float(mean_absolute_error(y_test, predicted))}
+    else:
+        metrics = {"accuracy": float(accuracy_score(y_test, predicted))}
+    timings["evaluate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if model == "yield":
+        estimator = dense_for_serving(estimator, X_train)
+    artifact = os.path.join(tmp_dir, f"{model}-{trial}.pkl")
+    with open(artifact, "wb") as f:
+        pickle.dump(estimator, f, protocol=pickle.HIGHEST_PROTOCOL)
+    timings["save"] = time.perf_counter() - start
+
+    return {
+        "model": model,
+        "trial": trial,
+        "params": params,
+        "metrics": metrics,
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "artifact": artifact,
+        "schema": feature_schema(X_train)
+    }
+
+
+def feature_schema(X: pd.DataFrame) -> List[Dict[str, Any]]:
+    schema = []
+    for column in X.columns:
+        entry = {"name": column, "dtype": str(X[column].dtype)}
+        if isinstance(X[column].dtype, pd.CategoricalDtype):
+            entry["categories"] = len(X[column].cat.categories)
+        schema.append(entry)
+    return schema
+
+
+def parse_grid(specs: List[str]) -> List[Dict[str, Any]]:
+    """["n_estimators=100,200", "max_depth=None,20"] -> the 4 combinations as dicts"""
+    axes = []
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Expected name=v1,v2 in {spec!r}")
+        parsed = []
+        for value in values.split(","):
+            try:
+                parsed.append(ast.literal_eval(value))
+            except (ValueError, SyntaxError):
+                parsed.append(value)
+        axes.append([(name, value) for value in parsed])
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+
+def best_trial(trials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if trials[0]["model"] == "yield":
+        return min(trials, key=lambda t: t["metrics"]["mae_log_yield"])
+    return max(trials, key=lambda t: t["metrics"]["accuracy"])
+
+
+def data_fingerprint(path: str) -> Dict[str, Any]:
+    return {"file": os.path.basename(path), "sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--production", default=os.path.join(script_dir, "crop_production.csv"))
+    parser.add_argument("--recommendation", default=os.path.join(script_dir, "crop_recommendation.csv"))
+    parser.add_argument("--out", default=os.path.join(script_dir, "saved_models"))
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Cores to use in total")
+    parser.add_argument("--encoding", default="sparse", choices=["sparse", "ordinal", "dense"])
+    parser.add_argument("--yield-grid", nargs="*", default=[], help="name=v1,v2 ... for RandomForestRegressor")
+    parser.add_argument("--recommend-grid", nargs="*", default=[], help="name=v1,v2 ... for RandomForestClassifier")
+    parser.add_argument("--rows", type=int, default=0, help="Sample this many production rows (default: all)")
+    parser.add_argument("--compact", action="store_true", help="Also export compact forests (compact_forest.py)")
+    parser.add_argument("--parity-rows", type=int, default=2000, help="Rows checked against sklearn before a compact export")
+    args = parser.parse_args()
+
+    wall_start = time.perf_counter()
+    stage_seconds: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    data = {"yield": data_fingerprint(args.production), "recommend": data_fingerprint(args.recommendation)}
+    stage_seconds["hash_data"] = time.perf_counter() - start
+
+    # The yield forests take far longer, so they are queued first
+    tasks: List[Tuple[str, str, Dict[str, Any]]] = (
+        [("yield", args.production, params) for params in parse_grid(args.yield_grid)] +
+        [("recommend", args.recommendation, params) for params in parse_grid(args.recommend_grid)]
+    )
+    # Spread the cores over the trials: all trials in parallel, each forest using its share
+    workers = max(1, min(args.jobs, len(tasks)))
+    n_jobs = max(1, args.jobs // workers)
+    print(f"--- {len(tasks)} trials on {workers} processes x {n_jobs} cores ---")
+
+    os.makedirs(args.out, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=args.out) as tmp_dir:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(run_trial, model, path, args.rows, params, args.encoding, n_jobs, tmp_dir, trial)
+                for trial, (model, path, params) in enumerate(tasks)
+            ]
+            trials = [future.result() for future in futures]
+        stage_seconds["train"] = time.perf_counter() - start
+        for trial in trials:
+            print(f"  {trial['model']:<9} {json.dumps(trial['params']):<40} {trial['metrics']} "
+                  f"fit {trial['timings']['fit']:.1f}s")
+
+        winners = {model: best_trial([t for t in trials if t["model"] == model]) for model in MODEL_FILES}
+
+        # Version = time + hash of the inputs, so the same data and params are recognisable across runs
+        recipe = json.dumps({"data": data, "encoding": args.encoding,
+                             "params": {m: w["params"] for m, w in winners.items()}}, sort_keys=True)
+        version = time.strftime("%Y%m%d-%H%M%S", time.gmtime()) + "-" + hashlib.sha256(recipe.encode()).hexdigest()[:8]
+        version_dir = os.path.join(args.out, version)
+        os.makedirs(version_dir)
+
+        start = time.perf_counter()
+        models_meta = {}
+        for model, filename in MODEL_FILES.items():
+            winner = winners[model]
+            path = os.path.join(version_dir, filename)
+            os.replace(winner["artifact"], path)
+            models_meta[model] = {
+                "file": filename,
+                "sha256": file_sha256(path),
+                "bytes": os.path.getsize(path),
+                "params": winner["params"],
+                "metrics": winner["metrics"],
+                "timings": winner["timings"],
+                "features": winner["schema"],
+                "data": data[model],
+                "trials": [{"params": t["params"], "metrics": t["metrics"]}
+                           for t in trials if t["model"] == model]
+            }
+        models_meta["yield"]["encoding"] = args.encoding
+        stage_seconds["publish"] = time.perf_counter() - start
+
+    if args.compact:
+        from .compact_forest import CompactForest, check_parity, export_forest, sample_inputs
+
+        start = time.perf_counter()
+        for model, filename in MODEL_FILES.items():
+            path = os.path.join(version_dir, filename)
+            with open(path, "rb") as f:
+                estimator = pickle.load(f)
+            forest_path = os.path.join(version_dir, "compact_models", filename.replace(".pkl", ".forest"))
+            tmp_path = f"{forest_path}.tmp-{os.getpid()}"
+            export_forest(estimator, tmp_path, source_sha256=models_meta[model]["sha256"])
+            # Never publish (or mark LATEST) a compact forest that disagrees with the model it came from
+            parity = check_parity(estimator, CompactForest(tmp_path), sample_inputs(
+                filename.replace(".pkl", ""), estimator, args.production, args.parity_rows))
+            if parity["mismatches"]:
+                raise SystemExit(f"❌ {model}: {parity['mismatches']}/{parity['rows']} compact predictions differ "
+                                 f"from sklearn; left {tmp_path} for inspection and did not update LATEST")
+            os.replace(tmp_path, forest_path)
+            models_meta[model]["compact_parity"] = parity
+        stage_seconds["compact_export"] = time.perf_counter() - start
+
+    stage_seconds["total"] = time.perf_counter() - wall_start
+    metadata = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "sklearn": sklearn.__version__,
+        "jobs": args.jobs,
+        "models": models_meta,
+        "stage_seconds": {stage: round(seconds, 2) for stage, seconds in stage_seconds.items()}
+    }
+    with open(os.path.join(version_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    latest_tmp = os.path.join(args.out, "LATEST.tmp")
+    with open(latest_tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(latest_tmp, os.path.join(args.out, "LATEST"))
+
+    print(f"\n✅ Models written to {version_dir}")
+    for model, meta in models_meta.items():
+        print(f"   {model:<9} {meta['metrics']} params {meta['params']} ({meta['bytes'] / 1e6:.1f} MB)")
+    print("   stages   " + "   ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stage_seconds.items()))
+
+
+if __name__ == "__main__":
+    main()
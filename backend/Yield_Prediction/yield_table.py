@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KEY_SEPARATOR = "\x1f"
+
+
+def table_key(state: str, district: str, season: str, crop: str) -> bytes:
+    """The exact strings the yield pipeline sees, joined with a unit separator"""
+    return KEY_SEPARATOR.join((state, district, season, crop)).encode("utf-8")
+
+
+def _split_hash(key: bytes):
+    """(bucket hash, fingerprint, slot hash, slot step) from one 32-byte digest"""
+    digest = hashlib.blake2b(key, digest_size=32).digest()
+    return tuple(int.from_bytes(digest[i:i + 8], "little") for i in (0, 8, 16, 24))
+
+
+def _displaced_slot(slot_hash: int, slot_step: int, displacement: int, n_slots: int) -> int:
+    # CHD-style displacement pair (d0, d1) packed into one integer
+    d0, d1 = divmod(displacement, n_slots)
+    return (slot_hash + d0 * slot_step + d1) % n_slots
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _place_buckets(hashes: List[tuple], n_slots: int, n_buckets: int):
+    buckets: List[List[int]] = [[] for _ in range(n_buckets)]
+    for index, h in enumerate(hashes):
+        buckets[h[0] % n_buckets].append(index)
+
+    displacements = np.zeros(n_buckets, dtype=np.int32)
+    slot_of_key = np.full(n_slots, -1, dtype=np.int64)
+    taken = bytearray(n_slots)
+    singles = []
+    for bucket in sorted(range(n_buckets), key=lambda b: -len(buckets[b])):
+        members = buckets[bucket]
+        if len(members) <= 1:
+            if members:
+                singles.append(bucket)
+            continue
+        member_hashes = [(hashes[i][2], hashes[i][3]) for i in members]
+        # d1 shifts by one slot, d0 changes the stride; a few strides are plenty unless keys clash
+        for displacement in range(n_slots * min(n_slots, 16)):
+            slots = [_displaced_slot(a, b, displacement, n_slots) for a, b in member_hashes]
+            if len(set(slots)) == len(slots) and not any(taken[slot] for slot in slots):
+                break
+        else:
+            return None
+        displacements[bucket] = displacement
+        for slot in slots:
+            taken[slot] = 1
+        slot_of_key[members] = slots
+
+    free_slots = (slot for slot in range(n_slots) if not taken[slot])
+    for bucket in singles:
+        slot = next(free_slots)
+        displacements[bucket] = -(slot + 1)
+        slot_of_key[buckets[bucket][0]] = slot
+    return displacements, slot_of_key
+
+
+def build_perfect_hash(keys: List[bytes], keys_per_bucket: float = 1.0):
+    """Hash-and-displace minimal perfect hash over distinct keys.
+
+    Keys are grouped into buckets by a first hash. Buckets are placed largest
+    first: each gets the smallest displacement that sends all its keys to free
+    slots, and single-key buckets take the leftover slots directly, stored as
+    -(slot + 1). If some bucket cannot be placed, it retries with smaller
+    buckets. Returns (displacements, fingerprints, slot_of_key) where
+    fingerprints[slot] is the 64-bit check hash of the key stored there, so
+    lookups of unseen keys can be rejected.
+    """
+    n_slots = len(keys)
+    hashes = [_split_hash(key) for key in keys]
+    if len({h[1] for h in hashes}) != n_slots:
+        raise ValueError("Duplicate keys (or a 64-bit fingerprint collision) in the table")
+
+    n_buckets = max(1, int(n_slots / keys_per_bucket))
+    while True:
+        placed = _place_buckets(hashes, n_slots, n_buckets)
+        if placed is not None:
+            break
+        n_buckets *= 2
+    displacements, slot_of_key = placed
+
+    fingerprints = np.zeros(n_slots, dtype=np.uint64)
+    fingerprints[slot_of_key] = np.array([h[1] for h in hashes], dtype=np.uint64)
+    return displacements, fingerprints, slot_of_key
+
+
+class YieldTable:
+    """Precomputed yield predictions for (state, district, season, crop) x year.
+
+    Built offline by build_yield_table.py. values.npy is a (slots, years) float64
+    array opened memory-mapped, so only the pages that are looked up get read,
+    and a minimal perfect hash maps each key to its row in O(1).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        # The index arrays are small; only the values stay on disk
+        self.displacements = np.load(os.path.join(path, "displacements.npy")).tolist()
+        self.fingerprints = np.load(os.path.join(path, "fingerprints.npy")).tolist()
+        self.values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        self.first_year = int(self.meta["first_year"])
+        self.last_year = int(self.meta["last_year"])
+        self.n_slots = len(self.fingerprints)
+        self.n_buckets = len(self.displacements)
+        # Lookups run on threadpool threads; += on the counters is not atomic
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def slot(self, key: bytes) -> Optional[int]:
+        if self.n_slots == 0:
+            return None
+        bucket_hash, check, slot_hash, slot_step = _split_hash(key)
+        displacement = self.displacements[bucket_hash % self.n_buckets]
+        if displacement < 0:
+            slot = -displacement - 1
+        else:
+            slot = _displaced_slot(slot_hash, slot_step, displacement, self.n_slots)
+        return slot if self.fingerprints[slot] == check else None
+
+    def _find(self, state: str, district: str, season: str, crop: str, year: int) -> Optional[float]:
+        if self.first_year <= year <= self.last_year:
+            slot = self.slot(table_key(state, district, season, crop))
+            if slot is not None:
+                return float(self.values[slot, year - self.first_year])
+        return None
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def lookup(self, state: str, district: str, season: str, crop: str, year: int) -> Optional[float]:
+        """Predicted yield, or None when the combination or year is not in the table"""
+        value = self._find(state, district, season, crop, year)
+        self._count(int(value is not None), int(value is None))
+        return value
+
+    def lookup_many(self, rows: Iterable[tuple]) -> List[Optional[float]]:
+        values = [self._find(*row) for row in rows]
+        misses = values.count(None)
+        self._count(len(values) - misses, misses)
+        return values
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "path": self.path,
+            "combinations": self.n_slots,
+            "years": [self.first_year, self.last_year],
+            "built_at": self.meta.get("built_at"),
+            "hits": hits,
+            "misses": misses
+        }
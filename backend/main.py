@@ -19,6 +19,7 @@ from marketplace.routes import router as marketplace_router
 from crop_recommendations.routes import router as recommendations_router
 from PricePrediction.routes import router as price_router
 from AIChat.routes import router as ai_router
+from model_registry import router as models_router
 
 # Create FastAPI app
 app = FastAPI(
@@ -46,6 +47,7 @@ app.include_router(marketplace_router, prefix="", tags=["Marketplace"])
 app.include_router(recommendations_router, prefix="", tags=["CropRecommendations"])
 app.include_router(price_router, prefix="/price", tags=["PricePrediction"])
 app.include_router(ai_router, prefix="", tags=["AIChat"])
+app.include_router(models_router, prefix="/models", tags=["Models"])
 
 @app.get("/")
 def root():
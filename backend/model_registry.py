@@ -0,0 +1,485 @@
+import os
+import hmac
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Header
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "leaflense", "models")
+
+
+def _walk_files(path: str) -> List[str]:
+    """Relative file names under a directory, in the order artifact_sha256 hashes them"""
+    names = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        names.extend(os.path.relpath(os.path.join(root, name), path) for name in sorted(files))
+    return names
+
+
+def _hash_file(path: str, copy_to: Optional[str] = None) -> str:
+    digest = hashlib.sha256()
+    out = open(copy_to, "wb") if copy_to else None
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+                if out:
+                    out.write(block)
+    finally:
+        if out:
+            out.close()
+    if copy_to:
+        shutil.copystat(path, copy_to)
+    return digest.hexdigest()
+
+
+def artifact_sha256(path: str, copy_to: Optional[str] = None) -> str:
+    """SHA-256 of a file, or of a directory's relative file names and contents.
+
+    With copy_to the artifact is copied there in the same pass, so the hash is
+    that of exactly the bytes that were copied.
+    """
+    if not os.path.isdir(path):
+        return _hash_file(path, copy_to)
+    digest = hashlib.sha256()
+    for relative in _walk_files(path):
+        target = None
+        if copy_to:
+            target = os.path.join(copy_to, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        digest.update(relative.encode("utf-8") + b"\0")
+        digest.update(_hash_file(os.path.join(path, relative), target).encode("ascii"))
+    if copy_to:
+        os.makedirs(copy_to, exist_ok=True)
+    return digest.hexdigest()
+
+
+def file_signature(path: str) -> List[Any]:
+    """(size, mtime, inode) of a file or of every file in a directory; changes whenever the content is rewritten"""
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+    return [[relative, *file_signature(os.path.join(path, relative))] for relative in _walk_files(path)]
+
+
+class ModelSpec:
+    """Where a model can come from and how to turn its file into an object"""
+
+    def __init__(self, name: str, filename: str, loader: Callable[[str], Any], repo_id: Optional[str] = None,
+                 local_paths: Sequence[str] = (), expected_sha256: Optional[str] = None):
+        self.name = name
+        self.filename = filename
+        self.loader = loader
+        self.repo_id = repo_id
+        self.local_paths = [path for path in local_paths if path]
+        self.expected_sha256 = expected_sha256
+
+
+class ModelArtifact:
+    def __init__(self, name: str, obj: Any, path: str, sha256: str, source: str, load_seconds: float,
+                 origin: Optional[str] = None):
+        self.name = name
+        self.obj = obj
+        self.path = path
+        self.sha256 = sha256
+        self.source = source
+        self.load_seconds = load_seconds
+        self.origin = origin or path
+        self.loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        return self.sha256[:12]
+
+    def describe(self, include_paths: bool = True) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "sha256": self.sha256,
+            "source": self.source,
+            **({"path": self.path, "origin": self.origin} if include_paths else {}),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+            "load_seconds": round(self.load_seconds, 3)
+        }
+
+
+class ModelRegistry:
+    """Shared model loading for every router, with a content-addressed disk cache and hot swap.
+
+    A model resolves to the first existing local path, else to the copy the
+    cache last fetched (objects/<sha256>/<filename>, named by refs/<name>.json,
+    so restarts need no network), else to a Hugging Face download that is then
+    added to the cache. Checksums are verified on every load. Local and explicit
+    paths are copied into objects/<sha256>/ first and loaders only ever see that
+    copy, so memory-mapping is safe even when the original file is overwritten
+    in place. A source whose size, mtime and inode are unchanged reuses its
+    object without being read again, and gc() deletes objects that no loaded,
+    rollback, held or cached-ref version uses any more. load() builds the new object completely before swapping it in, so
+    requests in flight keep the version they started with and a failed reload
+    leaves the current one serving.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, gc_grace_seconds: float = 600):
+        self.cache_dir = cache_dir
+        # Objects younger than this are never collected, so a load in progress keeps its copy
+        self.gc_grace_seconds = gc_grace_seconds
+        self._specs: Dict[str, ModelSpec] = {}
+        self._current: Dict[str, ModelArtifact] = {}
+        self._previous: Dict[str, ModelArtifact] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._held: Dict[str, str] = {}
+        self._snapshots: Optional[Dict[str, Dict[str, Any]]] = None
+        self._snapshot_lock = threading.Lock()
+        self._gc_lock = threading.Lock()
+
+    def register(self, spec: ModelSpec) -> None:
+        self._specs[spec.name] = spec
+        self._locks.setdefault(spec.name, threading.Lock())
+
+    def _ref_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, "refs", f"{name}.json")
+
+    def _object_path(self, sha256: str, filename: str) -> str:
+        return os.path.join(self.cache_dir, "objects", sha256, filename)
+
+    def _cached(self, spec: ModelSpec) -> Optional[Tuple[str, str]]:
+        try:
+            with open(self._ref_path(spec.name), encoding="utf-8") as f:
+                sha256 = json.load(f)["sha256"]
+        except (OSError, ValueError, KeyError):
+            return None
+        path = self._object_path(sha256, spec.filename)
+        if not os.path.exists(path):
+            return None
+        if artifact_sha256(path) != sha256:
+            logger.warning(f"Cached {spec.name} at {path} failed its checksum, fetching again")
+            return None
+        return path, sha256
+
+    def _snapshot_index(self) -> Dict[str, Dict[str, Any]]:
+        """source path -> {"signature", "sha256"} of its last copy, persisted across restarts"""
+        if self._snapshots is None:
+            try:
+                with open(os.path.join(self.cache_dir, "snapshots.json"), encoding="utf-8") as f:
+                    self._snapshots = json.load(f)
+            except (OSError, ValueError):
+                self._snapshots = {}
+        return self._snapshots
+
+    def _remember_snapshot(self, source: str, signature: List[Any], sha256: str) -> None:
+        with self._snapshot_lock:
+            index = self._snapshot_index()
+            index[source] = {"signature": signature, "sha256": sha256}
+            index_path = os.path.join(self.cache_dir, "snapshots.json")
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(index, f)
+                os.replace(f"{index_path}.tmp", index_path)
+            except OSError as e:
+                logger.warning(f"Failed to save the model snapshot index: {str(e)}")
+
+    def snapshot(self, source_path: str) -> Tuple[str, str]:
+        """Copy a local file or directory into objects/<sha256>/ and return (copy path, sha256).
+
+        An unchanged source (same size, mtime and inode as last time) is not
+        read at all. Otherwise it is hashed, and copied only if no object has
+        that hash yet; the copy is hashed as it is written, so a source
+        rewritten mid-copy is filed under what was actually copied. Never
+        hardlinked: a link would share the inode that an in-place overwrite of
+        the source modifies.
+        """
+        filename = os.path.basename(os.path.normpath(source_path))
+        source = os.path.realpath(source_path)
+        signature = file_signature(source)
+        with self._snapshot_lock:
+            known = self._snapshot_index().get(source)
+        if known and known["signature"] == signature:
+            path = self._object_path(known["sha256"], filename)
+            if self._reuse(path):
+                return path, known["sha256"]
+
+        sha256 = artifact_sha256(source)
+        path = self._object_path(sha256, filename)
+        if not self._reuse(path):
+            tmp_dir = os.path.join(self.cache_dir, "tmp")
+            os.makedirs(tmp_dir, exist_ok=True)
+            tmp_path = os.path.join(tmp_dir, f"{filename}.{os.getpid()}.{threading.get_ident()}")
+            try:
+                sha256 = artifact_sha256(source, copy_to=tmp_path)
+                path = self._object_path(sha256, filename)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if not os.path.exists(path):
+                    os.replace(tmp_path, path)
+            finally:
+                if os.path.isdir(tmp_path):
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                elif os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        # A source rewritten while it was read gets a new signature and is read again next time
+        if file_signature(source) == signature:
+            self._remember_snapshot(source, signature, sha256)
+        return path, sha256
+
+    def _reuse(self, path: str) -> bool:
+        """Whether an object exists; touching it restarts its gc() grace period while it is loaded"""
+        try:
+            os.utime(os.path.dirname(path))
+            return os.path.exists(path)
+        except OSError:
+            return False
+
+    def hold(self, key: str, sha256: str) -> None:
+        """Keep an object that isn't loaded through the registry (e.g. a shadow candidate) from gc()"""
+        self._held[key] = sha256
+
+    def release(self, key: str) -> None:
+        self._held.pop(key, None)
+
+    def gc(self) -> int:
+        """Delete cached objects that no current, rollback, held or refs/ version points at"""
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        live = {artifact.sha256 for artifact in (*self._current.values(), *self._previous.values())}
+        live.update(self._held.values())
+        try:
+            for ref in os.listdir(os.path.join(self.cache_dir, "refs")):
+                if ref.endswith(".json"):
+                    with open(os.path.join(self.cache_dir, "refs", ref), encoding="utf-8") as f:
+                        live.add(json.load(f)["sha256"])
+        except (OSError, ValueError, KeyError):
+            pass
+        removed = 0
+        cutoff = time.time() - self.gc_grace_seconds
+        with self._gc_lock:
+            try:
+                entries = list(os.scandir(objects_dir))
+            except OSError:
+                return 0
+            for entry in entries:
+                try:
+                    if entry.name in live or not entry.is_dir() or entry.stat().st_mtime > cutoff:
+                        continue
+                    # Loaded versions keep their mmapped pages; only the directory entry goes away
+                    shutil.rmtree(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Failed to remove cached model {entry.name}: {str(e)}")
+        if removed:
+            logger.info(f"Removed {removed} superseded model object(s) from {objects_dir}")
+        return removed
+
+    def _ingest(self, spec: ModelSpec, source_path: str) -> Tuple[str, str]:
+        """Copy a downloaded artifact into objects/<sha256>/ and point refs/<name>.json at it"""
+        sha256 = artifact_sha256(source_path)
+        path = self._object_path(sha256, spec.filename)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            try:
+                os.link(source_path, tmp_path)
+            except OSError:
+                shutil.copy2(source_path, tmp_path)
+            os.replace(tmp_path, path)
+        ref_path = self._ref_path(spec.name)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        with open(f"{ref_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"sha256": sha256, "filename": spec.filename, "repo_id": spec.repo_id,
+                       "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}, f)
+        os.replace(f"{ref_path}.tmp", ref_path)
+        return path, sha256
+
+    def resolve(self, name: str, refresh: bool = False) -> Tuple[str, str, str, str]:
+        """(cached path, sha256, source, origin) for a model; refresh=True skips the cache and asks the hub"""
+        spec = self._specs[name]
+        for path in spec.local_paths:
+            if os.path.exists(path):
+                return (*self.snapshot(path), "local", path)
+        if not refresh:
+            cached = self._cached(spec)
+            if cached:
+                return cached[0], cached[1], "cache", cached[0]
+        if spec.repo_id:
+            from huggingface_hub import hf_hub_download
+
+            downloaded = hf_hub_download(repo_id=spec.repo_id, filename=spec.filename)
+            path, sha256 = self._ingest(spec, downloaded)
+            return path, sha256, "hub", downloaded
+        raise FileNotFoundError(f"{name}: none of {spec.local_paths or [spec.filename]} exist and no hub repo is set")
+
+    def load(self, name: str, path: Optional[str] = None, refresh: bool = False) -> ModelArtifact:
+        """Load (or reload) a model and swap it in atomically once it is ready"""
+        spec = self._specs[name]
+        with self._locks[name]:
+            start = time.perf_counter()
+            try:
+                if path:
+                    origin = path
+                    path, sha256 = self.snapshot(path)
+                    source = "explicit"
+                else:
+                    path, sha256, source, origin = self.resolve(name, refresh=refresh)
+                if spec.expected_sha256 and sha256 != spec.expected_sha256:
+                    raise ValueError(f"{name} checksum {sha256[:12]} does not match the pinned "
+                                     f"{spec.expected_sha256[:12]}")
+                current = self._current.get(name)
+                if current is not None and current.sha256 == sha256:
+                    return current
+                obj = spec.loader(path)
+            except Exception as e:
+                self._errors[name] = str(e)
+                raise
+
+            return self._install(name, obj, path, sha256, source, time.perf_counter() - start, origin)
+
+    def _install(self, name: str, obj: Any, path: str, sha256: str, source: str, load_seconds: float,
+                 origin: Optional[str] = None) -> ModelArtifact:
+        artifact = ModelArtifact(name, obj, path, sha256, source, load_seconds, origin)
+        if name in self._current:
+            self._previous[name] = self._current[name]
+        self._current[name] = artifact
+        self._errors.pop(name, None)
+        logger.info(f"Model {name} {artifact.version} loaded from {source} ({artifact.load_seconds:.1f}s)")
+        self.gc()
+        return artifact
+
+    def install(self, name: str, obj: Any, path: str, sha256: str, source: str, load_seconds: float = 0.0,
+                origin: Optional[str] = None) -> ModelArtifact:
+        """Swap in an object that was loaded (and vetted) elsewhere, e.g. a shadow-tested candidate"""
+        with self._locks[name]:
+            return self._install(name, obj, path, sha256, source, load_seconds, origin)
+
+    def rollback(self, name: str) -> ModelArtifact:
+        with self._locks[name]:
+            previous = self._previous.get(name)
+            if previous is None:
+                raise LookupError(f"{name} has no previous version to roll back to")
+            self._previous[name], self._current[name] = self._current[name], previous
+            logger.warning(f"Model {name} rolled back to {previous.version}")
+            return previous
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def spec(self, name: str) -> ModelSpec:
+        return self._specs[name]
+
+    def get(self, name: str) -> Any:
+        artifact = self._current.get(name)
+        return artifact.obj if artifact else None
+
+    def artifact(self, name: str) -> Optional[ModelArtifact]:
+        return self._current.get(name)
+
+    def status(self, names: Optional[List[str]] = None, include_paths: bool = False) -> Dict[str, Any]:
+        """Per-model version summary; filesystem paths only when include_paths (admin callers)"""
+        models = {}
+        for name in names or sorted(self._specs):
+            current, previous = self._current.get(name), self._previous.get(name)
+            models[name] = {
+                "loaded": current is not None,
+                **(current.describe(include_paths) if current else {}),
+                "previous_version": previous.version if previous else None,
+                "error": self._errors.get(name)
+            }
+        return models
+
+
+registry = ModelRegistry(os.getenv("MODEL_CACHE_DIR", DEFAULT_CACHE_DIR),
+                         gc_grace_seconds=float(os.getenv("MODEL_CACHE_GC_GRACE_SECONDS", "600")))
+
+# --- /models endpoints: inspect, hot-swap and roll back models without restarting ---
+router = APIRouter()
+# Admin endpoints are disabled unless a token is set; explicit paths must sit under one of these directories
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+MODEL_ADMIN_ALLOWED_DIRS = [os.path.realpath(path) for path in
+                            os.getenv("MODEL_ADMIN_ALLOWED_DIRS", "").split(os.pathsep) if path]
+
+
+class ReloadRequest(BaseModel):
+    path: Optional[str] = None
+    refresh: bool = True
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(MODEL_ADMIN_TOKEN and token and
+                hmac.compare_digest(token.encode("utf-8"), MODEL_ADMIN_TOKEN.encode("utf-8")))
+
+
+def admin_error(name: str, token: Optional[str]) -> Optional[JSONResponse]:
+    if not MODEL_ADMIN_TOKEN:
+        return JSONResponse(content={"error": "Model admin API is disabled; set MODEL_ADMIN_TOKEN to enable it",
+                                     "status": "error"}, status_code=503)
+    if not is_admin(token):
+        return JSONResponse(content={"error": "Invalid admin token", "status": "error"}, status_code=403)
+    if name not in registry:
+        return JSONResponse(content={"error": f"Unknown model {name}", "status": "error"}, status_code=404)
+    return None
+
+
+def admin_model_path(path: str) -> str:
+    """Resolve an admin-supplied model path, refusing anything outside MODEL_ADMIN_ALLOWED_DIRS"""
+    resolved = os.path.realpath(path)
+    for allowed in MODEL_ADMIN_ALLOWED_DIRS:
+        if os.path.commonpath([resolved, allowed]) == allowed:
+            return resolved
+    raise PermissionError(f"{path} is not under MODEL_ADMIN_ALLOWED_DIRS" if MODEL_ADMIN_ALLOWED_DIRS else
+                          "Loading models from a path is disabled; set MODEL_ADMIN_ALLOWED_DIRS to enable it")
+
+
+def path_error(path: Optional[str]) -> Tuple[Optional[str], Optional[JSONResponse]]:
+    """(resolved path, None), or (None, 403 response) when the path is not allowlisted"""
+    if not path:
+        return None, None
+    try:
+        return admin_model_path(path), None
+    except PermissionError as e:
+        return None, JSONResponse(content={"error": str(e), "status": "error"}, status_code=403)
+
+
+@router.get("/")
+def list_models(x_admin_token: Optional[str] = Header(None)):
+    """Loaded version, source and checksum of every registered model (plus file paths for admins)"""
+    if is_admin(x_admin_token):
+        return {"cache_dir": registry.cache_dir, "models": registry.status(include_paths=True)}
+    return {"models": registry.status()}
+
+
+# Plain def: loading runs in the threadpool while the current version keeps serving
+@router.post("/{name}/reload")
+def reload_model(name: str, request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    """Load a newer version (from `path`, or the hub when refresh is true) and swap it in"""
+    error = admin_error(name, x_admin_token)
+    if error:
+        return error
+    request = request or ReloadRequest()
+    path, error = path_error(request.path)
+    if error:
+        return error
+    try:
+        artifact = registry.load(name, path=path, refresh=request.refresh)
+    except Exception as e:
+        return JSONResponse(content={"error": f"Reload failed, current version kept: {str(e)}",
+                                     "status": "error"}, status_code=500)
+    return {"status": "success", "model": name, **artifact.describe()}
+
+
+@router.post("/{name}/rollback")
+def rollback_model(name: str, x_admin_token: Optional[str] = Header(None)):
+    error = admin_error(name, x_admin_token)
+    if error:
+        return error
+    try:
+        artifact = registry.rollback(name)
+    except LookupError as e:
+        return JSONResponse(content={"error": str(e), "status": "error"}, status_code=409)
+    return {"status": "success", "model": name, **artifact.describe()}
@@ -0,0 +1,257 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowCandidate:
+    """A loaded model version waiting for approval, with its shadow-traffic record"""
+
+    def __init__(self, obj: Any, path: str, sha256: str, load_seconds: float, window: int,
+                 origin: Optional[str] = None):
+        self.obj = obj
+        self.path = path
+        self.origin = origin or path
+        self.sha256 = sha256
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.live_seconds = 0.0
+        self.candidate_seconds = 0.0
+        self.relative_diffs: "deque[float]" = deque(maxlen=window)
+        self.absolute_diffs: "deque[float]" = deque(maxlen=window)
+
+    def describe(self, include_paths: bool = True) -> Dict[str, Any]:
+        relative = np.array(self.relative_diffs) if self.relative_diffs else None
+        return {
+            "version": self.sha256[:12],
+            "sha256": self.sha256,
+            **({"path": self.path, "origin": self.origin} if include_paths else {}),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+            "load_seconds": round(self.load_seconds, 3),
+            "shadow_requests": self.requests,
+            "shadow_rows": self.rows,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "mean_abs_diff": round(float(np.mean(self.absolute_diffs)), 4) if self.absolute_diffs else None,
+            "mean_relative_diff": round(float(relative.mean()), 6) if relative is not None else None,
+            "p95_relative_diff": round(float(np.percentile(relative, 95)), 6) if relative is not None else None,
+            "live_ms_per_request": round(self.live_seconds / self.requests * 1000, 3) if self.requests else None,
+            "candidate_ms_per_request": round(self.candidate_seconds / self.requests * 1000, 3) if self.requests else None
+        }
+
+
+class ShadowModelManager:
+    """Watches a registry model's files and shadow-tests new versions before they go live.
+
+    When a watched file changes, the new version is copied into the registry's
+    immutable objects/<sha256>/ cache, loaded from there on a background thread
+    and held as a candidate, so a later in-place overwrite of the watched file
+    cannot touch the memory-mapped arrays of a loaded version. Live requests keep being answered by the
+    current model; observe() replays a sample of them against the candidate on
+    a separate worker (dropping samples while it is busy, so live latency is
+    unaffected) and records how far its predictions and latency are from the
+    live ones. promote() swaps the candidate in through the registry, either on
+    approval or automatically once it meets the configured thresholds. If no
+    real model is loaded yet, a new file goes live straight away.
+    """
+
+    def __init__(self, registry: ModelRegistry, name: str, poll_seconds: float = 30, sample_rate: float = 1.0,
+                 max_pending: int = 8, window: int = 5000, auto_promote: bool = False,
+                 min_shadow_requests: int = 200, max_relative_diff: float = 0.05, max_latency_ratio: float = 1.5):
+        self.registry = registry
+        self.name = name
+        self.poll_seconds = poll_seconds
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.window = window
+        self.auto_promote = auto_promote
+        self.min_shadow_requests = min_shadow_requests
+        self.max_relative_diff = max_relative_diff
+        self.max_latency_ratio = max_latency_ratio
+        self.candidate: Optional[ShadowCandidate] = None
+        self.last_error: Optional[str] = None
+        self.skipped = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-shadow")
+        self._rng = np.random.default_rng()
+        self._snapshot: Optional[List[Tuple[str, int, int]]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_snapshot(self) -> List[Tuple[str, int, int]]:
+        """(path, mtime, size) of the watched files; cheap enough to poll, unlike hashing"""
+        snapshot = []
+        for path in self.registry.spec(self.name).local_paths:
+            try:
+                stat = os.stat(path)
+                snapshot.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                continue
+        return snapshot
+
+    def start(self) -> None:
+        if self._thread is not None or self.poll_seconds <= 0:
+            return
+        self._snapshot = self._file_snapshot()
+        self._thread = threading.Thread(target=self._watch, name=f"{self.name}-watcher", daemon=True)
+        self._thread.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.poll_seconds)
+            snapshot = self._file_snapshot()
+            if snapshot == self._snapshot:
+                continue
+            # Let a copy in progress finish before reading the file
+            time.sleep(min(self.poll_seconds, 2))
+            if self._file_snapshot() != snapshot:
+                continue
+            # Load the file that changed (the highest-priority one if several did), not whichever path resolves first
+            changed = [entry[0] for entry in snapshot if entry not in (self._snapshot or [])]
+            try:
+                if changed:
+                    self.load_candidate(changed[0])
+            except Exception as e:
+                # Not marked as seen, so a truncated or half-written file is retried on the next poll
+                self.last_error = str(e)
+                logger.error(f"Failed to load new {self.name} from {changed[0]}: {str(e)}")
+                continue
+            self._snapshot = snapshot
+
+    def load_candidate(self, path: Optional[str] = None) -> Optional[ShadowCandidate]:
+        """Load a version as the shadow candidate (or straight in when only the fallback is serving)"""
+        with self._load_lock:
+            start = time.perf_counter()
+            if path:
+                origin = path
+                path, sha256 = self.registry.snapshot(path)
+            else:
+                path, sha256, _, origin = self.registry.resolve(self.name)
+            current = self.registry.artifact(self.name)
+            if current is not None and current.sha256 == sha256:
+                return None
+            if self.candidate is not None and self.candidate.sha256 == sha256:
+                return self.candidate
+            obj = self.registry.spec(self.name).loader(path)
+            load_seconds = time.perf_counter() - start
+
+            if current is None:
+                self.registry.install(self.name, obj, path, sha256, "watch", load_seconds, origin)
+                return None
+            with self._lock:
+                self.candidate = ShadowCandidate(obj, path, sha256, load_seconds, self.window, origin)
+            self.registry.hold(f"{self.name}:candidate", sha256)
+            self.last_error = None
+            logger.warning(f"New {self.name} {sha256[:12]} loaded from {origin}; shadowing "
+                           f"{current.version} until promoted")
+            return self.candidate
+
+    def observe(self, frame: Any, live_predictions: Any, live_seconds: float) -> None:
+        """Replay a live request against the candidate in the background"""
+        candidate = self.candidate
+        if candidate is None:
+            return
+        with self._lock:
+            # numpy Generators aren't thread-safe; requests call this from many threads
+            if self.sample_rate < 1.0 and self._rng.random() >= self.sample_rate:
+                return
+            if self._pending >= self.max_pending:
+                self.skipped += 1
+                return
+            self._pending += 1
+        self._executor.submit(self._shadow, candidate, frame, np.asarray(live_predictions, dtype=float), live_seconds)
+
+    def _shadow(self, candidate: ShadowCandidate, frame: Any, live: np.ndarray, live_seconds: float) -> None:
+        try:
+            start = time.perf_counter()
+            try:
+                predictions = np.asarray(candidate.obj.predict(frame), dtype=float)
+                error = None
+            except Exception as e:
+                error = str(e)
+            candidate_seconds = time.perf_counter() - start
+
+            with self._lock:
+                candidate.requests += 1
+                candidate.live_seconds += live_seconds
+                candidate.candidate_seconds += candidate_seconds
+                if error is not None:
+                    candidate.errors += 1
+                    candidate.last_error = error
+                    return
+                difference = np.abs(predictions - live)
+                candidate.rows += len(difference)
+                candidate.absolute_diffs.extend(difference.tolist())
+                candidate.relative_diffs.extend((difference / np.maximum(np.abs(live), 1e-9)).tolist())
+            if self.auto_promote and self._meets_thresholds(candidate):
+                try:
+                    self.promote(candidate.sha256)
+                except LookupError:
+                    pass  # promoted or rejected by hand meanwhile
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _meets_thresholds(self, candidate: ShadowCandidate) -> bool:
+        if candidate.requests < self.min_shadow_requests or candidate.errors or not candidate.relative_diffs:
+            return False
+        return (float(np.percentile(candidate.relative_diffs, 95)) <= self.max_relative_diff and
+                candidate.candidate_seconds <= candidate.live_seconds * self.max_latency_ratio)
+
+    def promote(self, sha256: Optional[str] = None):
+        """Swap the candidate in; requests already holding the old model finish on it"""
+        with self._lock:
+            candidate = self.candidate
+            if candidate is None or (sha256 and candidate.sha256 != sha256):
+                raise LookupError(f"No {self.name} candidate to promote")
+            self.candidate = None
+        logger.warning(f"Promoting {self.name} {candidate.sha256[:12]} after {candidate.requests} shadow requests")
+        artifact = self.registry.install(self.name, candidate.obj, candidate.path, candidate.sha256, "shadow",
+                                         candidate.load_seconds, candidate.origin)
+        self.registry.release(f"{self.name}:candidate")
+        return artifact
+
+    def reject(self) -> ShadowCandidate:
+        with self._lock:
+            candidate = self.candidate
+            if candidate is None:
+                raise LookupError(f"No {self.name} candidate to reject")
+            self.candidate = None
+        self.registry.release(f"{self.name}:candidate")
+        self.registry.gc()
+        logger.warning(f"Rejected {self.name} candidate {candidate.sha256[:12]}")
+        return candidate
+
+    def status(self, include_paths: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            candidate = self.candidate.describe(include_paths) if self.candidate else None
+        return {
+            "current": self.registry.status([self.name], include_paths)[self.name],
+            "candidate": candidate,
+            "watching": self.poll_seconds > 0,
+            **({"watched_paths": self.registry.spec(self.name).local_paths} if include_paths else {}),
+            "poll_seconds": self.poll_seconds,
+            "sample_rate": self.sample_rate,
+            "skipped_samples": self.skipped,
+            "auto_promote": {
+                "enabled": self.auto_promote,
+                "min_shadow_requests": self.min_shadow_requests,
+                "max_p95_relative_diff": self.max_relative_diff,
+                "max_latency_ratio": self.max_latency_ratio
+            },
+            "last_error": self.last_error
+        }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the routers' packages the way `python -m Pkg.module` does from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from FertilizerSuggestor.advice_cache import AdviceCache
+
+
+def run_deferred(cache: AdviceCache, keys, fail: bool = False):
+    async def fetch():
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError("quota exceeded")
+        return {"nitrogen": 60}
+
+    async def main():
+        tasks = [cache.start(key, fetch, hold=True) for key in keys]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("max_entries", [0, 1])
+def test_deferred_results_survive_the_cache_bound(max_entries):
+    cache = AdviceCache(max_entries=max_entries)
+    run_deferred(cache, ["a", "b", "c"])
+
+    for key in ("a", "b", "c"):
+        assert cache.get(key) == {"nitrogen": 60}
+        assert cache.cached(key)
+    assert cache.stats()["entries"] == max_entries
+
+
+def test_deferred_failures_are_held_for_the_failure_ttl():
+    cache = AdviceCache(max_entries=0, failure_ttl_seconds=0)
+    run_deferred(cache, ["a"], fail=True)
+    assert cache.get("a") is None
+
+    cache = AdviceCache(max_entries=0, failure_ttl_seconds=60)
+    run_deferred(cache, ["a"], fail=True)
+    assert cache.failed(cache.get("a"))
+
+
+def test_inline_fetches_are_not_held():
+    cache = AdviceCache(max_entries=0)
+
+    async def fetch():
+        return {"nitrogen": 60}
+
+    assert asyncio.run(cache.get_or_fetch("a", fetch)) == {"nitrogen": 60}
+    assert cache.get("a") is None
+    assert cache.stats()["held"] == 0
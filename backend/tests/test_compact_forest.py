@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from Yield_Prediction.compact_forest import CompactForest, export_forest
+
+STATES = ["Kerala", "Punjab", "Bihar", "Assam", "Goa"]
+SEASONS = ["Kharif", "Rabi", "Whole Year", "Summer"]
+CROPS = ["Rice", "Wheat", "Maize", "Banana", "Coconut", "Onion"]
+
+
+def numeric_frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "N": rng.integers(0, 140, rows),
+        "P": rng.integers(5, 145, rows),
+        "K": rng.integers(5, 205, rows),
+        "temperature": rng.uniform(8, 44, rows),
+        "humidity": rng.uniform(14, 100, rows),
+        "ph": rng.uniform(3.5, 9.9, rows),
+        "rainfall": rng.uniform(20, 300, rows)
+    })
+
+
+def yield_frame(rows: int, seed: int, unseen: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "State_Name": rng.choice(STATES, rows),
+        "Season": rng.choice(SEASONS, rows),
+        "Crop": rng.choice(CROPS, rows),
+        "Crop_Year": rng.integers(1997, 2015, rows)
+    })
+    if unseen:
+        frame.loc[frame.index[::7], "State_Name"] = "Atlantis"
+        frame.loc[frame.index[::11], "Crop"] = "Quinoa"
+    return frame
+
+
+def yield_target(frame: pd.DataFrame, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (frame["State_Name"].map({s: i for i, s in enumerate(STATES)}) * 0.3 +
+            frame["Crop"].map({c: i for i, c in enumerate(CROPS)}) * 0.7 +
+            (frame["Crop_Year"] - 1997) * 0.01 + rng.normal(0, 0.2, len(frame))).to_numpy()
+
+
+def one_hot_pipeline(regressor, sparse: bool) -> Pipeline:
+    return Pipeline([
+        ("preprocessor", ColumnTransformer(
+            [("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=sparse), ["State_Name", "Season", "Crop"])],
+            remainder="passthrough",
+            sparse_threshold=1.0 if sparse else 0.0
+        )),
+        ("regressor", regressor)
+    ])
+
+
+def compact(model, tmp_path) -> CompactForest:
+    export_forest(model, str(tmp_path / "model.forest"))
+    return CompactForest(str(tmp_path / "model.forest"))
+
+
+@pytest.mark.parametrize("forest_class", [RandomForestRegressor, ExtraTreesRegressor])
+def test_dense_regressor_matches_sklearn(forest_class, tmp_path):
+    train = numeric_frame(600, seed=0)
+    model = forest_class(n_estimators=15, random_state=0).fit(train, train["N"] * 0.5 + train["rainfall"])
+    rows = numeric_frame(400, seed=1)
+
+    np.testing.assert_array_equal(compact(model, tmp_path).predict(rows), model.predict(rows))
+
+
+@pytest.mark.parametrize("forest_class", [RandomForestRegressor, ExtraTreesRegressor])
+@pytest.mark.parametrize("sparse", [False, True], ids=["dense-onehot", "sparse-onehot"])
+def test_one_hot_pipeline_matches_sklearn(forest_class, sparse, tmp_path):
+    train = yield_frame(1500, seed=2)
+    model = one_hot_pipeline(forest_class(n_estimators=15, random_state=0), sparse).fit(train, yield_target(train, 2))
+    rows = yield_frame(500, seed=3, unseen=True)
+
+    np.testing.assert_array_equal(compact(model, tmp_path).predict(rows), model.predict(rows))
+
+
+def test_classifier_matches_sklearn(tmp_path):
+    train = numeric_frame(800, seed=4)
+    labels = np.where(train["rainfall"] > 150, "rice", np.where(train["temperature"] > 30, "cotton", "wheat"))
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(train, labels)
+    rows = numeric_frame(400, seed=5)
+    forest = compact(model, tmp_path)
+
+    np.testing.assert_array_equal(forest.predict(rows), model.predict(rows))
+    np.testing.assert_allclose(forest.predict_proba(rows), model.predict_proba(rows), rtol=0, atol=1e-12)
+
+
+def test_tree_chunks_on_shared_pool_match_sklearn(monkeypatch, tmp_path):
+    monkeypatch.setattr("Yield_Prediction.compact_forest.PARALLEL_MIN_PAIRS", 0)
+    train = yield_frame(1500, seed=6)
+    model = one_hot_pipeline(RandomForestRegressor(n_estimators=15, random_state=0), True).fit(train, yield_target(train, 6))
+    export_forest(model, str(tmp_path / "model.forest"))
+    rows = yield_frame(300, seed=7, unseen=True)
+
+    for _ in range(3):
+        forest = CompactForest(str(tmp_path / "model.forest"), n_threads=4)
+        np.testing.assert_array_equal(forest.predict(rows), model.predict(rows))
@@ -0,0 +1,65 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from FertilizerSuggestor.benchmark_encoder import CROP_TYPES, SOIL_TYPES, legacy_encode, sample_records, synthetic_model
+from FertilizerSuggestor.feature_encoder import FertilizerEncoder
+
+
+@pytest.fixture(scope="module")
+def saved_model(tmp_path_factory):
+    """(model, columns, encoder) loaded the way the fertilizer router loads fertilizer_model.pkl"""
+    path = tmp_path_factory.mktemp("fertilizer") / "fertilizer_model.pkl"
+    joblib.dump(synthetic_model(), path)
+    model, columns = joblib.load(path, mmap_mode="r")
+    return model, columns, FertilizerEncoder(columns)
+
+
+def every_known_pair():
+    return [
+        {**record, "Soil_Type": soil, "Crop_Type": crop}
+        for soil in SOIL_TYPES for crop in CROP_TYPES for record in sample_records(1, seed=len(soil) * len(crop))
+    ]
+
+
+def legacy_matrix(records, columns) -> np.ndarray:
+    return legacy_encode(records, columns).to_numpy(dtype=np.float64)
+
+
+@pytest.mark.parametrize("records", [
+    every_known_pair(),
+    sample_records(200, seed=1, unknown_rate=0.3),
+    [{**sample_records(1, seed=2)[0], "Soil_Type": "Peaty", "Crop_Type": "Quinoa"}]
+], ids=["known", "unseen", "all-unseen"])
+def test_single_rows_match_get_dummies(saved_model, records):
+    model, columns, encoder = saved_model
+    for record in records:
+        expected = legacy_encode([record], columns)
+        actual = encoder.encode(record)
+        assert actual.shape == (1, len(columns))
+        np.testing.assert_array_equal(actual, expected.to_numpy(dtype=np.float64))
+        assert model.predict(encoder.model_input(model, actual))[0] == model.predict(expected)[0]
+
+
+@pytest.mark.parametrize("records", [
+    every_known_pair(),
+    sample_records(500, seed=3),
+    sample_records(500, seed=4, unknown_rate=0.3),
+    [{**sample_records(1, seed=5)[0], "Soil_Type": "Peaty", "Crop_Type": "Quinoa"}] * 3
+], ids=["known", "batch", "unseen", "all-unseen"])
+def test_batches_match_get_dummies(saved_model, records):
+    model, columns, encoder = saved_model
+    expected = legacy_matrix(records, columns)
+
+    np.testing.assert_array_equal(encoder.encode_many(records), expected)
+    np.testing.assert_array_equal(encoder.encode_columns(pd.DataFrame(records), len(records)), expected)
+    np.testing.assert_array_equal(model.predict(encoder.model_input(model, encoder.encode_many(records))),
+                                  model.predict(legacy_encode(records, columns)))
+
+
+def test_extra_fields_are_dropped(saved_model):
+    _, columns, encoder = saved_model
+    record = {**sample_records(1, seed=6)[0], "Farm_Name": "North plot"}
+    np.testing.assert_array_equal(encoder.encode(record), legacy_matrix([record], columns))
+    np.testing.assert_array_equal(encoder.encode_many([record, record]), legacy_matrix([record, record], columns))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from Yield_Prediction.train_models import YIELD_FEATURES, build_yield_pipeline, dense_for_serving
+
+STATES = ["Kerala", "Punjab", "Bihar", "Assam", "Goa"]
+DISTRICTS = [f"DISTRICT {i}" for i in range(60)]
+SEASONS = ["Kharif", "Rabi", "Whole Year", "Summer"]
+CROPS = ["Rice", "Wheat", "Maize", "Banana", "Coconut", "Onion"]
+
+
+def production_frame(rows: int, seed: int, unseen: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "State_Name": rng.choice(STATES, rows),
+        "District_Name": rng.choice(DISTRICTS, rows),
+        "Crop_Year": rng.integers(1997, 2015, rows),
+        "Season": rng.choice(SEASONS, rows),
+        "Crop": rng.choice(CROPS, rows)
+    })
+    if unseen:
+        frame.loc[frame.index[::7], "District_Name"] = "ATLANTIS"
+        frame.loc[frame.index[::11], "Crop"] = "Quinoa"
+    return frame[YIELD_FEATURES]
+
+
+def test_dense_for_serving_keeps_sparse_predictions():
+    X_train = production_frame(1500, seed=0)
+    y_train = np.random.default_rng(1).normal(1.0, 0.5, len(X_train))
+    X_test = production_frame(400, seed=2, unseen=True)
+    trained = build_yield_pipeline("sparse", n_jobs=1, n_estimators=10).fit(X_train, y_train)
+    served = dense_for_serving(trained, X_train)
+
+    assert sparse.issparse(trained.named_steps["preprocessor"].transform(X_test))
+    assert isinstance(served.named_steps["preprocessor"].transform(X_test), np.ndarray)
+    np.testing.assert_array_equal(served.predict(X_test), trained.predict(X_test))
+    for row in range(5):
+        assert served.predict(X_test.iloc[row:row + 1])[0] == trained.predict(X_test.iloc[row:row + 1])[0]
+
+
+def test_dense_for_serving_leaves_other_encodings_alone():
+    X_train = production_frame(300, seed=3)
+    y_train = np.random.default_rng(4).normal(1.0, 0.5, len(X_train))
+    for encoding in ("dense", "ordinal"):
+        trained = build_yield_pipeline(encoding, n_jobs=1, n_estimators=3).fit(X_train, y_train)
+        assert dense_for_serving(trained, X_train) is trained